@@ -2,17 +2,52 @@
 
 
 NUM_LEDS = 50  # Number of LEDs on the light strip
+LED_DRIVER = "plasma"  # "plasma" (Pimoroni driver), "ws2812" (PIO + DMA, not yet tested on hardware), "apa102" (SPI) or "recording"
+LED_DATA_PIN = 15  # Data pin, 15 is DAT on the Plasma Stick
+LED_CLOCK_PIN = 14  # Clock pin, APA102 only
+LED_COLOR_ORDER = "RGB"  # Order the strip expects the colour channels in, e.g. "RGB", "GRB", or "BGR" for most APA102
+LED_RECORD_FILE = None  # "recording" driver only: file to record frames to
+LED_OUTPUTS = None  # ws2812 only: split the strip over chains sent in parallel, [(pin, pio, sm, leds), ...] in strip order
+CAPTURE_HOST = None  # Stream every frame to tools/capture_tool.py receive running on this host
+CAPTURE_PORT = 9100
+
+POWER_BUDGET_MA = None  # Scale the strip down to stay under this estimated current draw, in mA. None: no limit
+LED_CHANNEL_MA = 20  # Current one colour channel of one LED draws at full brightness, in mA
+LED_IDLE_MA = 1  # Current each LED draws when off, in mA
+POWER_REPORT_INTERVAL = 10  # Seconds between estimated current reports to Home Assistant
+
+STATE_FILE_PREFIX = "state_"  # Last light state is saved in flash as state_0.json, state_1.json, ...
+STATE_SLOTS = 4  # Number of files the saved light state rotates across, to spread flash wear
+STATE_SAVE_DELAY = 5  # Seconds the light state must stay unchanged before it is written to flash
+
+TRANSITION_EASING = "ease_out"  # Shape of colour fades: "linear", "ease_in", "ease_out" or "ease_in_out"
 
 WIFI_SSID = "WIFI"
 WIFI_PSK = "PASSWORD"
 WIFI_COUNTRY = "CA"
 
 MQTT_SERVER = "192.168.1.10"  # Address to MQTT broker
-MQTT_PORT = 1883  # 1833 is the default port
+MQTT_PORT = 1883  # 1833 is the default port, 8883 with TLS
+MQTT_CA_FILE = None  # CA certificate (PEM) on the device, e.g. "ca.crt", to connect with TLS. Use MQTT_PORT 8883
+# With TLS, every reconnect is a full handshake: TLS session resumption does nothing on the device (no sessions in its ssl)
 MQTT_CLIENTID = "plasma_1"  # Unique ID for this device, with no spaces
 MQTT_NAME = "Plasma 1"  # Friendly name, as displayed in Home Assistant UIs
 
 MQTT_DISCOVERY_PREFIX = "homeassistant"  # default for home assistant
+ANNOUNCE_JITTER_MS = 3000  # Answer Home Assistant coming online after a random delay up to this, so a fleet doesn't all announce at once
+SCENE_DIR = "scenes"  # Directory on flash for scene files from tools/scene_compiler.py, each listed as an effect
+RAW_PALETTE_SLOTS = 4  # Palettes that can be uploaded to the raw topic for indexed frames (see raw_frames.py), 768 bytes each
+HTTP_PORT = None  # Port for the local HTTP API (see http_api.py), e.g. 80. Unauthenticated, so off unless set
+HTTP_BUFFER_SIZE = 1024  # Largest HTTP request accepted, in bytes
+
+LOG_LEVEL = "INFO"  # Console log level: "DEBUG", "INFO", "WARNING", "ERROR" or "OFF"
+LOG_RING_LEVEL = "INFO"  # Level of records kept in RAM, published to <state topic>/log on a message to <state topic>/log/dump
+LOG_RING_SIZE = 32  # Number of recent log records kept in RAM
+
+TRACE_FILE = None  # Set to a file name, e.g. "commands.trace", to record every incoming MQTT message for tools/replay.py
+TRACE_MAX_BYTES = 65536  # Recording stops once the trace file reaches this size
+STALL_CHECK_MS = 20  # How often the stall detector checks the event loop is still keeping time
+STALL_THRESHOLD_MS = 100  # Event loop stalls at least this long are reported over MQTT
 
 # Add your MQTT username and password here
 # You can use a Home Assistant user account!
@@ -0,0 +1,48 @@
+# HomeAssistant Plasma - capture.py
+# (c) 2024 Snapcase
+# Compact binary frame capture, written by the output layer to a file (host simulator) or a socket (device), and read
+# back by tools/capture_tool.py.
+#
+# Format, little endian:
+#   header  "PLCP", u8 version, u8 bytes per pixel (3), u16 LED count, u32 reserved     (12 bytes)
+#   frames  u32 ticks_ms, then r, g, b per LED                                            (4 + 3 * LEDs bytes each)
+# Every frame record is the same size, so frame i starts at HEADER_SIZE + i * record size and large captures can be
+# memory-mapped and indexed without reading them in.
+
+import struct
+import time
+
+MAGIC = b"PLCP"
+VERSION = 1
+HEADER_FORMAT = "<4sBBHI"
+HEADER_SIZE = 12
+
+
+def record_size(num_leds):
+    return 4 + num_leds * 3
+
+
+def read_header(data):
+    """Return the LED count from a capture header, raising ValueError if it isn't one."""
+    magic, version, pixel_bytes, num_leds, _ = struct.unpack_from(HEADER_FORMAT, data, 0)
+    if magic != MAGIC or version != VERSION or pixel_bytes != 3:
+        raise ValueError("Not a version 1 frame capture")
+    return num_leds
+
+
+class CaptureWriter:
+    def __init__(self, stream, num_leds):
+        self.stream = stream
+        self.num_leds = num_leds
+        self.frames = 0
+        self.stamp = bytearray(4)
+        stream.write(struct.pack(HEADER_FORMAT, MAGIC, VERSION, 3, num_leds, 0))
+
+    def write(self, buffer):
+        struct.pack_into("<I", self.stamp, 0, time.ticks_ms())
+        self.stream.write(self.stamp)
+        self.stream.write(buffer)
+        self.frames += 1
+
+    def close(self):
+        self.stream.close()
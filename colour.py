@@ -0,0 +1,131 @@
+# HomeAssistant Plasma - colour.py
+# (c) 2024 Snapcase
+# The light's colour in each of the Home Assistant colour modes it supports, converted with integer maths:
+#   hs          hue 0-360 degrees, saturation 0-100 %
+#   rgb         r, g, b 0-255, at full brightness (brightness is set separately)
+#   color_temp  white from MIN_MIREDS (6500K) to MAX_MIREDS (2000K), interpolated in a 17 entry table
+# Hue is handled in 1/256ths of a colour wheel sector and saturation out of 256, so the only float work is turning the
+# numbers from Home Assistant's JSON into integers, once per command.
+
+MODES = ["hs", "rgb", "color_temp"]
+MIN_MIREDS = 153
+MAX_MIREDS = 500
+
+# r, g, b of black body white at 17 even steps from MIN_MIREDS to MAX_MIREDS
+_WHITES = bytes((
+    255, 255, 251, 255, 241, 229, 255, 230, 209, 255, 219, 191, 255, 210, 174, 255, 201, 158,
+    255, 193, 143, 255, 186, 128, 255, 179, 114, 255, 173, 101, 255, 167, 88, 255, 161, 75,
+    255, 156, 62, 255, 151, 50, 255, 146, 38, 255, 141, 26, 255, 137, 14,
+))
+
+
+@micropython.native
+def hs_to_rgb(hue, saturation):
+    """[r, g, b] at full brightness for a hue in degrees and a saturation in %."""
+    wheel = int(hue * 64) % 23040 * 1536 // 23040  # 1/64ths of a degree, to 0-1535 round the wheel
+    saturation = int(saturation * 256) // 100
+    if saturation <= 0:
+        return [255, 255, 255]
+    if saturation > 256:
+        saturation = 256
+
+    sector = wheel >> 8
+    fractional = wheel & 255
+    p = 255 * (256 - saturation) >> 8
+    q = 255 * (256 - (saturation * fractional >> 8)) >> 8
+    t = 255 * (256 - (saturation * (256 - fractional) >> 8)) >> 8
+
+    if sector == 0:
+        return [255, t, p]
+    elif sector == 1:
+        return [q, 255, p]
+    elif sector == 2:
+        return [p, 255, t]
+    elif sector == 3:
+        return [p, q, 255]
+    elif sector == 4:
+        return [t, p, 255]
+    return [255, p, q]
+
+
+@micropython.native
+def rgb_to_hs(r, g, b):
+    """(hue in degrees, saturation in %) of an r, g, b colour, worked out in hundredths."""
+    high = max(r, g, b)
+    delta = high - min(r, g, b)
+    if delta == 0:
+        return 0, 0
+
+    if high == r:
+        hue = (6000 * (g - b) // delta + 36000) % 36000
+    elif high == g:
+        hue = 6000 * (b - r) // delta + 12000
+    else:
+        hue = 6000 * (r - g) // delta + 24000
+    return hue / 100, (10000 * delta // high) / 100
+
+
+@micropython.native
+def color_temp_to_rgb(mireds):
+    """[r, g, b] at full brightness of white at a colour temperature in mireds."""
+    if mireds < MIN_MIREDS:
+        mireds = MIN_MIREDS
+    if mireds > MAX_MIREDS:
+        mireds = MAX_MIREDS
+    position = (int(mireds) - MIN_MIREDS) * 4096 // (MAX_MIREDS - MIN_MIREDS)  # 16 steps of 256
+    step = position >> 8
+    fractional = position & 255
+    c = step * 3
+    if step == 16:
+        return [_WHITES[c], _WHITES[c + 1], _WHITES[c + 2]]
+    return [_WHITES[c + k] + ((_WHITES[c + 3 + k] - _WHITES[c + k]) * fractional >> 8) for k in range(3)]
+
+
+class Colour:
+    """
+    The colour as Home Assistant last set it, in whichever mode it used. The r, g, b it converts to, the equivalent
+    hue and saturation (for effects that take those), and the r, g, b at the last brightness asked for are each worked
+    out once and kept until the colour changes.
+    """
+
+    def __init__(self):
+        self.mode = "hs"
+        self.value = (0, 0)  # (hue, saturation), (r, g, b) or mireds, depending on mode
+        self._rgb = None
+        self._hs = None
+        self._level = -1
+        self._scaled = None
+
+    def set(self, mode, value):
+        """Set the colour, returning False if it was already that."""
+        if mode == self.mode and value == self.value:
+            return False
+        self.mode = mode
+        self.value = value
+        self._rgb = None
+        self._hs = None
+        self._level = -1
+        return True
+
+    def rgb(self):
+        if self._rgb is None:
+            if self.mode == "hs":
+                self._rgb = hs_to_rgb(self.value[0], self.value[1])
+            elif self.mode == "rgb":
+                self._rgb = list(self.value)
+            else:
+                self._rgb = color_temp_to_rgb(self.value)
+        return self._rgb
+
+    def hs(self):
+        if self._hs is None:
+            self._hs = self.value if self.mode == "hs" else rgb_to_hs(*self.rgb())
+        return self._hs
+
+    def scaled(self, brightness):
+        """[r, g, b] at a brightness of 0-255."""
+        brightness = int(brightness)
+        if brightness != self._level:
+            self._scaled = [c * brightness // 255 for c in self.rgb()]
+            self._level = brightness
+        return self._scaled
@@ -0,0 +1,77 @@
+# HomeAssistant Plasma - command_trace.py
+# (c) 2024 Snapcase
+# Records every incoming MQTT message with its arrival time to a trace file, so field problems (slider storms, Home
+# Assistant restarts, effect flapping) can be replayed against the simulator or a device with tools/replay.py.
+#
+# Trace format, one message per line:  <ms since the first message>\t<topic>\t<payload>
+# Topics under this device's own base topic are written as "~/..." so a trace can be replayed against any device.
+
+import time
+
+import log
+import stall
+
+try:
+    import config_local as CONFIG
+except ImportError:
+    import CONFIG
+
+BASE_TOPIC = f"{CONFIG.MQTT_DISCOVERY_PREFIX}/light/{CONFIG.MQTT_CLIENTID}"
+
+_FLUSH = stall.Region("trace.flush")
+
+
+class CommandTrace:
+    def __init__(self, path=None, max_bytes=None):
+        self.path = path or CONFIG.TRACE_FILE
+        self.max_bytes = max_bytes or CONFIG.TRACE_MAX_BYTES
+        self.file = None
+        self.start = None
+        self.size = 0
+        self.dirty = False
+        if self.path:
+            self.file = open(self.path, "w")
+            log.info("Recording MQTT messages to %s", self.path)
+
+    def record(self, topic, msg):
+        if self.file is None:
+            return
+        now = time.ticks_ms()
+        if self.start is None:
+            self.start = now
+        if topic.startswith(BASE_TOPIC):
+            topic = "~" + topic[len(BASE_TOPIC):]
+        line = f"{time.ticks_diff(now, self.start)}\t{topic}\t{msg.replace(chr(10), ' ')}\n"
+
+        self.size += len(line)
+        if self.size > self.max_bytes:
+            log.warning("Trace file %s full, recording stopped", self.path)
+            self.close()
+            return
+        self.file.write(line)
+        self.dirty = True
+
+    def flush(self):
+        # Called periodically rather than after every message, so a storm of commands isn't a storm of flash writes
+        if self.file and self.dirty:
+            with _FLUSH:
+                self.file.flush()
+            self.dirty = False
+
+    def close(self):
+        if self.file:
+            self.file.close()
+            self.file = None
+
+
+def read(path, base_topic=BASE_TOPIC):
+    """Yield (ms, topic, payload) from a trace file, with "~" expanded to base_topic."""
+    with open(path) as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if not line or line.startswith("#"):
+                continue
+            ms, topic, msg = line.split("\t", 2)
+            if topic.startswith("~"):
+                topic = base_topic + topic[1:]
+            yield int(ms), topic, msg
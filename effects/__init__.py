@@ -0,0 +1,27 @@
+# HomeAssistant Plasma - effects/__init__.py
+# Effect manifest. Importing this is cheap: it names every effect and the module implementing it, so discovery can
+# list effects without loading them. Each module is only imported when its effect is selected (see Effects.load).
+#
+# Effect modules define: async def run(fx, state, brightness, hue, saturation)
+# where fx is the Effects instance, giving access to the transition engine and colour helpers,
+# and FPS / FADE_STEPS: the most frames a second the effect needs rendered, and how many visible steps a fade needs.
+
+# Effect name: (module in this package, or None for built in, supports setting a colour in HS mode)
+MANIFEST = {
+    "None": (None, True),
+    "Storm": ("storm", False),
+    "Rain": ("rain", False),
+    "Clouds": ("clouds", False),
+    "Snow": ("snow", False),
+    "Sun": ("sun", False),
+    "Sky": ("sky", False),
+    "Chaser": ("chaser", True),
+    "Sparkles": ("sparkles", True),
+    "Fire": ("fire", False),
+    "Rainbow": ("rainbow", False),
+    "Stream": ("stream", False),
+}
+
+# Effects chosen by the device rather than from Home Assistant (the raw topic selects Stream). They aren't offered in
+# discovery, and the light state is saved with the effect before them, as they mean nothing after a restart.
+TRANSIENT = ("Stream",)
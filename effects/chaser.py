@@ -0,0 +1,46 @@
+# HomeAssistant Plasma - effects/chaser.py
+# Chaser - a light of the selected colour running along the strip, with a fading tail
+
+import asyncio
+
+import colour
+import log
+
+FPS = 30
+FADE_STEPS = 64
+
+DEFAULT_COLOUR = colour.Colour()
+DEFAULT_COLOUR.set("hs", (50, 80))
+
+
+async def run(fx, state, brightness, hue, saturation):
+    fx.engine.duration_ms = 2000  # how quickly the light fades to black
+    frame_speed = 150  # how fast the light moves
+    brightness = min(max(brightness, 30), 255)  # Min & Max brightness for this effect, to stay within working strip range
+
+    log.debug("Chaser Brightness: %s, colour: %s", brightness, fx.colour.value)
+
+    if state:
+        r, g, b = fx.colour.rgb()
+        tint = DEFAULT_COLOUR if r == g == b else fx.colour  # White shows as the effect's own colour
+
+        chaser_rgb = tint.scaled(brightness * brightness // 255)  # Brightness applied twice, so the light is dimmer than the colour
+
+        background_rgb = [0, 0, 0]
+
+        log.debug("Chaser RGB: %s", chaser_rgb)
+        fx.engine.fill_target(background_rgb)
+        current_led = 0
+
+        while state:
+            if current_led < fx.num_leds:
+                fx.engine.set_current(current_led, chaser_rgb)
+
+            if current_led <= fx.num_leds:
+                current_led = (current_led + 1)
+            else:
+                current_led = 0
+
+            await asyncio.sleep_ms(frame_speed)
+    else:
+        await fx.static_effect(0, 0, 0, state)
@@ -0,0 +1,44 @@
+# HomeAssistant Plasma - effects/clouds.py
+# Clouds - partly cloudy, with highlights and lowlights drifting smoothly along the strip
+
+from array import array
+
+import asyncio
+
+import kernels
+import log
+import palettes
+
+FPS = 10
+FADE_STEPS = 8
+
+
+async def run(fx, state, brightness, hue, saturation):
+
+    cloud_colour = [165, 168, 138]  # partly cloudy
+    brightness = min(max(brightness, 10), 230)  # Min & Max brightness for this effect, to stay within working strip range
+
+    frame_speed = 100  # Every frame is rendered here, with no fades in between
+
+    highlight = [x + 40 for x in cloud_colour]
+    lowlight = [x - 40 for x in cloud_colour]
+
+    log.debug("Clouds Effect: State: %s, brightness: %s, cloud_colour: %s", state, brightness, cloud_colour)
+    log.debug("highlight: %s, lowlight: %s", highlight, lowlight)
+
+    if state:
+        # Mostly the plain cloud colour, shading to lowlights and highlights at the extremes of the noise
+        palette = palettes.gradient(((0, lowlight), (104, cloud_colour), (150, cloud_colour), (255, highlight)), brightness)
+        tables = palettes.tables(palette, palettes.noise())
+        params = array("i", [0] * kernels.F_SIZE)
+        params[kernels.F_COUNT] = fx.num_leds
+        params[kernels.F_STEP1] = 1100
+        params[kernels.F_STEP2] = 400
+
+        while state:
+            params[kernels.F_OFFSET1] = (params[kernels.F_OFFSET1] + 40) & 0xFFFF  # Drifting
+            params[kernels.F_OFFSET2] = (params[kernels.F_OFFSET2] + 15) & 0xFFFF  # and slowly changing shape
+            fx.engine.render_palette(tables, params)
+            await asyncio.sleep_ms(frame_speed)
+    else:
+        await fx.static_effect(0, 0, 0, False)
@@ -0,0 +1,34 @@
+# HomeAssistant Plasma - effects/fire.py
+# Fire - flickering flames, from a fire palette and two octaves of noise drifting against each other
+
+from array import array
+
+import asyncio
+
+import kernels
+import log
+import palettes
+
+FPS = 30
+FADE_STEPS = 32
+
+
+async def run(fx, state, brightness, hue, saturation):
+    frame_speed = 33  # Every frame is rendered here, with no fades in between
+    brightness = min(max(brightness, 30), 255)  # Min & Max brightness for this effect, to stay within working strip range
+
+    log.debug("Fire Effect: State: %s, brightness: %s", state, brightness)
+    if state:
+        tables = palettes.tables(palettes.gradient(palettes.FIRE, brightness), palettes.noise())
+        params = array("i", [0] * kernels.F_SIZE)
+        params[kernels.F_COUNT] = fx.num_leds
+        params[kernels.F_STEP1] = 2400  # Small flames
+        params[kernels.F_STEP2] = 700  # Larger, slower bands of heat
+
+        while state:
+            params[kernels.F_OFFSET1] = (params[kernels.F_OFFSET1] + 900) & 0xFFFF  # Fast flicker
+            params[kernels.F_OFFSET2] = (params[kernels.F_OFFSET2] - 250) & 0xFFFF  # Slow drift the other way
+            fx.engine.render_palette(tables, params)
+            await asyncio.sleep_ms(frame_speed)
+    else:
+        await fx.static_effect(0, 0, 0, False)
@@ -0,0 +1,35 @@
+# HomeAssistant Plasma - effects/rain.py
+# Rain - splodgy blues
+
+from random import randrange, uniform
+
+import asyncio
+
+import log
+
+FPS = 15
+FADE_STEPS = 32
+
+
+async def run(fx, state, brightness, hue, saturation):
+    # splodgy blues
+
+    fx.engine.duration_ms = 3000
+    frame_speed = 200  # time between colour updates
+    brightness = min(max(brightness, 10), 255)  # Min & Max brightness for this effect, to stay within range
+
+    raindrop_chance = 0.01  # moderate rain
+
+    background = fx.scale_brightness([0, 15, 60], brightness)
+
+    log.debug("Rain Effect: State: %s, brightness: %s, raindrop_chance: %s", state, brightness, raindrop_chance)
+    if state:
+        while state:
+            for i in range(fx.num_leds):
+                if raindrop_chance > uniform(0, 1):
+                    fx.engine.set_current(i, fx.scale_brightness([randrange(0, 50), randrange(20, 100), randrange(50, 255)], brightness))
+                else:
+                    fx.engine.set_target(i, background)
+            await asyncio.sleep_ms(frame_speed)
+    else:
+        await fx.static_effect(0, 0, 0, False)
@@ -0,0 +1,32 @@
+# HomeAssistant Plasma - effects/rainbow.py
+# Rainbow - the colour wheel spread along the strip, slowly rotating
+
+from array import array
+
+import asyncio
+
+import kernels
+import log
+import palettes
+
+FPS = 20
+FADE_STEPS = 32
+
+
+async def run(fx, state, brightness, hue, saturation):
+    frame_speed = 50  # Every frame is rendered here, with no fades in between
+    brightness = min(max(brightness, 10), 255)  # Min & Max brightness for this effect, to stay within range
+
+    log.debug("Rainbow Effect: State: %s, brightness: %s", state, brightness)
+    if state:
+        tables = palettes.tables(palettes.hue_wheel(fx.hsv_to_rgb, brightness), palettes.ramp())
+        params = array("i", [0] * kernels.F_SIZE)
+        params[kernels.F_COUNT] = fx.num_leds
+        params[kernels.F_STEP1] = params[kernels.F_STEP2] = 0x10000 // fx.num_leds  # Once round the wheel along the strip
+
+        while state:
+            params[kernels.F_OFFSET1] = params[kernels.F_OFFSET2] = (params[kernels.F_OFFSET1] + 160) & 0xFFFF  # About 20s a turn
+            fx.engine.render_palette(tables, params)
+            await asyncio.sleep_ms(frame_speed)
+    else:
+        await fx.static_effect(0, 0, 0, False)
@@ -0,0 +1,65 @@
+# HomeAssistant Plasma - effects/scene.py
+# Scenes - precomputed looks from scene files (see scenes.py), streamed from flash a record at a time through one
+# buffer, so a long multi-frame scene needs no more RAM than its largest record.
+# fx.scene is the file to play.
+
+import gc
+import struct
+import time
+
+import asyncio
+
+import log
+import raw_frames
+import scenes
+
+FPS = 30
+FADE_STEPS = 32
+
+
+async def run(fx, state, brightness, hue, saturation):
+    if not state:
+        await fx.static_effect(0, 0, 0, False)
+        return
+
+    gc.collect()
+    free = gc.mem_free()
+    lowest = free
+    start = time.ticks_ms()
+    recalled = False
+    try:
+        with open(fx.scene, "rb") as f:
+            flags, num_leds, frames, largest = scenes.read_header(f.read(scenes.HEADER_SIZE))
+            if num_leds != fx.num_leds:
+                log.warning("Scene %s is for %s LEDs, the strip has %s", fx.scene, num_leds, fx.num_leds)
+            buffer = bytearray(largest)
+            view = memoryview(buffer)
+            record = bytearray(scenes.RECORD_SIZE)
+            loop_start = None  # Where the first frame starts, after any palettes
+
+            while True:
+                offset = f.tell()
+                if f.readinto(record) < scenes.RECORD_SIZE:
+                    if not flags & scenes.LOOP or loop_start is None:
+                        break
+                    f.seek(loop_start)
+                    await asyncio.sleep_ms(0)  # A scene with no holds must still let the rest of the loop run
+                    continue
+                length, hold_ms = struct.unpack(scenes.RECORD_FORMAT, record)
+                if length > largest or f.readinto(view[:length]) < length:
+                    raise ValueError("truncated record")
+                if loop_start is None and raw_frames.is_frame(buffer):
+                    loop_start = offset
+                fx.raw_frames.decode(buffer, brightness, length)
+
+                if not recalled:
+                    lowest = min(lowest, gc.mem_free())
+                if hold_ms:
+                    if not recalled:
+                        recalled = True
+                        fx.scene_ms = time.ticks_diff(time.ticks_ms(), start)
+                        fx.scene_bytes = free - lowest
+                        log.info("Scene %s: %s frames, first shown in %sms, %s bytes heap", fx.scene, frames, fx.scene_ms, fx.scene_bytes)
+                    await asyncio.sleep_ms(hold_ms)
+    except (OSError, ValueError) as e:
+        log.warning("Scene %s can't be played: %s", fx.scene, e)
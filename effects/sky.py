@@ -0,0 +1,29 @@
+# HomeAssistant Plasma - effects/sky.py
+# Sky - sky blues
+
+from random import randrange
+
+import asyncio
+
+import log
+
+FPS = 10
+FADE_STEPS = 8
+
+
+async def run(fx, state, brightness, hue, saturation):
+    # sky blues
+    frame_speed = 700
+    fx.engine.duration_ms = frame_speed
+
+    brightness = min(max(brightness, 10), 230)  # Min & Max brightness for this effect, to stay within range
+
+    log.debug("Sky Effect: State: %s, brightness: %s", state, brightness)
+    if state:
+        while state:
+            for i in range(fx.num_leds):
+                fx.engine.set_target(i, fx.scale_brightness([randrange(0, 40), randrange(130, 190), randrange(170, 220)], brightness))
+
+            await asyncio.sleep_ms(frame_speed)
+    else:
+        await fx.static_effect(0, 0, 0, False)
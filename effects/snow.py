@@ -0,0 +1,38 @@
+# HomeAssistant Plasma - effects/snow.py
+# Snow - splodgy whites
+
+from random import uniform
+
+import asyncio
+
+import log
+
+FPS = 15
+FADE_STEPS = 24
+
+
+async def run(fx, state, brightness, hue, saturation):
+    # splodgy whites
+    fx.engine.duration_ms = 1200
+    frame_speed = 200  # time between colour updates
+    brightness = min(max(brightness, 10), 255)  # Min & Max brightness for this effect, to stay within range
+
+    snowflake_chance = 0.003  # moderate snow
+
+    snowflake = fx.scale_brightness([227, 227, 227], brightness)
+    backdrop = fx.scale_brightness([54, 54, 54], brightness)
+
+    log.debug("Snow Effect: State: %s, brightness: %s, snowflake_chance: %s", state, brightness, snowflake_chance)
+    if state:
+
+        while state:
+            for i in range(fx.num_leds):
+                if snowflake_chance > uniform(0, 1):
+                    # paint a snowflake (use current rather than target, for an abrupt change to the drop colour)
+                    fx.engine.set_current(i, snowflake)
+                else:
+                    # paint backdrop
+                    fx.engine.set_target(i, backdrop)
+            await asyncio.sleep_ms(frame_speed)
+    else:
+        await fx.static_effect(0, 0, 0, False)
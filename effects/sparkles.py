@@ -0,0 +1,45 @@
+# HomeAssistant Plasma - effects/sparkles.py
+# Sparkles - twinkles of the selected colour over a dimmed background
+
+from random import uniform
+
+import asyncio
+
+import colour
+import log
+
+FPS = 20
+FADE_STEPS = 32
+
+DEFAULT_COLOUR = colour.Colour()
+DEFAULT_COLOUR.set("hs", (50, 80))
+
+
+async def run(fx, state, brightness, hue, saturation):
+    fx.engine.duration_ms = 1500  # how long a sparkle takes to fade in and out
+    frame_speed = 200
+    sparkle_frequency = 0.005
+    brightness = min(max(brightness, 30), 255)  # Min & Max brightness for this effect, to stay within working strip range
+
+    log.debug("Sparkles Brightness: %s, colour: %s", brightness, fx.colour.value)
+
+    if state:
+        r, g, b = fx.colour.rgb()
+        tint = DEFAULT_COLOUR if r == g == b else fx.colour  # White shows as the effect's own colour
+
+        sparkle_rgb = tint.scaled(brightness)
+        background_rgb = tint.scaled(brightness * 3 // 10)
+
+        log.debug("Sparkles Background RGB: %s, sparkle_rgb: %s", background_rgb, sparkle_rgb)
+        fx.engine.fill_target(background_rgb)
+
+        while state:
+            for i in range(fx.num_leds):
+                if sparkle_frequency > uniform(0, 1):
+                    fx.engine.set_target(i, sparkle_rgb)
+                if fx.engine.is_settled(i):
+                    fx.engine.set_target(i, background_rgb)
+
+            await asyncio.sleep_ms(frame_speed)
+    else:
+        await fx.static_effect(0, 0, 0, state)
@@ -0,0 +1,41 @@
+# HomeAssistant Plasma - effects/storm.py
+# Storm - rain with the odd lightning flash
+
+from random import randrange, uniform
+
+import asyncio
+
+import log
+
+FPS = 20
+FADE_STEPS = 32
+
+
+async def run(fx, state, brightness, hue, saturation):
+    fx.engine.duration_ms = 1000
+    frame_speed = 300  # time between colour updates
+    brightness = min(max(brightness, 10), 255)
+    lightning_chance = 0.02
+    raindrop_chance = 0.05
+    background = fx.scale_brightness([1, 30, 120], brightness)
+    lightning = fx.scale_brightness([255, 255, 255], brightness)
+
+    log.debug("Storm Effect. State: %s, brightness: %s, lightning: %s, background: %s", state, brightness, lightning, background)
+
+    while state:
+
+        for i in range(fx.num_leds):
+            if raindrop_chance > uniform(0, 1):
+                fx.engine.set_current(i, fx.scale_brightness([randrange(0, 50), randrange(50, 100), randrange(100, 255)], brightness))
+            else:
+                fx.engine.set_target(i, background)
+
+        if lightning_chance > uniform(0, 1):
+            for x in range(fx.num_leds):
+                fx.engine.set_current(x, lightning)
+
+            # await asyncio.sleep_ms(500)
+
+        await asyncio.sleep_ms(frame_speed)
+
+    await fx.static_effect(0, 0, 0, False)
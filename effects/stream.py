@@ -0,0 +1,11 @@
+# HomeAssistant Plasma - effects/stream.py
+# Stream - frames pushed over MQTT to the raw topic (see raw_frames.py). The effect draws nothing itself; it is
+# selected when the first frame arrives, so no other effect draws over the frames.
+
+FPS = 30
+FADE_STEPS = 32
+
+
+async def run(fx, state, brightness, hue, saturation):
+    if not state:
+        await fx.static_effect(0, 0, 0, False)
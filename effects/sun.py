@@ -0,0 +1,28 @@
+# HomeAssistant Plasma - effects/sun.py
+# Sun - shimmering yellow
+
+from random import randrange
+
+import asyncio
+
+import log
+
+FPS = 10
+FADE_STEPS = 8
+
+
+async def run(fx, state, brightness, hue, saturation):
+    # shimmering yellow
+    frame_speed = 425
+    fx.engine.duration_ms = frame_speed
+
+    brightness = min(max(brightness, 40), 255)  # Min & Max brightness for this effect, to stay within yellow range
+
+    log.debug("Sun Effect: State: %s, brightness: %s, duration_ms: %s, frame_speed: %s", state, brightness, fx.engine.duration_ms, frame_speed)
+    if state:
+        while True:
+            for i in range(fx.num_leds):
+                fx.engine.set_target(i, fx.scale_brightness([randrange(220, 255), randrange(220, 255), randrange(50, 90)], brightness))
+            await asyncio.sleep_ms(frame_speed)
+    else:
+        await fx.static_effect(0, 0, 0, False)
@@ -0,0 +1,226 @@
+# HomeAssistant Plasma - http_api.py
+# (c) 2024 Snapcase
+# Small HTTP API on the local network, so the light can still be controlled when the MQTT broker is down. It has no
+# authentication, so it only runs when HTTP_PORT is set.
+# Commands go through the same path as MQTT /set commands, and the new state is published to MQTT when connected.
+#
+#   GET  /state     Light state, as published to the MQTT state topic
+#   POST /state     Light command, the same JSON as the MQTT /set topic, e.g. {"state": "ON", "brightness": 120}
+#   GET  /effects   {"effect_list": [...]}
+#   GET  /metrics   Uptime, memory, render rate, power estimate, event loop stalls, TLS handshakes, scene recall, request counts
+#
+# Each request is read into a buffer of HTTP_BUFFER_SIZE bytes, taken from a pool and reused, and parsed in place: no
+# header strings or dicts. A connection has _READ_TIMEOUT_MS to send its whole request and is closed otherwise; only
+# then is the request handled, one at a time, so an idle connection can't hold up the others. At most
+# _MAX_CONNECTIONS are open at once, from reading to response, so there are never more buffers than that; any more are
+# closed straight away. Per request, only the command body is copied out for json.loads, and the response
+# body is built with json.dumps, as for MQTT messages.
+
+import gc
+import time
+
+import asyncio
+import ujson as json
+from micropython import const
+
+import log
+import stall
+
+try:
+    import config_local as CONFIG
+except ImportError:
+    import CONFIG
+
+_READ_TIMEOUT_MS = const(2000)
+_MAX_CONNECTIONS = const(4)
+
+_HEADER_END = b"\r\n\r\n"
+_CONTENT_LENGTH = b"content-length:"  # Compared against header bytes with the ASCII lowercase bit set
+
+_STATUS = {
+    200: b"HTTP/1.0 200 OK\r\nContent-Type: application/json\r\nConnection: close\r\n\r\n",
+    400: b"HTTP/1.0 400 Bad Request\r\nContent-Type: application/json\r\nConnection: close\r\n\r\n",
+    404: b"HTTP/1.0 404 Not Found\r\nContent-Type: application/json\r\nConnection: close\r\n\r\n",
+    405: b"HTTP/1.0 405 Method Not Allowed\r\nContent-Type: application/json\r\nConnection: close\r\n\r\n",
+    413: b"HTTP/1.0 413 Payload Too Large\r\nContent-Type: application/json\r\nConnection: close\r\n\r\n",
+}
+_ERRORS = {
+    400: b'{"error": "bad request"}',
+    404: b'{"error": "not found"}',
+    405: b'{"error": "method not allowed"}',
+    413: b'{"error": "request too large"}',
+}
+
+
+def _find(buffer, pattern, start, end):
+    """Index of pattern in buffer[start:end], or -1, without slicing."""
+    size = len(pattern)
+    first = pattern[0]
+    for i in range(start, end - size + 1):
+        if buffer[i] == first:
+            k = 1
+            while k < size and buffer[i + k] == pattern[k]:
+                k += 1
+            if k == size:
+                return i
+    return -1
+
+
+def _equals(buffer, start, end, literal):
+    if end - start != len(literal):
+        return False
+    for k in range(end - start):
+        if buffer[start + k] != literal[k]:
+            return False
+    return True
+
+
+class HttpApi:
+    def __init__(self, stick, port=None, buffer_size=None):
+        self.stick = stick
+        self.port = port or CONFIG.HTTP_PORT
+        self.buffer_size = buffer_size or CONFIG.HTTP_BUFFER_SIZE
+        self.buffers = []  # Request buffers free for the next connection
+        self.connections = 0  # Open connections, each holding a buffer until it is closed
+        self.lock = asyncio.Lock()  # Requests are handled one after the other, once read
+        self.requests = 0
+        self.errors = 0
+        self.server = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, "0.0.0.0", self.port)
+        log.info("HTTP API listening on port %s", self.port)
+
+    async def handle(self, reader, writer):
+        if self.connections >= _MAX_CONNECTIONS:
+            self.errors += 1
+            writer.close()
+            await writer.wait_closed()
+            return
+        self.connections += 1
+        buffer = self.buffers.pop() if self.buffers else bytearray(self.buffer_size)
+        try:
+            try:
+                request = await asyncio.wait_for(self._read(reader, buffer), _READ_TIMEOUT_MS / 1000)
+            except asyncio.TimeoutError:
+                log.warning("HTTP API: No complete request within %sms, closing", _READ_TIMEOUT_MS)
+                self.errors += 1
+                return
+
+            async with self.lock:
+                try:
+                    status, body = await self._respond(buffer, request)
+                except Exception as e:
+                    log.warning("HTTP API: Bad request: %s", e)
+                    status, body = 400, None
+            self.requests += 1
+            if status != 200:
+                self.errors += 1
+                body = _ERRORS[status]
+            try:
+                writer.write(_STATUS[status])
+                writer.write(body)
+                await writer.drain()
+            except OSError as e:
+                log.warning("HTTP API: Response not sent: %s", e)
+        finally:
+            self.buffers.append(buffer)
+            self.connections -= 1
+            writer.close()
+            await writer.wait_closed()
+
+    async def _read(self, reader, buffer):
+        """Read the request into buffer. Returns (header end, body end), or None if it doesn't fit or is cut short."""
+        view = memoryview(buffer)
+        size = len(buffer)
+        length = 0
+        header_end = -1
+        while header_end < 0:
+            if length == size:
+                return None
+            n = await reader.readinto(view[length:])
+            if not n:
+                return None
+            header_end = _find(buffer, _HEADER_END, max(length - 3, 0), length + n)
+            length += n
+        header_end += len(_HEADER_END)
+
+        # Content-Length, if there is one, says how much body follows the headers
+        body_length = 0
+        line = _find(buffer, b"\r\n", 0, header_end) + 2
+        while line < header_end - 2:
+            k = 0
+            while k < len(_CONTENT_LENGTH) and buffer[line + k] | 0x20 == _CONTENT_LENGTH[k]:
+                k += 1
+            if k == len(_CONTENT_LENGTH):
+                i = line + k
+                while buffer[i] == 32:
+                    i += 1
+                while 48 <= buffer[i] <= 57:
+                    body_length = body_length * 10 + buffer[i] - 48
+                    i += 1
+                break
+            line = _find(buffer, b"\r\n", line, header_end) + 2
+
+        body_end = header_end + body_length
+        if body_end > size:
+            return None
+        while length < body_end:
+            n = await reader.readinto(view[length:body_end])
+            if not n:
+                return None
+            length += n
+        return header_end, body_end
+
+    async def _respond(self, buffer, request):
+        if request is None:
+            return 413, None
+        header_end, body_end = request
+
+        if _equals(buffer, 0, 4, b"GET "):
+            post = False
+            path = 4
+        elif _equals(buffer, 0, 5, b"POST "):
+            post = True
+            path = 5
+        else:
+            return 405, None
+        path_end = _find(buffer, b" ", path, header_end)
+        query = _find(buffer, b"?", path, path_end)
+        if query >= 0:
+            path_end = query
+
+        if _equals(buffer, path, path_end, b"/state"):
+            if post:
+                command = json.loads(bytes(memoryview(buffer)[header_end:body_end]))
+                if not isinstance(command, dict):
+                    return 400, None
+                await self.stick.apply_command(command)
+            return 200, json.dumps(self.stick.state_payload())
+        if post:
+            return 405, None
+        if _equals(buffer, path, path_end, b"/effects"):
+            return 200, json.dumps({"effect_list": self.stick.strip_controller.effects.offered})
+        if _equals(buffer, path, path_end, b"/metrics"):
+            return 200, json.dumps(self.metrics())
+        return 404, None
+
+    def metrics(self):
+        controller = self.stick.strip_controller
+        elapsed_ms = max(time.ticks_diff(time.ticks_ms(), controller.render_start), 1)
+        return {
+            "uptime_ms": time.ticks_ms(),
+            "mem_free": gc.mem_free(),
+            "effect": controller.effect,
+            "render_fps": controller.render_frames * 1000 // elapsed_ms,
+            "power_ma": controller.power.drawn_ma,
+            "power_requested_ma": controller.power.requested_ma,
+            "stalls": stall.stall_count,
+            "stall_histogram": stall.histogram_dict(),
+            "mqtt_connected": self.stick.mqtt_client is not None,
+            "tls": self.stick.tls.metrics() if self.stick.tls else None,
+            "scene_ms": controller.effects.scene_ms,
+            "scene_bytes": controller.effects.scene_bytes,
+            "http_requests": self.requests,
+            "http_errors": self.errors,
+        }
@@ -0,0 +1,332 @@
+# HomeAssistant Plasma - kernels.py
+# (c) 2024 Snapcase
+# Per-frame hot loops over flat byte buffers: transition (fade toward target), scale (brightness LUT), pack (driver layout),
+# palette_fill (palette and noise table lookups) and raw_fill (binary frames received over MQTT).
+# On the device these are @micropython.viper functions working through ptr8/ptr16/ptr32. The pure-Python *_ref versions
+# are the specification: they run on the host simulator, and tools/check_kernels.py checks both give byte-identical
+# output, on the device and, running the viper source as plain Python, on the host.
+# Viper functions take at most 4 arguments, so scalars for transition(), palette_fill() and raw_fill() travel in params
+# arrays, along with any tables they need.
+
+import sys
+
+from micropython import const
+
+# Layout of the params array('i') passed to transition()
+P_COUNT = const(0)  # Number of pixels
+P_NOW = const(1)  # ticks_ms for this frame
+P_DURATION = const(2)  # Transition duration in ms
+P_DELTA = const(3)  # Out: change in the sum of all channel values over this frame
+P_EASE = const(4)  # 257-entry easing table (0..1024) starts here
+P_SIZE = const(261)
+
+# Layout of the params array('i') passed to palette_fill(). Positions are in 1/256ths of a noise table entry.
+F_COUNT = const(0)  # Number of pixels
+F_STEP1 = const(1)  # Distance between pixels in the first noise octave
+F_OFFSET1 = const(2)  # Where pixel 0 is in the first octave, 0..0xFFFF
+F_STEP2 = const(3)  # Second octave
+F_OFFSET2 = const(4)
+F_SIZE = const(5)
+
+PALETTE_SIZE = const(768)  # tables for palette_fill(): 256 r, g, b palette entries, then a 256 entry noise table
+
+# Layout of the params array('i') passed to raw_fill()
+R_ENCODING = const(0)  # RAW_RGB, RAW_RLE or RAW_INDEXED
+R_COUNT = const(1)  # Number of pixels
+R_FIRST = const(2)  # First pixel to write
+R_START = const(3)  # Where the pixel data starts in the message
+R_LENGTH = const(4)  # Length of the message
+R_LUT = const(5)  # 256-entry brightness table, for RAW_RGB and RAW_RLE
+R_PALETTE = const(261)  # 256 r, g, b palette entries through the brightness table, for RAW_INDEXED
+R_SIZE = const(1029)
+
+RAW_RGB = const(0)  # r, g, b per pixel
+RAW_RLE = const(1)  # Runs of count, r, g, b
+RAW_INDEXED = const(2)  # One palette index per pixel
+
+_TICKS_MASK = const(0x3FFFFFFF)
+
+
+def layout(order="RGB", stride=3, fill=0):
+    """Describe a driver's byte layout for pack(): channel order, bytes per pixel (3 or 4) and the value of the spare byte."""
+    lead = stride - 3
+    return (lead + order.index("R")) | (lead + order.index("G")) << 2 | (lead + order.index("B")) << 4 | stride << 8 | fill << 16
+
+
+def brightness_lut(level, lut=None):
+    """Table mapping a channel value to value * level / 255. Fills lut in place if one is given."""
+    if lut is None:
+        lut = bytearray(256)
+    for i in range(256):
+        lut[i] = i * level // 255
+    return lut
+
+
+def transition_ref(current, ends, start_ms, params):
+    """
+    Move every pixel along its transition. current holds r, g, b per pixel; ends holds the start r, g, b then the
+    target r, g, b per pixel; start_ms holds when each transition began. Returns the number of pixels still moving.
+    """
+    now = params[P_NOW]
+    duration = params[P_DURATION]
+    moving = 0
+    delta = 0
+    for i in range(params[P_COUNT]):
+        c = i * 3
+        e = i * 6
+        if current[c] == ends[e + 3] and current[c + 1] == ends[e + 4] and current[c + 2] == ends[e + 5]:
+            continue
+
+        elapsed = (now - start_ms[i]) & _TICKS_MASK
+        if elapsed >= duration:
+            progress = 1024
+        else:
+            moving += 1
+            progress = params[P_EASE + (elapsed << 8) // duration]
+
+        for k in range(3):
+            start = ends[e + k]
+            value = start + ((ends[e + 3 + k] - start) * progress >> 10)
+            delta += value - current[c + k]
+            current[c + k] = value
+
+    params[P_DELTA] = delta
+    return moving
+
+
+def scale_ref(dst, src, lut, n):
+    for i in range(n):
+        dst[i] = lut[src[i]]
+
+
+def pack_ref(dst, src, n, layout):
+    r = layout & 3
+    g = (layout >> 2) & 3
+    b = (layout >> 4) & 3
+    stride = (layout >> 8) & 0xF
+    fill = (layout >> 16) & 0xFF
+    spare = 6 - r - g - b
+    o = 0
+    s = 0
+    for i in range(n):
+        dst[o + r] = src[s]
+        dst[o + g] = src[s + 1]
+        dst[o + b] = src[s + 2]
+        if stride == 4:
+            dst[o + spare] = fill
+        o += stride
+        s += 3
+
+
+def palette_fill_ref(current, ends, tables, params):
+    """
+    Render a whole frame by table lookup: each pixel's palette index is the average of two positions in the noise
+    table. Writes the frame to current and as both the start and target in ends, so the transition engine treats
+    every pixel as settled. Returns the sum of all channel values in the frame.
+    """
+    step1 = params[F_STEP1]
+    step2 = params[F_STEP2]
+    position1 = params[F_OFFSET1]
+    position2 = params[F_OFFSET2]
+    total = 0
+    for i in range(params[F_COUNT]):
+        index = (tables[PALETTE_SIZE + ((position1 >> 8) & 0xFF)] + tables[PALETTE_SIZE + ((position2 >> 8) & 0xFF)]) >> 1
+        position1 += step1
+        position2 += step2
+        p = index * 3
+        c = i * 3
+        e = i * 6
+        for k in range(3):
+            value = tables[p + k]
+            current[c + k] = value
+            ends[e + k] = value
+            ends[e + 3 + k] = value
+            total += value
+    return total
+
+
+def raw_fill_ref(current, ends, data, params):
+    """
+    Decode the pixel data of a raw frame message into pixels from R_FIRST on. Like palette_fill, each pixel is written
+    to current and as both the start and target in ends, so it shows straight away and stays. Decoding stops at the
+    end of the strip or of the message; a trailing partial pixel or run is ignored. Returns the change in the sum of
+    all channel values.
+    """
+    encoding = params[R_ENCODING]
+    count = params[R_COUNT]
+    length = params[R_LENGTH]
+    i = params[R_FIRST]
+    s = params[R_START]
+    delta = 0
+    while i < count:
+        if encoding == RAW_INDEXED:
+            if s >= length:
+                break
+            p = R_PALETTE + data[s] * 3
+            r = params[p]
+            g = params[p + 1]
+            b = params[p + 2]
+            run = 1
+            s += 1
+        else:
+            run = 1
+            if encoding == RAW_RLE:
+                if s + 4 > length:
+                    break
+                run = data[s]
+                s += 1
+            elif s + 3 > length:
+                break
+            r = params[R_LUT + data[s]]
+            g = params[R_LUT + data[s + 1]]
+            b = params[R_LUT + data[s + 2]]
+            s += 3
+        while run > 0 and i < count:
+            c = i * 3
+            e = i * 6
+            delta += r + g + b - current[c] - current[c + 1] - current[c + 2]
+            current[c] = r
+            current[c + 1] = g
+            current[c + 2] = b
+            ends[e] = r
+            ends[e + 1] = g
+            ends[e + 2] = b
+            ends[e + 3] = r
+            ends[e + 4] = g
+            ends[e + 5] = b
+            i += 1
+            run -= 1
+    return delta
+
+
+transition = transition_ref
+scale = scale_ref
+pack = pack_ref
+palette_fill = palette_fill_ref
+raw_fill = raw_fill_ref
+
+if sys.implementation.name == "micropython":
+    @micropython.viper
+    def transition(current: ptr8, ends: ptr8, start_ms: ptr32, params: ptr32) -> int:
+        now = params[P_NOW]
+        duration = params[P_DURATION]
+        moving = 0
+        delta = 0
+        for i in range(params[P_COUNT]):
+            c = i * 3
+            e = i * 6
+            if current[c] == ends[e + 3] and current[c + 1] == ends[e + 4] and current[c + 2] == ends[e + 5]:
+                continue
+
+            elapsed = (now - start_ms[i]) & _TICKS_MASK
+            if elapsed >= duration:
+                progress = 1024
+            else:
+                moving += 1
+                progress = params[P_EASE + (elapsed << 8) // duration]
+
+            for k in range(3):
+                start = ends[e + k]
+                value = start + ((ends[e + 3 + k] - start) * progress >> 10)
+                delta += value - current[c + k]
+                current[c + k] = value
+
+        params[P_DELTA] = delta
+        return moving
+
+    @micropython.viper
+    def scale(dst: ptr8, src: ptr8, lut: ptr8, n: int):
+        for i in range(n):
+            dst[i] = lut[src[i]]
+
+    @micropython.viper
+    def pack(dst: ptr8, src: ptr8, n: int, layout: int):
+        r = layout & 3
+        g = (layout >> 2) & 3
+        b = (layout >> 4) & 3
+        stride = (layout >> 8) & 0xF
+        fill = (layout >> 16) & 0xFF
+        spare = 6 - r - g - b
+        o = 0
+        s = 0
+        for i in range(n):
+            dst[o + r] = src[s]
+            dst[o + g] = src[s + 1]
+            dst[o + b] = src[s + 2]
+            if stride == 4:
+                dst[o + spare] = fill
+            o += stride
+            s += 3
+
+    @micropython.viper
+    def palette_fill(current: ptr8, ends: ptr8, tables: ptr8, params: ptr32) -> int:
+        step1 = params[F_STEP1]
+        step2 = params[F_STEP2]
+        position1 = params[F_OFFSET1]
+        position2 = params[F_OFFSET2]
+        total = 0
+        for i in range(params[F_COUNT]):
+            index = (tables[PALETTE_SIZE + ((position1 >> 8) & 0xFF)] + tables[PALETTE_SIZE + ((position2 >> 8) & 0xFF)]) >> 1
+            position1 += step1
+            position2 += step2
+            p = index * 3
+            c = i * 3
+            e = i * 6
+            for k in range(3):
+                value = tables[p + k]
+                current[c + k] = value
+                ends[e + k] = value
+                ends[e + 3 + k] = value
+                total += value
+        return total
+
+    @micropython.viper
+    def raw_fill(current: ptr8, ends: ptr8, data: ptr8, params: ptr32) -> int:
+        encoding = params[R_ENCODING]
+        count = params[R_COUNT]
+        length = params[R_LENGTH]
+        i = params[R_FIRST]
+        s = params[R_START]
+        delta = 0
+        r = 0
+        g = 0
+        b = 0
+        while i < count:
+            if encoding == RAW_INDEXED:
+                if s >= length:
+                    break
+                p = R_PALETTE + data[s] * 3
+                r = params[p]
+                g = params[p + 1]
+                b = params[p + 2]
+                run = 1
+                s += 1
+            else:
+                run = 1
+                if encoding == RAW_RLE:
+                    if s + 4 > length:
+                        break
+                    run = data[s]
+                    s += 1
+                elif s + 3 > length:
+                    break
+                r = params[R_LUT + data[s]]
+                g = params[R_LUT + data[s + 1]]
+                b = params[R_LUT + data[s + 2]]
+                s += 3
+            while run > 0 and i < count:
+                c = i * 3
+                e = i * 6
+                delta += r + g + b - current[c] - current[c + 1] - current[c + 2]
+                current[c] = r
+                current[c + 1] = g
+                current[c + 2] = b
+                ends[e] = r
+                ends[e + 1] = g
+                ends[e + 2] = b
+                ends[e + 3] = r
+                ends[e + 4] = g
+                ends[e + 5] = b
+                i += 1
+                run -= 1
+        return delta
@@ -60,12 +60,16 @@ class MQTTClient:
         self.lw_qos = qos
         self.lw_retain = retain
 
-    def connect(self, clean_session=True):
-        self.sock = socket.socket()
-        addr = socket.getaddrinfo(self.server, self.port)[0][-1]
-        self.sock.connect(addr)
-        if self.ssl:
-            self.sock = self.ssl.wrap_socket(self.sock, server_hostname=self.server)
+    def connect(self, clean_session=True, sock=None):
+        # Local change: sock, a connection already set up (e.g. TLS handshaken without blocking), is used as it is
+        if sock is not None:
+            self.sock = sock
+        else:
+            self.sock = socket.socket()
+            addr = socket.getaddrinfo(self.server, self.port)[0][-1]
+            self.sock.connect(addr)
+            if self.ssl:
+                self.sock = self.ssl.wrap_socket(self.sock, server_hostname=self.server)
         premsg = bytearray(b"\x10\0\0\0\0\0")
         msg = bytearray(b"\x04MQTT\x04\x02\0\0")
 
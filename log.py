@@ -0,0 +1,102 @@
+# HomeAssistant Plasma - log.py
+# (c) 2024 Snapcase
+# Leveled logging that costs nothing when a level is off, plus a fixed-size ring buffer of recent records.
+#
+# Messages use % style arguments, only formatted when a record is kept or printed, never for a level that is off:
+#     log.info("Effect: %s", effect)
+# On hot paths, guard the call so not even the argument tuple is built when the level is off:
+#     if log.DEBUG_ON:
+#         log.debug("set_state: %s %s", state, brightness)
+#
+# The ring buffer keeps the last LOG_RING_SIZE records at LOG_RING_LEVEL or above, for dumping over MQTT. Each is
+# formatted as it is added, so it holds no references to the arguments: they can be freed, and a dump shows the values
+# as they were when logged, not as they are by then.
+
+import time
+
+from micropython import const
+
+try:
+    import config_local as CONFIG
+except ImportError:
+    import CONFIG
+
+DEBUG = const(10)
+INFO = const(20)
+WARNING = const(30)
+ERROR = const(40)
+OFF = const(100)
+
+LEVELS = {"DEBUG": DEBUG, "INFO": INFO, "WARNING": WARNING, "ERROR": ERROR, "OFF": OFF}
+_NAMES = {DEBUG: "DEBUG", INFO: "INFO", WARNING: "WARNING", ERROR: "ERROR"}
+
+console_level = OFF
+ring_level = OFF
+
+# Whether anything is listening at each level, for guarding hot call sites
+DEBUG_ON = False
+INFO_ON = False
+
+_ring = [None] * CONFIG.LOG_RING_SIZE
+_ring_next = 0
+_ring_count = 0
+
+
+def set_level(console, ring=None):
+    global console_level, ring_level, DEBUG_ON, INFO_ON
+    console_level = LEVELS[console] if isinstance(console, str) else console
+    if ring is not None:
+        ring_level = LEVELS[ring] if isinstance(ring, str) else ring
+    lowest = min(console_level, ring_level)
+    DEBUG_ON = lowest <= DEBUG
+    INFO_ON = lowest <= INFO
+
+
+def _format(msg, args):
+    if args:
+        try:
+            return msg % args
+        except (TypeError, ValueError):
+            return f"{msg} {args}"
+    return msg
+
+
+def _log(level, msg, args):
+    global _ring_next, _ring_count
+    text = None
+    if level >= ring_level:
+        text = _format(msg, args)
+        _ring[_ring_next] = (time.ticks_ms(), level, text)
+        _ring_next = (_ring_next + 1) % len(_ring)
+        _ring_count = min(_ring_count + 1, len(_ring))
+    if level >= console_level:
+        print(_NAMES[level], text if text is not None else _format(msg, args))
+
+
+def debug(msg, *args):
+    if DEBUG_ON:
+        _log(DEBUG, msg, args)
+
+
+def info(msg, *args):
+    if INFO_ON:
+        _log(INFO, msg, args)
+
+
+def warning(msg, *args):
+    _log(WARNING, msg, args)
+
+
+def error(msg, *args):
+    _log(ERROR, msg, args)
+
+
+def records():
+    """Yield the ring buffer, oldest first, as formatted lines."""
+    start = (_ring_next - _ring_count) % len(_ring)
+    for i in range(_ring_count):
+        ticks, level, text = _ring[(start + i) % len(_ring)]
+        yield f"{ticks} {_NAMES[level]} {text}"
+
+
+set_level(CONFIG.LOG_LEVEL, CONFIG.LOG_RING_LEVEL)
@@ -6,7 +6,10 @@
 # For Pimoroni Plasma Stick 2040W https://shop.pimoroni.com/products/plasma-stick-2040-w?variant=40359072301139
 # Suppports home assistant MQTT discovery. Edit Config.py with your WiFi information and an MQTT broker connected to Home Assistant.  https://www.home-assistant.io/integrations/mqtt/
 
+import hashlib
+import random
 import sys
+import time
 
 import asyncio
 import ujson as json
@@ -14,20 +17,57 @@ from machine import Pin
 from micropython import const
 from umqtt.simple import MQTTClient
 
-from strip_controller import StripController
-
 try:
     import config_local as CONFIG
+    import CONFIG as _DEFAULTS
+
+    # Settings added since config_local.py was written keep their defaults. Done before the modules below import it.
+    for _key in dir(_DEFAULTS):
+        if not hasattr(CONFIG, _key):
+            setattr(CONFIG, _key, getattr(_DEFAULTS, _key))
 except ImportError:
     import CONFIG
 
+import colour
+import log
+import raw_frames
+import stall
+from command_trace import CommandTrace
+from http_api import HttpApi
+from strip_controller import StripController, in_range
+from tls import TlsContext
+
 from network_manager import NetworkManager
 
 STATE_TOPIC = f'{CONFIG.MQTT_DISCOVERY_PREFIX}/light/{CONFIG.MQTT_CLIENTID}'
 COMMAND_TOPIC = f'{CONFIG.MQTT_DISCOVERY_PREFIX}/light/{CONFIG.MQTT_CLIENTID}/set'
 AVAILABILITY_TOPIC = f"{CONFIG.MQTT_DISCOVERY_PREFIX}/light/{CONFIG.MQTT_CLIENTID}/available"
+LOG_TOPIC = f"{CONFIG.MQTT_DISCOVERY_PREFIX}/light/{CONFIG.MQTT_CLIENTID}/log"
+LOG_DUMP_TOPIC = f"{CONFIG.MQTT_DISCOVERY_PREFIX}/light/{CONFIG.MQTT_CLIENTID}/log/dump"
+POWER_TOPIC = f"{CONFIG.MQTT_DISCOVERY_PREFIX}/light/{CONFIG.MQTT_CLIENTID}/power"
+STALL_TOPIC = f"{CONFIG.MQTT_DISCOVERY_PREFIX}/light/{CONFIG.MQTT_CLIENTID}/stall"
+RAW_TOPIC = f"{CONFIG.MQTT_DISCOVERY_PREFIX}/light/{CONFIG.MQTT_CLIENTID}/raw"
+CONFIG_TOPIC = f"{CONFIG.MQTT_DISCOVERY_PREFIX}/light/{CONFIG.MQTT_CLIENTID}/config"
+POWER_CONFIG_TOPIC = f"{CONFIG.MQTT_DISCOVERY_PREFIX}/sensor/{CONFIG.MQTT_CLIENTID}/power/config"
+
+# Groups the light and its diagnostic sensors under one device in Home Assistant
+DEVICE = {
+    "identifiers": [CONFIG.MQTT_CLIENTID],
+    "name": CONFIG.MQTT_NAME,
+    "manufacturer": "Pimoroni",
+    "model": "Plasma Stick 2040 W",
+}
 
 RECONNECT_DELAY = const(10)
+_RETAINED_WAIT_MS = const(1000)  # Longest wait after subscribing for our retained discovery configs to come back
+_STREAM_BACKLOG = const(8)  # Raw frames held while the Stream effect starts, e.g. the parts of a long strip's first frame
+
+# umqtt.simple calls that block the event loop: DNS and TCP connect, and waiting for SUBACK / PUBACK on QoS 1
+_MQTT_CONNECT = stall.Region("mqtt.connect")
+_MQTT_SUBSCRIBE = stall.Region("mqtt.subscribe")
+_MQTT_PUBLISH = stall.Region("mqtt.publish")
+_MQTT_CHECK = stall.Region("mqtt.check_msg")
+_MQTT_PING = stall.Region("mqtt.ping")
 
 
 class HomeAssistantPlasmaStick:
@@ -35,67 +75,96 @@ class HomeAssistantPlasmaStick:
         self.strip_controller = StripController()
         self.network_manager = NetworkManager(CONFIG.WIFI_COUNTRY, status_handler=self.wifi_status_handler, error_handler=self.wifi_error_handler, client_timeout=15)
         self.mqtt_client = None
+        self.trace = CommandTrace()
+        self.power_reported = time.ticks_ms()
+        self.raw_frames = self.strip_controller.effects.raw_frames
+        self.stream_backlog = None  # Raw frames to show once the Stream effect has started, None unless it's starting
+        self.discovery = self.discovery_payloads()
+        self.retained = {}  # Hash of each discovery config as last seen retained on the broker, by topic
+        self.http_api = HttpApi(self) if CONFIG.HTTP_PORT else None
+        self.tls = TlsContext() if CONFIG.MQTT_CA_FILE else None  # Created once, kept across reconnects
 
         self.pico_led = Pin('LED', Pin.OUT)  # set up the Pico W's onboard LED
         self.pico_led.value(True)  # Turn on LED to indiciate initilization started
 
+    async def status_effect(self, r, g, b):
+        # If a saved light state was restored at power-on, leave it on the strip; the Pico LED still shows connection status
+        if not self.strip_controller.restored:
+            await self.strip_controller.effects.status_effect(r, g, b)
+
     async def wifi_status_handler(self, mode, status, ip):
-        print('Attempting WiFi Connection')
-        print(f"WiFi Status Handler: mode={mode}, status={status}, ip={ip}")
+        log.info('Attempting WiFi Connection')
+        log.debug("WiFi Status Handler: mode=%s, status=%s, ip=%s", mode, status, ip)
         self.pico_led.value(True)
-        await self.strip_controller.effects.status_effect(0, 0, 128)
+        await self.status_effect(0, 0, 128)
         await asyncio.sleep(2)
 
         if status is True:
-            print(f'Wifi connect status: {status}')
+            log.info('Wifi connect status: %s', status)
 
-            await self.strip_controller.effects.status_effect(0, 0, 255)
+            await self.status_effect(0, 0, 255)
             await asyncio.sleep_ms(500)
-            await self.strip_controller.effects.status_effect(0, 0, 0)
+            await self.status_effect(0, 0, 0)
             self.pico_led.value(False)
 
         elif status is False:
-            print(f'Wifi not connected: {status}')
+            log.warning('Wifi not connected: %s', status)
             self.pico_led.value(True)
-            await self.strip_controller.effects.status_effect(64, 0, 0)
+            await self.status_effect(64, 0, 0)
 
         else:
-            print(f"Waiting for connection: {status}")
+            log.info("Waiting for connection: %s", status)
 
-            await self.strip_controller.effects.status_effect(0, 0, 64)
+            await self.status_effect(0, 0, 64)
             await asyncio.sleep(2)
 
     async def wifi_error_handler(self, mode, message):
-        print(f"Wifi Error: {mode}: {message}")
+        log.error("Wifi Error: %s: %s", mode, message)
         self.pico_led.value(True)
 
-        await self.strip_controller.effects.status_effect(128, 0, 0)
+        await self.status_effect(128, 0, 0)
         await asyncio.sleep(RECONNECT_DELAY)
         while not self.network_manager.isconnected():
-            print("Attempting to reconnect to Wifi..")
+            log.info("Attempting to reconnect to Wifi..")
             await self.network_manager.client(CONFIG.WIFI_SSID, CONFIG.WIFI_PSK)
             await asyncio.sleep(RECONNECT_DELAY)
 
     async def mqtt_connect(self):
         self.pico_led.value(True)
-        await self.strip_controller.effects.status_effect(0, 64, 0)
+        await self.status_effect(0, 64, 0)
         while self.mqtt_client is None:
-            print('MQTT: Init MQTT Client')
+            log.info('MQTT: Init MQTT Client')
             mqtt_client = MQTTClient(CONFIG.MQTT_CLIENTID, CONFIG.MQTT_SERVER, CONFIG.MQTT_PORT, CONFIG.MQTT_USER, CONFIG.MQTT_PASSWORD, 60)
             mqtt_client.set_last_will(AVAILABILITY_TOPIC, "false")
             mqtt_client.set_callback(self.mqtt_callback)  # Set callback before connecting
             try:
-                mqtt_client.connect()
-                print('MQTT: Connected, subscribing to MQTT topics')
-                mqtt_client.subscribe(f"{CONFIG.MQTT_DISCOVERY_PREFIX}/status", qos=1)
-                mqtt_client.subscribe(COMMAND_TOPIC, qos=1)
+                sock = None
+                if self.tls:
+                    with _MQTT_CONNECT:
+                        sock = self.tls.open(CONFIG.MQTT_SERVER, CONFIG.MQTT_PORT)
+                    sock = await self.tls.handshake(sock, CONFIG.MQTT_SERVER)  # Yields to the event loop as it goes
+                with _MQTT_CONNECT:
+                    mqtt_client.connect(sock=sock)
+                if self.tls:
+                    self.tls.keep_session(mqtt_client.sock)
+                log.info('MQTT: Connected, subscribing to MQTT topics')
+                self.retained.clear()
+                with _MQTT_SUBSCRIBE:
+                    # Our own retained discovery configs come back first, so mqtt_announce can skip unchanged ones
+                    mqtt_client.subscribe(CONFIG_TOPIC, qos=0)
+                    mqtt_client.subscribe(POWER_CONFIG_TOPIC, qos=0)
+                    mqtt_client.subscribe(f"{CONFIG.MQTT_DISCOVERY_PREFIX}/status", qos=1)
+                    mqtt_client.subscribe(COMMAND_TOPIC, qos=1)
+                    mqtt_client.subscribe(LOG_DUMP_TOPIC, qos=0)
+                    mqtt_client.subscribe(RAW_TOPIC, qos=0)
+                await self.wait_retained(mqtt_client)
                 self.mqtt_client = mqtt_client
                 await self.mqtt_announce()
 
                 # Flash green to indicate connection:
-                await self.strip_controller.effects.status_effect(0, 128, 0)
+                await self.status_effect(0, 128, 0)
                 await asyncio.sleep_ms(750)
-                await self.strip_controller.effects.status_effect(0, 0, 0)
+                await self.status_effect(0, 0, 0)
 
                 for _ in range(5):
                     await asyncio.sleep_ms(100)
@@ -103,31 +172,50 @@ class HomeAssistantPlasmaStick:
                     await asyncio.sleep_ms(100)
                     self.pico_led.value(False)
 
-                print('MQTT: Ready')
+                log.info('MQTT: Ready')
 
             except OSError as e:
-                print(f'MQTT connection failed: {e}. Trying again in 15 seconds')
-                await self.strip_controller.effects.status_effect(128, 64, 0)
+                log.warning('MQTT connection failed: %s. Trying again in 15 seconds', e)
+                await self.status_effect(128, 64, 0)
                 await asyncio.sleep_ms(500)
-                await self.strip_controller.effects.status_effect(64, 32, 0)
+                await self.status_effect(64, 32, 0)
 
                 self.mqtt_client = None
                 await asyncio.sleep(10)
 
-    def mqtt_broadcast_state(self):
-        print("MQTT: Update light state")
-        print(f"MQTT Update: Effect: {self.strip_controller.effect}")
+    async def wait_retained(self, mqtt_client):
+        """
+        Poll for our retained discovery configs, which the broker sends some time after the SUBACK, until all have come
+        back or _RETAINED_WAIT_MS is up, so mqtt_announce compares against what the broker really holds. The wait only
+        runs its full length when some config isn't retained yet, e.g. on the very first connect.
+        """
+        start = time.ticks_ms()
+        while len(self.retained) < len(self.discovery) and time.ticks_diff(time.ticks_ms(), start) < _RETAINED_WAIT_MS:
+            with _MQTT_CHECK:
+                mqtt_client.check_msg()
+            await asyncio.sleep_ms(10)
+        if log.DEBUG_ON:
+            log.debug("MQTT: %s of %s discovery configs retained on the broker", len(self.retained), len(self.discovery))
+
+    def state_payload(self):
+        """The light state in Home Assistant's JSON schema, as published to STATE_TOPIC and served by GET /state."""
         if self.strip_controller.effect in self.strip_controller.effects.colour_effects:  # Effect supports colours - Static or Sparkles
             state = {
                 "state": "ON" if self.strip_controller.state else "OFF",
                 "effect": "EFFECT_OFF" if self.strip_controller.effect == "None" else self.strip_controller.effect,
                 "brightness": round(self.strip_controller.brightness),
-                "color_mode": "hs",
-                "color": {
+            }
+            current = self.strip_controller.effects.colour
+            state["color_mode"] = current.mode
+            if current.mode == "rgb":
+                state["color"] = {"r": current.value[0], "g": current.value[1], "b": current.value[2]}
+            elif current.mode == "color_temp":
+                state["color_temp"] = current.value
+            else:
+                state["color"] = {
                     "h": round(self.strip_controller.hue),
                     "s": round(self.strip_controller.saturation),
                 }
-            }
         else:
             state = {
                 "state": "ON" if self.strip_controller.state else "OFF",
@@ -135,124 +223,293 @@ class HomeAssistantPlasmaStick:
                 "brightness": round(self.strip_controller.brightness),
                 "color_mode": "brightness",
             }
+        return state
 
-        print("MQTT State update: {}".format(state))
-        self.mqtt_client.publish(STATE_TOPIC, json.dumps(state), qos=1)
+    def mqtt_broadcast_state(self):
+        if log.DEBUG_ON:
+            log.debug("MQTT: Update light state. Effect: %s", self.strip_controller.effect)
+        state = self.state_payload()
+        if log.DEBUG_ON:
+            log.debug("MQTT State update: %s", state)
+        with _MQTT_PUBLISH:
+            self.mqtt_client.publish(STATE_TOPIC, json.dumps(state), qos=1)
 
     def mqtt_callback(self, topic, msg):
         topic = topic.decode('utf-8')
+        if topic == CONFIG_TOPIC or topic == POWER_CONFIG_TOPIC:
+            self.retained[topic] = hashlib.sha256(msg).digest()
+            return
+        if topic == RAW_TOPIC:
+            self.raw_message(msg)  # Binary, decoded as it is
+            return
         msg = msg.decode('utf-8')
-        print(f"MQTT Subscribed Message Received:  {topic}, message: {msg}")
+        if log.DEBUG_ON:
+            log.debug("MQTT Subscribed Message Received:  %s, message: %s", topic, msg)
+        self.trace.record(topic, msg)
 
         loop = asyncio.get_event_loop()
         loop.create_task(self.process_incoming_message(topic, msg))
 
     async def process_incoming_message(self, topic, msg):
         if topic == f"{CONFIG.MQTT_DISCOVERY_PREFIX}/status" and msg == "online":
-            print("Home assistant is back online, announce auto discovery")
-            await self.mqtt_announce()
+            log.info("Home assistant is back online, announce auto discovery")
+            await self.mqtt_announce(CONFIG.ANNOUNCE_JITTER_MS)
         elif topic == COMMAND_TOPIC:
-            command = json.loads(msg)
-            print(f"Set command received: {command}")
-            state = None
-            hue = None
-            saturation = None
-            brightness = None
-            effect = None
-
             try:
-                state_command = command['state']
-                if state_command == "ON":
-                    state = True
-                if state_command == "OFF":
-                    state = False
-                print(f"State: {state}")
-            except KeyError:
-                pass
+                await self.apply_command(json.loads(msg))
+            except ValueError as e:
+                log.warning("MQTT: Ignoring command %s: %s", msg, e)
+        elif topic == LOG_DUMP_TOPIC:
+            self.mqtt_dump_log()
+
+    def raw_message(self, msg):
+        controller = self.strip_controller
+        if not raw_frames.is_frame(msg):
+            self.show_raw(msg)  # Palettes are kept whatever the light is doing
+        elif not controller.state:
+            if log.DEBUG_ON:
+                log.debug("MQTT: Ignoring raw frame, the light is off")
+        elif self.stream_backlog is not None:
+            if len(self.stream_backlog) < _STREAM_BACKLOG:
+                self.stream_backlog.append(msg)
+        elif controller.effect != "Stream":
+            self.stream_backlog = [msg]
+            asyncio.get_event_loop().create_task(self.start_stream())
+        else:
+            self.show_raw(msg)
 
-            try:
-                color_command = command['color']
+    def show_raw(self, msg):
+        try:
+            self.raw_frames.decode(msg, self.strip_controller.brightness)
+        except ValueError as e:
+            log.warning("MQTT: Bad raw message: %s", e)
+
+    async def start_stream(self):
+        # Switch to the Stream effect first, so the effect that was running can't draw over the frames
+        try:
+            await self.apply_command({"effect": "Stream"})
+            if self.strip_controller.state:  # Unless switched off meanwhile
+                for msg in self.stream_backlog:
+                    self.show_raw(msg)
+        finally:
+            self.stream_backlog = None
+
+    def check_command(self, command):
+        """Raise ValueError unless every field of a light command has the type and range Home Assistant would send."""
+        if not isinstance(command, dict):
+            raise ValueError("command is not an object")
+        if "state" in command and command["state"] not in ("ON", "OFF"):
+            raise ValueError("state must be ON or OFF")
+        if "brightness" in command and not in_range(command["brightness"], 0, 255, True):
+            raise ValueError("brightness must be an integer 0-255")
+        if "transition" in command and not in_range(command["transition"], 0, 3600):
+            raise ValueError("transition must be 0-3600 seconds")
+        if "effect" in command and command["effect"] not in self.strip_controller.effects.effect_list:
+            raise ValueError("unknown effect")
+        if "color_temp" in command and not in_range(command["color_temp"], colour.MIN_MIREDS, colour.MAX_MIREDS):
+            raise ValueError(f"color_temp must be {colour.MIN_MIREDS}-{colour.MAX_MIREDS} mireds")
+        if "color" in command:
+            color = command["color"]
+            if not isinstance(color, dict):
+                raise ValueError("color is not an object")
+            if "h" in color:
+                if not (in_range(color["h"], 0, 360) and in_range(color.get("s"), 0, 100)):
+                    raise ValueError("color needs h 0-360 and s 0-100")
+            elif not all(in_range(color.get(k), 0, 255, True) for k in "rgb"):
+                raise ValueError("color needs h and s, or r, g and b as integers 0-255")
+
+    async def apply_command(self, command):
+        """
+        Apply a light command in Home Assistant's JSON schema, from MQTT or the HTTP API, and publish the new state.
+        Raises ValueError, changing nothing, if the command isn't valid.
+        """
+        if log.DEBUG_ON:
+            log.debug("Set command received: %s", command)
+        self.check_command(command)
+        state = None
+        hue = None
+        saturation = None
+        rgb = None
+        color_temp = None
+        brightness = None
+        effect = None
+        transition = None
+
+        try:
+            state_command = command['state']
+            if state_command == "ON":
+                state = True
+            if state_command == "OFF":
+                state = False
+        except KeyError:
+            pass
+
+        try:
+            color_command = command['color']
+            if 'h' in color_command:
                 hue = color_command['h']
                 saturation = color_command['s']
-                print(f"Hue: {hue}, Sat: {saturation}")
-            except KeyError:
-                pass
+            else:
+                rgb = (color_command['r'], color_command['g'], color_command['b'])
+        except KeyError:
+            pass
 
-            try:
-                brightness = command['brightness']
-                print(f"Brightness: = {brightness}")
-            except KeyError:
-                pass
+        try:
+            color_temp = command['color_temp']
+        except KeyError:
+            pass
+
+        try:
+            brightness = command['brightness']
+        except KeyError:
+            pass
+
+        try:
+            effect = command['effect']
+        except KeyError:
+            pass
 
+        try:
+            transition = command['transition']
+        except KeyError:
+            pass
+
+        if log.DEBUG_ON:
+            log.debug("Parsed command, updating led state. State: %s, hue: %s, sat: %s, rgb: %s, color_temp: %s, brightness: %s, effect: %s, transition: %s",
+                      state, hue, saturation, rgb, color_temp, brightness, effect, transition)
+        await self.strip_controller.set_state(brightness=brightness, state=state, hue=hue, saturation=saturation, effect=effect, transition=transition,
+                                              rgb=rgb, color_temp=color_temp)
+        if self.mqtt_client:  # Commands over HTTP still work while the broker is down
             try:
-                effect = command['effect']
-                print(f"Effect: {effect}")
-            except KeyError:
-                pass
-
-            print("Parsed command, updating led state")
-            await self.strip_controller.set_state(brightness=brightness, state=state, hue=hue, saturation=saturation, effect=effect)
-            self.mqtt_broadcast_state()
-
-    async def mqtt_announce(self):
-        print('Announce MQTT Config')
-        payload = {
-            "name": CONFIG.MQTT_NAME,
+                self.mqtt_broadcast_state()
+            except OSError as e:
+                log.warning("MQTT: State publish failed: %s", e)  # The main loop notices the lost connection and reconnects
+
+    def mqtt_dump_log(self):
+        # One message per record, QoS 0 so a long dump doesn't wait on a PUBACK for each line
+        for record in log.records():
+            self.mqtt_client.publish(LOG_TOPIC, record)
+
+    def mqtt_report_power(self):
+        self.mqtt_client.publish(POWER_TOPIC, json.dumps(self.strip_controller.power.report()))
+        self.power_reported = time.ticks_ms()
+
+    def mqtt_report_stalls(self):
+        stalls = stall.pending[:]
+        stall.pending.clear()
+        report = {"stalls": stalls, "count": stall.stall_count, "dropped": stall.dropped, "histogram": stall.histogram_dict()}
+        self.mqtt_client.publish(STALL_TOPIC, json.dumps(report))
+
+    def discovery_payloads(self):
+        """(topic, payload, sha256 digest) of each discovery config, serialized once as they don't change at runtime."""
+        availability = {
+            "payload_not_available": "false",
+            "payload_available": "true",
+            "topic": AVAILABILITY_TOPIC
+        }
+        light = {
+            "name": None,  # Use the device name, MQTT_NAME
+            "device": DEVICE,
             "schema": "json",
             "qos": 1,
             "unique_id": CONFIG.MQTT_CLIENTID,
             "brightness": True,
             "brightness_scale": 255,
-            "supported_color_modes": ["hs"],
+            "supported_color_modes": colour.MODES,
+            "min_mireds": colour.MIN_MIREDS,
+            "max_mireds": colour.MAX_MIREDS,
+            "transition": True,
             "state_topic": f"homeassistant/light/{CONFIG.MQTT_CLIENTID}",
             "command_topic": f"homeassistant/light/{CONFIG.MQTT_CLIENTID}/set",
             "retain": True,
             "effect": True,
-            "effect_list": list(self.strip_controller.effects.effects.keys()),  # list of effects from Effects class
+            "effect_list": self.strip_controller.effects.offered,  # list of effects from the effects manifest, and scenes
             # "availability_mode": "any",
-            "availability": {
-                "payload_not_available": "false",
-                "payload_available": "true",
-                "topic": AVAILABILITY_TOPIC
-            }
+            "availability": availability
         }
-        print(f"MQTT Discovery Announce: Topic: {CONFIG.MQTT_DISCOVERY_PREFIX}/light/{CONFIG.MQTT_CLIENTID}/config, Payload {json.dumps(payload)}")
-        self.mqtt_client.publish(f"{CONFIG.MQTT_DISCOVERY_PREFIX}/light/{CONFIG.MQTT_CLIENTID}/config", json.dumps(payload), qos=1)
-        await asyncio.sleep(1)  # Home Assistant sometimes needs a moment before it's ready for the rest
-
-        print("MQTT Setting Available to True")
-        self.mqtt_client.publish(AVAILABILITY_TOPIC, "true", qos=1)
+        # Estimated current draw, peak since the last report, with the requested draw and frames limited as attributes
+        power = {
+            "name": "Current",
+            "device": DEVICE,
+            "unique_id": f"{CONFIG.MQTT_CLIENTID}_power",
+            "state_topic": POWER_TOPIC,
+            "value_template": "{{ value_json.current }}",
+            "json_attributes_topic": POWER_TOPIC,
+            "unit_of_measurement": "mA",
+            "device_class": "current",
+            "state_class": "measurement",
+            "entity_category": "diagnostic",
+            "availability": availability
+        }
+        discovery = []
+        for topic, payload in ((CONFIG_TOPIC, light), (POWER_CONFIG_TOPIC, power)):
+            payload = json.dumps(payload).encode()
+            discovery.append((topic, payload, hashlib.sha256(payload).digest()))
+        return discovery
+
+    async def mqtt_announce(self, jitter_ms=0):
+        if jitter_ms:
+            # Every device on the broker hears Home Assistant come online at the same moment; spread the answers out
+            await asyncio.sleep_ms(random.randrange(jitter_ms))
+            if self.mqtt_client is None:
+                return  # Connection lost meanwhile; mqtt_connect announces again when it's back
+        log.info('Announce MQTT Config')
+        published = False
+        for topic, payload, digest in self.discovery:
+            if self.retained.get(topic) == digest:
+                continue  # The broker still holds this exact config for Home Assistant
+            if log.DEBUG_ON:
+                log.debug("MQTT Discovery Announce: Topic: %s, Payload %s", topic, payload)
+            with _MQTT_PUBLISH:
+                self.mqtt_client.publish(topic, payload, retain=True, qos=1)
+            self.retained[topic] = digest
+            published = True
+        if published:
+            await asyncio.sleep(1)  # Home Assistant sometimes needs a moment before it's ready for the rest
+
+        log.info("MQTT Setting Available to True")
+        with _MQTT_PUBLISH:
+            self.mqtt_client.publish(AVAILABILITY_TOPIC, "true", qos=1)
 
         self.mqtt_broadcast_state()
+        self.mqtt_report_power()
 
     async def main(self):
-        print(f'Starting up... homeassistant-plasmastick - {sys.version} - {CONFIG.MQTT_CLIENTID} - {CONFIG.MQTT_NAME}')
+        log.info('Starting up... homeassistant-plasmastick - %s - %s - %s', sys.version, CONFIG.MQTT_CLIENTID, CONFIG.MQTT_NAME)
+        asyncio.create_task(stall.watchdog())
 
         try:
-            print('Start up Network_Manager')
+            log.info('Start up Network_Manager')
             await self.network_manager.client(CONFIG.WIFI_SSID, CONFIG.WIFI_PSK)
         except Exception as e:
             if not self.network_manager.isconnected():
-                print(f'Wifi connection failed! {e}. Will try again in {RECONNECT_DELAY} seconds.')
-                await self.strip_controller.effects.status_effect(128, 0, 0)
+                log.error('Wifi connection failed! %s. Will try again in %s seconds.', e, RECONNECT_DELAY)
+                await self.status_effect(128, 0, 0)
                 await asyncio.sleep(RECONNECT_DELAY)  # wait 15 seconds before trying again
                 # return  # Exit if WiFi connection fails
 
+        if self.http_api:
+            await self.http_api.start()  # Before MQTT, so the light can be controlled over HTTP while the broker is down
+
         await self.mqtt_connect()
 
         ping_counter = 0
         while True:
             try:
                 if self.mqtt_client:
-                    self.mqtt_client.check_msg()
+                    with _MQTT_CHECK:
+                        self.mqtt_client.check_msg()
+                    if stall.pending:
+                        self.mqtt_report_stalls()
                 else:
                     await self.mqtt_connect()
 
                 if ping_counter >= 3:
                     try:
-                        self.mqtt_client.ping()
+                        with _MQTT_PING:
+                            self.mqtt_client.ping()
                     except OSError as e:
-                        print(f'MQTT Ping failed! {e}')
+                        log.warning('MQTT Ping failed! %s', e)
                         if self.mqtt_client:
                             try:
                                 self.mqtt_client.disconnect()  # ensure proper disconnection
@@ -261,9 +518,12 @@ class HomeAssistantPlasmaStick:
                         self.mqtt_client = None
 
                     ping_counter = 0
+                    self.trace.flush()
+                    if self.mqtt_client and time.ticks_diff(time.ticks_ms(), self.power_reported) >= CONFIG.POWER_REPORT_INTERVAL * 1000:
+                        self.mqtt_report_power()
                 ping_counter += 1
             except OSError as e:
-                print(f'MQTT check_msg failed! Exception: {e}')
+                log.warning('MQTT check_msg failed! Exception: %s', e)
                 if self.mqtt_client:
                     try:
                         self.mqtt_client.disconnect()  # ensure proper disconnection
@@ -271,7 +531,7 @@ class HomeAssistantPlasmaStick:
                     except Exception:
                         pass
                 self.mqtt_client = None
-                print('MQTT Disconnected')
+                log.warning('MQTT Disconnected')
                 # await self.mqtt_connect()  # Attempt to reconnect
 
             await asyncio.sleep_ms(100)
@@ -0,0 +1,313 @@
+# HomeAssistant Plasma - outputs.py
+# (c) 2024 Snapcase
+# Output drivers. Everything upstream renders into one flat r, g, b bytearray per frame and hands it to show(),
+# which pushes the whole frame to the strip in one bulk operation instead of one set_rgb() call per LED.
+#
+#   ws2812    - PIO state machine fed by DMA from a packed word buffer. show() returns while the frame goes out, and the
+#               next one waits for it to leave the FIFO and latch.
+#               Not yet tested on hardware.
+#   apa102    - SPI, one bulk write of the packed APA102 frame.
+#   plasma    - The Pimoroni plasma.WS2812 driver, one set_rgb() per LED. The default until ws2812 has been tested.
+#   recording - Host simulator: counts frames and optionally records them to a capture file.
+# With LED_OUTPUTS set, the strip is split over several ws2812 chains, each on its own pin and state machine, whose
+# transfers are started together, so a frame takes as long on the wire as the longest chain rather than all of them.
+# With CAPTURE_HOST set, every frame shown is also streamed to tools/capture_tool.py over a socket (see capture.py).
+
+import time
+
+from micropython import const
+
+import capture
+import kernels
+import log
+
+try:
+    import config_local as CONFIG
+except ImportError:
+    import CONFIG
+
+
+_WS2812_LED_US = const(30)  # 24 bits at 800kHz
+_WS2812_RESET_US = const(300)  # Low time that latches the frame, for current WS2812B parts
+
+_program = None
+
+
+def _ws2812_program():
+    global _program
+    if _program:
+        return _program  # Shared, so every state machine on a PIO runs the one copy of it
+    import rp2
+
+    # Standard WS2812 bit timing, 10 PIO cycles per bit at 8MHz. 24 bits are pulled from the top of each 32-bit word.
+    @rp2.asm_pio(sideset_init=rp2.PIO.OUT_LOW, out_shiftdir=rp2.PIO.SHIFT_LEFT, autopull=True, pull_thresh=24)
+    def ws2812():
+        wrap_target()
+        label("bitloop")
+        out(x, 1).side(0)[2]
+        jmp(not_x, "do_zero").side(1)[1]
+        jmp("bitloop").side(1)[4]
+        label("do_zero")
+        nop().side(0)[4]
+        wrap()
+
+    _program = ws2812
+    return ws2812
+
+
+class WS2812Output:
+    def __init__(self, num_leds, pin, pio=0, sm=0, color_order="RGB"):
+        import rp2
+        from machine import Pin
+
+        self.num_leds = num_leds
+        # Each LED is one word, sent most significant byte first, so in memory the wire order is reversed
+        self.layout = kernels.layout("".join(reversed(color_order)), 4)
+        self.frame = bytearray(num_leds * 4)
+
+        self.sm = rp2.StateMachine(pio * 4 + sm, _ws2812_program(), freq=8_000_000, sideset_base=Pin(pin))
+        self.sm.active(1)
+
+        self.dma = rp2.DMA()
+        self.ctrl = self.dma.pack_ctrl(size=2, inc_write=False, treq_sel=pio * 8 + sm)  # DREQ_PIOx_TXy
+        self.wire_us = num_leds * _WS2812_LED_US + _WS2812_RESET_US
+        self.free_at = time.ticks_us()  # When the line has been low long enough for the strip to latch the last frame
+
+    def busy(self):
+        return self.dma.active() or time.ticks_diff(self.free_at, time.ticks_us()) > 0
+
+    def show(self, buffer):
+        self.load(buffer)
+        self.start()
+
+    def load(self, buffer):
+        while self.dma.active():  # Previous frame still going out, don't repack under it
+            pass
+        kernels.pack(self.frame, buffer, self.num_leds, self.layout)
+        self.dma.config(read=self.frame, write=self.sm, count=self.num_leds, ctrl=self.ctrl)
+
+    def start(self):
+        # DMA finishing only means the last words are in the TX FIFO. Once it drains, the last LED is still being
+        # shifted out, and the strip latches the frame only after the line has been low for _WS2812_RESET_US.
+        if self.sm.tx_fifo():
+            while self.sm.tx_fifo():
+                pass
+            latched = time.ticks_add(time.ticks_us(), _WS2812_LED_US + _WS2812_RESET_US)
+            if time.ticks_diff(latched, self.free_at) > 0:
+                self.free_at = latched  # Later than estimated when the frame was started
+        wait = time.ticks_diff(self.free_at, time.ticks_us())
+        if wait > 0:
+            time.sleep_us(wait)
+        self.dma.active(1)
+        self.free_at = time.ticks_add(time.ticks_us(), self.wire_us)
+
+
+class MultiOutput:
+    """Several chains shown as one strip, each taking its slice of the frame in turn. All are loaded before any is started."""
+
+    def __init__(self, outputs):
+        self.outputs = outputs
+        self.num_leds = sum(output.num_leds for output in outputs)
+
+    def busy(self):
+        for output in self.outputs:
+            if output.busy():
+                return True
+        return False
+
+    def show(self, buffer):
+        view = memoryview(buffer)
+        first = 0
+        for output in self.outputs:
+            end = first + output.num_leds * 3
+            output.load(view[first:end])
+            first = end
+        for output in self.outputs:
+            output.start()
+
+
+class APA102Output:
+    def __init__(self, num_leds, data_pin, clock_pin, spi_id=1, baudrate=4_000_000, color_order="BGR"):
+        from machine import Pin, SPI
+
+        self.num_leds = num_leds
+        self.layout = kernels.layout(color_order, 4, 0xFF)  # 0xFF: LED frame marker with full global brightness
+        # 4 byte start frame, 4 bytes per LED, then enough end frame bytes to clock the data through the whole chain
+        self.frame = bytearray(4 + num_leds * 4 + (num_leds + 15) // 16)
+        for i in range(4 + num_leds * 4, len(self.frame)):
+            self.frame[i] = 0xFF
+        self.pixels = memoryview(self.frame)[4:4 + num_leds * 4]
+        self.spi = SPI(spi_id, baudrate=baudrate, sck=Pin(clock_pin), mosi=Pin(data_pin))
+
+    def busy(self):
+        return False
+
+    def show(self, buffer):
+        kernels.pack(self.pixels, buffer, self.num_leds, self.layout)
+        self.spi.write(self.frame)
+
+
+class PlasmaOutput:
+    def __init__(self, num_leds, pin, pio=0, sm=0, color_order="RGB"):
+        import plasma
+
+        self.num_leds = num_leds
+        self.led_strip = plasma.WS2812(num_leds, pio, sm, pin, color_order=getattr(plasma, f"COLOR_ORDER_{color_order}"))
+        self.led_strip.start()
+
+    def busy(self):
+        return False
+
+    @micropython.native
+    def show(self, buffer):
+        led_strip = self.led_strip
+        for i in range(self.num_leds):
+            c = i * 3
+            led_strip.set_rgb(i, buffer[c], buffer[c + 1], buffer[c + 2])
+
+
+class RecordingOutput:
+    """Host backend. Keeps the last frame, and if path is set writes every frame to it in the capture.py format."""
+
+    def __init__(self, num_leds, path=None):
+        self.num_leds = num_leds
+        self.frame = bytearray(num_leds * 3)
+        self.frames = 0
+        self.writer = None
+        if path:
+            self.writer = capture.CaptureWriter(open(path, "wb"), num_leds)
+
+    def busy(self):
+        return False
+
+    def show(self, buffer):
+        self.frame[:] = buffer
+        self.frames += 1
+        if self.writer:
+            self.writer.write(self.frame)
+
+    def close(self):
+        if self.writer:
+            self.writer.close()
+            self.writer = None
+
+
+class WireOutput(RecordingOutput):
+    """
+    Host backend for one WS2812 chain that takes as long as the real one: each frame keeps it busy for its time on the
+    wire, and loading the next waits for that, like WS2812Output. waited_us adds up the time spent waiting.
+    The wait is a real sleep, so under the simulator's virtual clock it costs host time but no simulated time.
+    """
+
+    def __init__(self, num_leds, path=None):
+        super().__init__(num_leds, path)
+        self.wire_us = num_leds * _WS2812_LED_US + _WS2812_RESET_US
+        self.free_at = time.ticks_us()
+        self.waited_us = 0
+
+    def busy(self):
+        return time.ticks_diff(self.free_at, time.ticks_us()) > 0
+
+    def show(self, buffer):
+        self.load(buffer)
+        self.start()
+
+    def load(self, buffer):
+        wait = time.ticks_diff(self.free_at, time.ticks_us())
+        if wait > 0:
+            self.waited_us += wait
+            time.sleep_us(wait)
+        RecordingOutput.show(self, buffer)
+
+    def start(self):
+        self.free_at = time.ticks_add(time.ticks_us(), self.wire_us)
+
+
+_CAPTURE_RETRY_MS = const(5000)
+
+
+class CaptureOutput:
+    """Wraps another output and streams every frame it shows to a capture receiver (tools/capture_tool.py receive)."""
+
+    def __init__(self, output, host, port):
+        self.output = output
+        self.num_leds = output.num_leds
+        self.host = host
+        self.port = port
+        self.writer = None
+        self.retry_at = time.ticks_ms()
+
+    def busy(self):
+        return self.output.busy()
+
+    def show(self, buffer):
+        self.output.show(buffer)
+        if self.writer is None:
+            # Not connected yet (or the receiver went away): try again every few seconds, never every frame
+            if time.ticks_diff(time.ticks_ms(), self.retry_at) < 0:
+                return
+            self._connect()
+            if self.writer is None:
+                return
+        try:
+            self.writer.write(buffer)
+        except OSError as e:
+            log.warning("Frame capture to %s:%s stopped: %s", self.host, self.port, e)
+            self.close()
+
+    def _connect(self):
+        import socket
+
+        sock = socket.socket()
+        try:
+            sock.connect(socket.getaddrinfo(self.host, self.port)[0][-1])
+            self.writer = capture.CaptureWriter(sock, self.num_leds)
+            log.info("Streaming frames to %s:%s", self.host, self.port)
+        except OSError as e:
+            log.debug("Frame capture receiver %s:%s not reachable: %s", self.host, self.port, e)
+            sock.close()
+            self.retry_at = time.ticks_add(time.ticks_ms(), _CAPTURE_RETRY_MS)
+
+    def close(self):
+        if self.writer:
+            self.writer.close()
+            self.writer = None
+        self.retry_at = time.ticks_add(time.ticks_ms(), _CAPTURE_RETRY_MS)
+
+
+def create_chains(driver, num_leds, chains):
+    """One output per (pin, pio, sm, LEDs) chain, shown together as a MultiOutput."""
+    if sum(chain[3] for chain in chains) != num_leds:
+        raise ValueError(f"LED_OUTPUTS add up to {sum(chain[3] for chain in chains)} LEDs, NUM_LEDS is {num_leds}")
+    outputs = []
+    for pin, pio, sm, leds in chains:
+        log.info("Output: %s, %s LEDs on pin %s, PIO %s SM %s", driver, leds, pin, pio, sm)
+        if driver == "ws2812":
+            outputs.append(WS2812Output(leds, pin, pio, sm, CONFIG.LED_COLOR_ORDER))
+        elif driver == "recording":
+            outputs.append(WireOutput(leds))
+        else:
+            raise ValueError(f"LED_OUTPUTS needs LED_DRIVER ws2812 or recording, not {driver}")
+    return MultiOutput(outputs)
+
+
+def create(driver=None, num_leds=None, chains=None):
+    driver = driver or CONFIG.LED_DRIVER
+    num_leds = num_leds or CONFIG.NUM_LEDS
+    chains = chains or CONFIG.LED_OUTPUTS
+    log.info("Output: %s, %s LEDs", driver, num_leds)
+    if chains:
+        output = create_chains(driver, num_leds, chains)
+    elif driver == "ws2812":
+        output = WS2812Output(num_leds, CONFIG.LED_DATA_PIN, color_order=CONFIG.LED_COLOR_ORDER)
+    elif driver == "apa102":
+        output = APA102Output(num_leds, CONFIG.LED_DATA_PIN, CONFIG.LED_CLOCK_PIN, color_order=CONFIG.LED_COLOR_ORDER)
+    elif driver == "plasma":
+        output = PlasmaOutput(num_leds, CONFIG.LED_DATA_PIN, color_order=CONFIG.LED_COLOR_ORDER)
+    elif driver == "recording":
+        output = RecordingOutput(num_leds, CONFIG.LED_RECORD_FILE)
+    else:
+        raise ValueError(f"Unknown LED_DRIVER: {driver}")
+    if CONFIG.CAPTURE_HOST:
+        output = CaptureOutput(output, CONFIG.CAPTURE_HOST, CONFIG.CAPTURE_PORT)
+    return output
@@ -0,0 +1,69 @@
+# HomeAssistant Plasma - palettes.py
+# (c) 2024 Snapcase
+# Precomputed tables for kernels.palette_fill: 256-entry r, g, b gradients and a periodic noise table.
+# Effects build them once when they start, so each frame is table lookups only rather than per-pixel HSV or noise maths.
+
+from random import getrandbits
+
+from micropython import const
+
+import kernels
+
+_NOISE_SIZE = const(256)
+
+# Gradient stops: (palette index, [r, g, b])
+FIRE = ((0, [0, 0, 0]), (70, [120, 0, 0]), (140, [230, 40, 0]), (200, [255, 140, 0]), (240, [255, 220, 40]), (255, [255, 255, 160]))
+
+
+def gradient(stops, brightness=255):
+    """256-entry r, g, b palette running through stops, which must start at 0 and end at 255, scaled to brightness."""
+    palette = bytearray(kernels.PALETTE_SIZE)
+    for (start, start_rgb), (end, end_rgb) in zip(stops, stops[1:]):
+        span = end - start
+        for i in range(start, end + 1):
+            for k in range(3):
+                value = start_rgb[k] + (end_rgb[k] - start_rgb[k]) * (i - start) // span
+                palette[i * 3 + k] = value * brightness // 255
+    return palette
+
+
+def hue_wheel(hsv_to_rgb, brightness=255, saturation=1):
+    """Palette going once round the colour wheel, using the Effects.hsv_to_rgb helper."""
+    palette = bytearray(kernels.PALETTE_SIZE)
+    for i in range(256):
+        palette[i * 3:i * 3 + 3] = bytes(hsv_to_rgb(i / 256, saturation, brightness / 255))
+    return palette
+
+
+def noise(octaves=((8, 2), (32, 1))):
+    """
+    Periodic value noise, 256 entries of 0..255 that wrap around smoothly. Each octave is (random points round the
+    table, weight), with smoothstep interpolation between the points. The sum is stretched to the full 0..255 range.
+    """
+    values = [0] * _NOISE_SIZE
+    for points, weight in octaves:
+        lattice = [getrandbits(8) for _ in range(points)]
+        spacing = _NOISE_SIZE // points
+        for i in range(_NOISE_SIZE):
+            point = i // spacing
+            a = lattice[point]
+            b = lattice[(point + 1) % points]
+            t = (i % spacing) * 256 // spacing
+            t = t * t * (768 - 2 * t) >> 16  # Smoothstep, 0..256
+            values[i] += (a + ((b - a) * t >> 8)) * weight
+    low = min(values)
+    high = max(values)
+    table = bytearray(_NOISE_SIZE)
+    for i in range(_NOISE_SIZE):
+        table[i] = (values[i] - low) * 255 // max(high - low, 1)
+    return table
+
+
+def ramp():
+    """Noise table stand-in that just counts 0..255, so palette_fill walks straight along the palette."""
+    return bytearray(range(256))
+
+
+def tables(palette, noise_table):
+    """Join a palette and a noise table into the single buffer palette_fill takes."""
+    return palette + noise_table
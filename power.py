@@ -0,0 +1,75 @@
+# HomeAssistant Plasma - power.py
+# (c) 2024 Snapcase
+# Estimates the strip's current draw from the running channel sum the transition engine keeps, and when it would go
+# over POWER_BUDGET_MA scales the frame down through a brightness LUT before it reaches the output driver.
+# A full-strip lightning flash on a long run can otherwise brown out the power supply.
+#
+# Estimate: LED_IDLE_MA per LED, plus LED_CHANNEL_MA for each channel at full brightness, in proportion to its value.
+
+from micropython import const
+
+import kernels
+import log
+
+try:
+    import config_local as CONFIG
+except ImportError:
+    import CONFIG
+
+_LEVEL_STEP = const(4)  # Limiting brightness is rounded down to this, so a fading frame doesn't rebuild the LUT every time
+
+
+class PowerLimiter:
+    def __init__(self, num_leds, budget_ma=None, channel_ma=None, idle_ma=None):
+        self.count = num_leds * 3
+        self.budget_ma = budget_ma or CONFIG.POWER_BUDGET_MA  # None: estimate only, never limit
+        self.channel_ma = channel_ma or CONFIG.LED_CHANNEL_MA
+        self.idle_ma = num_leds * (CONFIG.LED_IDLE_MA if idle_ma is None else idle_ma)
+
+        self.frame = bytearray(self.count)
+        self.lut = bytearray(256)
+        self.level = -1
+
+        self.requested_ma = self.idle_ma  # What the last frame would have drawn
+        self.drawn_ma = self.idle_ma  # What it was limited to
+        self.peak_requested_ma = 0
+        self.peak_drawn_ma = 0
+        self.limited_frames = 0
+
+        if self.budget_ma and self.budget_ma <= self.idle_ma:
+            log.warning("POWER_BUDGET_MA %s is below the %smA the LEDs draw when off", self.budget_ma, self.idle_ma)
+
+    def limit(self, buffer, channel_sum):
+        """Return the frame to show: buffer itself, or a copy scaled down to fit the budget."""
+        idle = self.idle_ma
+        requested = idle + channel_sum * self.channel_ma // 255
+        self.requested_ma = requested
+        if requested > self.peak_requested_ma:
+            self.peak_requested_ma = requested
+
+        budget = self.budget_ma
+        if not budget or requested <= budget or budget <= idle:
+            drawn = requested
+            frame = buffer
+        else:
+            level = (budget - idle) * 255 // (requested - idle) // _LEVEL_STEP * _LEVEL_STEP
+            if level != self.level:
+                kernels.brightness_lut(level, self.lut)
+                self.level = level
+            kernels.scale(self.frame, buffer, self.lut, self.count)
+            self.limited_frames += 1
+            drawn = idle + (requested - idle) * level // 255
+            frame = self.frame
+
+        self.drawn_ma = drawn
+        if drawn > self.peak_drawn_ma:
+            self.peak_drawn_ma = drawn
+        return frame
+
+    def report(self):
+        """Peak estimates since the last report, for the diagnostic sensor. Resets the peaks."""
+        report = {"current": self.peak_drawn_ma, "requested": self.peak_requested_ma, "limited_frames": self.limited_frames,
+                  "budget": self.budget_ma}
+        self.peak_requested_ma = self.requested_ma
+        self.peak_drawn_ma = self.drawn_ma
+        return report
@@ -0,0 +1,98 @@
+# HomeAssistant Plasma - raw_frames.py
+# (c) 2024 Snapcase
+# Binary frames and palettes over MQTT, for custom animations pushed from Home Assistant automations or Node-RED.
+# Messages to <state topic>/raw start with a 4 byte header:
+#   byte 0      kind: 0 RGB frame, 1 RLE frame, 2 indexed frame, 3 palette
+#   byte 1      palette slot, for indexed frames and palettes, 0..RAW_PALETTE_SLOTS-1
+#   bytes 2, 3  first pixel (or palette entry) the data is for, little-endian, so a long strip can be sent in parts
+# then the data:
+#   RGB         r, g, b per pixel
+#   RLE         runs of count, r, g, b: count pixels of one colour
+#   indexed     one palette index per pixel, coloured from the palette in the slot
+#   palette     r, g, b per palette entry, up to 256 entries
+#
+# Frames are decoded by kernels.raw_fill from the message straight into the frame buffer, through the brightness and
+# palette tables held in its params, so nothing is allocated per message. They show at once, with no fade.
+
+from array import array
+
+import kernels
+import log
+
+try:
+    import config_local as CONFIG
+except ImportError:
+    import CONFIG
+
+HEADER_SIZE = 4
+PALETTE = 3
+
+
+def is_frame(data):
+    return len(data) > 0 and data[0] != PALETTE
+
+
+class RawFrames:
+    def __init__(self, engine, slots=None):
+        self.engine = engine
+        self.params = array("i", [0] * kernels.R_SIZE)
+        self.params[kernels.R_COUNT] = engine.num_leds
+        self.params[kernels.R_START] = HEADER_SIZE
+        self.palettes = [None] * (slots or CONFIG.RAW_PALETTE_SLOTS)  # bytearray(kernels.PALETTE_SIZE) once uploaded
+        self.level = -1  # Brightness the table in params is for
+        self.loaded = -1  # Slot whose palette is in params, at that brightness
+        self.frames = 0
+
+    def decode(self, data, brightness, length=None):
+        """
+        Show a frame or store a palette from one raw message, the first length bytes of data (all of it by default).
+        Raises ValueError if the message is malformed.
+        """
+        if length is None:
+            length = len(data)
+        if length < HEADER_SIZE:
+            raise ValueError("no header")
+        kind = data[0]
+        slot = data[1]
+        first = data[2] | data[3] << 8
+        if kind > PALETTE:
+            raise ValueError(f"unknown kind {kind}")
+        if (kind == PALETTE or kind == kernels.RAW_INDEXED) and slot >= len(self.palettes):
+            raise ValueError(f"no palette slot {slot}")
+
+        if kind == PALETTE:
+            self.upload(slot, first, data, length)
+            return
+
+        params = self.params
+        brightness = int(brightness)
+        if brightness != self.level:
+            for i in range(256):
+                params[kernels.R_LUT + i] = i * brightness // 255
+            self.level = brightness
+            self.loaded = -1
+        if kind == kernels.RAW_INDEXED and slot != self.loaded:
+            palette = self.palettes[slot]
+            if palette is None:
+                raise ValueError(f"palette slot {slot} is empty")
+            for i in range(kernels.PALETTE_SIZE):
+                params[kernels.R_PALETTE + i] = params[kernels.R_LUT + palette[i]]
+            self.loaded = slot
+
+        params[kernels.R_ENCODING] = kind
+        params[kernels.R_FIRST] = first
+        params[kernels.R_LENGTH] = length
+        self.engine.render_raw(data, params)
+        self.frames += 1
+
+    def upload(self, slot, first, data, length):
+        size = length - HEADER_SIZE
+        if size % 3 or first * 3 + size > kernels.PALETTE_SIZE:
+            raise ValueError(f"palette of {size} bytes from entry {first} doesn't fit")
+        palette = self.palettes[slot]
+        if palette is None:
+            palette = self.palettes[slot] = bytearray(kernels.PALETTE_SIZE)
+        palette[first * 3:first * 3 + size] = memoryview(data)[HEADER_SIZE:length]
+        if slot == self.loaded:
+            self.loaded = -1
+        log.info("Raw palette slot %s: %s entries from %s", slot, size // 3, first)
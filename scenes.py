@@ -0,0 +1,46 @@
+# HomeAssistant Plasma - scenes.py
+# (c) 2024 Snapcase
+# Scene files: looks compiled on the host by tools/scene_compiler.py and copied to SCENE_DIR on flash. Each one is
+# listed as an effect under its file name, and played by effects/scene.py.
+#
+# Format, little endian:
+#   header   "PLSC", u8 version, u8 flags (bit 0: loop), u16 LED count, u16 frames, u16 largest record    (12 bytes)
+#   records  u16 length, u16 hold_ms, then a raw message (see raw_frames.py) of that length
+# A frame is one or more records, each small enough to read into one fixed buffer. hold_ms is 0 on all but the last
+# record of a frame, where it says how long the frame stays up. Palettes for indexed frames come before any frame.
+
+import os
+import struct
+
+try:
+    import config_local as CONFIG
+except ImportError:
+    import CONFIG
+
+MAGIC = b"PLSC"
+VERSION = 1
+HEADER_FORMAT = "<4sBBHHH"
+HEADER_SIZE = 12
+RECORD_FORMAT = "<HH"
+RECORD_SIZE = 4
+EXTENSION = ".scn"
+
+LOOP = 1
+
+
+def read_header(data):
+    """Return (flags, LED count, frames, largest record) from a scene header, raising ValueError if it isn't one."""
+    magic, version, flags, num_leds, frames, largest = struct.unpack_from(HEADER_FORMAT, data, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Not a version 1 scene file")
+    return flags, num_leds, frames, largest
+
+
+def find(directory=None):
+    """{effect name: path} of the scene files on flash."""
+    directory = directory or CONFIG.SCENE_DIR
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return {}
+    return {name[:-len(EXTENSION)]: f"{directory}/{name}" for name in names if name.endswith(EXTENSION)}
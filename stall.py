@@ -0,0 +1,91 @@
+# HomeAssistant Plasma - stall.py
+# (c) 2024 Snapcase
+# Event loop stall detector. A watchdog task asks to wake every STALL_CHECK_MS and measures how late it actually
+# wakes: that lag is how long some synchronous call held the loop (and froze the animation). Lags go into a histogram,
+# and those over STALL_THRESHOLD_MS are kept for reporting over MQTT.
+#
+# Known blocking calls are marked with a Region, created once at import time so marking costs no allocation:
+#     _MQTT_CONNECT = stall.Region("mqtt.connect")
+#     with _MQTT_CONNECT:
+#         mqtt_client.connect()
+# A stall is put down to the longest marked region that ran since the watchdog last woke, if that accounts for at
+# least half the lag, otherwise it's reported as "unmarked".
+
+import time
+from array import array
+
+import asyncio
+from micropython import const
+
+import log
+
+try:
+    import config_local as CONFIG
+except ImportError:
+    import CONFIG
+
+BUCKETS = (5, 10, 20, 50, 100, 200, 500, 1000)  # Histogram upper bounds in ms, plus one bucket for anything longer
+_MAX_PENDING = const(8)  # Stalls kept for reporting; beyond this they are only counted
+
+histogram = array("I", [0] * (len(BUCKETS) + 1))
+pending = []  # (ticks_ms, lag ms, region) of stalls not reported yet, oldest first
+stall_count = 0
+dropped = 0
+
+_worst = None  # Longest region that ran since the watchdog last woke
+_worst_ms = 0
+
+
+class Region:
+    def __init__(self, name):
+        self.name = name
+        self.start = 0
+
+    def __enter__(self):
+        self.start = time.ticks_ms()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        global _worst, _worst_ms
+        ms = time.ticks_diff(time.ticks_ms(), self.start)
+        if ms > _worst_ms:
+            _worst = self.name
+            _worst_ms = ms
+        return False
+
+
+async def watchdog(interval_ms=None, threshold_ms=None):
+    global _worst, _worst_ms, stall_count, dropped
+    interval_ms = interval_ms or CONFIG.STALL_CHECK_MS
+    threshold_ms = threshold_ms or CONFIG.STALL_THRESHOLD_MS
+    buckets = len(BUCKETS)
+    while True:
+        expected = time.ticks_add(time.ticks_ms(), interval_ms)
+        await asyncio.sleep_ms(interval_ms)
+        now = time.ticks_ms()
+        lag = max(time.ticks_diff(now, expected), 0)
+
+        bucket = 0
+        while bucket < buckets and lag >= BUCKETS[bucket]:
+            bucket += 1
+        histogram[bucket] += 1
+
+        if lag >= threshold_ms:
+            region = _worst if _worst_ms * 2 >= lag else "unmarked"
+            stall_count += 1
+            if len(pending) < _MAX_PENDING:
+                pending.append((now, lag, region))
+            else:
+                dropped += 1
+            log.warning("Event loop stalled %sms in %s", lag, region)
+        _worst = None
+        _worst_ms = 0
+
+
+def histogram_dict():
+    """The lag histogram keyed by bucket, e.g. {"<5": 1200, "<10": 3, ..., ">=1000": 0}."""
+    counts = {}
+    for i, bound in enumerate(BUCKETS):
+        counts[f"<{bound}"] = histogram[i]
+    counts[f">={BUCKETS[-1]}"] = histogram[len(BUCKETS)]
+    return counts
@@ -0,0 +1,109 @@
+# HomeAssistant Plasma - state_store.py
+# (c) 2024 Snapcase
+# Keeps the last applied light state in flash, so the strip can come back on at power-on before WiFi and MQTT are up.
+# Writes are coalesced: a record is only written once the state has been stable for STATE_SAVE_DELAY seconds,
+# and successive records rotate across STATE_SLOTS files so slider storms don't keep rewriting the same flash block.
+# Records are checked with the owner's check function both before they're saved and when they're loaded, so a bad
+# record can't be written, and one that is found anyway is passed over for an older slot.
+
+import time
+
+import asyncio
+import ujson as json
+
+import log
+import stall
+
+try:
+    import config_local as CONFIG
+except ImportError:
+    import CONFIG
+
+_SAVE = stall.Region("state.save")  # Flash writes hold up everything, littlefs erases a whole block at a time
+
+
+class StateStore:
+    def __init__(self, prefix=CONFIG.STATE_FILE_PREFIX, slots=CONFIG.STATE_SLOTS, save_delay=CONFIG.STATE_SAVE_DELAY, check=None):
+        self.prefix = prefix
+        self.check = check or (lambda record: True)
+        self.slots = slots
+        self.save_delay_ms = save_delay * 1000
+
+        self.sequence = 0  # Sequence number of the newest record in flash
+        self.slot = -1  # Slot holding the newest record
+        self.saved = None  # Last record written to (or restored from) flash
+        self.pending = None  # Record waiting for the state to settle before being written
+        self.changed = 0  # ticks_ms of the last change to the pending record
+
+        self.write_count = 0
+        self.restore_ms = 0
+
+    def _slot_path(self, slot):
+        return f"{self.prefix}{slot}.json"
+
+    def load(self):
+        """Return the newest valid record in flash, or None. Torn, empty or failing slots are skipped."""
+        start = time.ticks_ms()
+        newest = None
+
+        for slot in range(self.slots):
+            try:
+                with open(self._slot_path(slot)) as f:
+                    record = json.load(f)
+                sequence = record.pop("seq")
+            except (OSError, ValueError, KeyError, AttributeError):
+                continue
+            if not isinstance(sequence, int) or not self.check(record):
+                log.warning("StateStore: Skipping invalid light state in slot %s: %s", slot, record)
+                continue
+
+            if newest is None or sequence > self.sequence:
+                newest = record
+                self.sequence = sequence
+                self.slot = slot
+
+        self.saved = newest
+        self.restore_ms = time.ticks_diff(time.ticks_ms(), start)
+        return newest
+
+    def update(self, record):
+        if not self.check(record):
+            log.error("StateStore: Not saving invalid light state: %s", record)
+            return
+        if record == self.saved:
+            self.pending = None  # Back to what's already in flash, nothing to write
+            return
+
+        if record != self.pending:
+            self.pending = record
+            self.changed = time.ticks_ms()
+
+    def flush(self, force=False):
+        if self.pending is None:
+            return False
+        if not force and time.ticks_diff(time.ticks_ms(), self.changed) < self.save_delay_ms:
+            return False
+
+        slot = (self.slot + 1) % self.slots
+        record = dict(self.pending)
+        record["seq"] = self.sequence + 1
+
+        try:
+            with _SAVE, open(self._slot_path(slot), "w") as f:
+                json.dump(record, f)
+        except OSError as e:
+            log.error("StateStore: Failed to save light state: %s", e)
+            return False
+
+        self.slot = slot
+        self.sequence += 1
+        self.saved = self.pending
+        self.pending = None
+        self.write_count += 1
+        log.info("StateStore: Saved light state to slot %s, writes this boot: %s", slot, self.write_count)
+        return True
+
+    async def save_task(self):
+        while True:
+            self.flush()
+            await asyncio.sleep(1)
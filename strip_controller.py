@@ -6,21 +6,63 @@
 # Suppports home assistant MQTT discovery. Edit Config.py with your WiFi information and an MQTT broker connected to Home Assistant.  https://www.home-assistant.io/integrations/mqtt/
 
 
-from random import randrange, uniform
+import sys
+import time
 
 import asyncio
 import gc
-import plasma
-from plasma import plasma_stick
+from micropython import const
+
+import colour
+import log
+import outputs
+import scenes
+import stall
+from effects import MANIFEST, TRANSIENT
+from power import PowerLimiter
+from raw_frames import RawFrames
+from state_store import StateStore
+from transitions import TransitionEngine
 
 try:
     import config_local as CONFIG
 except ImportError:
     import CONFIG
 
+_BASELINE_FPS = const(20)  # The old fixed render rate, for reporting what the adaptive cadence saves
+
+_GC = stall.Region("gc.collect")
+_EFFECT_LOAD = stall.Region("effect.load")
+
+
+def in_range(value, low, high, integer=False):
+    """Whether a value from JSON is a number (an int if integer is set, never a bool) from low to high."""
+    if isinstance(value, bool) or not isinstance(value, int if integer else (int, float)):
+        return False
+    return low <= value <= high
+
+
+def valid_record(record):
+    """Whether a saved light state has every field, of the right type and in range, so it can be restored."""
+    try:
+        if not (isinstance(record["state"], bool) and in_range(record["brightness"], 0, 255)
+                and in_range(record["hue"], 0, 360) and in_range(record["saturation"], 0, 100) and isinstance(record["effect"], str)):
+            return False
+        if "color_mode" not in record:
+            return True
+        mode = record["color_mode"]
+        value = record["color"]
+        if mode == "hs":
+            return isinstance(value, list) and len(value) == 2 and in_range(value[0], 0, 360) and in_range(value[1], 0, 100)
+        if mode == "rgb":
+            return isinstance(value, list) and len(value) == 3 and all(in_range(c, 0, 255, True) for c in value)
+        return mode == "color_temp" and in_range(value, colour.MIN_MIREDS, colour.MAX_MIREDS)
+    except (KeyError, TypeError):
+        return False
+
 
 class StripController:
-    def __init__(self):
+    def __init__(self, output=None):
 
         self.default_brightness = 128
         self.brightness = 0
@@ -29,49 +71,128 @@ class StripController:
 
         self.state = False
         self.effect = "None"
+        self.lasting_effect = self.effect  # The last effect not in TRANSIENT, saved in its place
         self.effect_task = None
         self.num_leds = CONFIG.NUM_LEDS
 
-        # Create a list of [r, g, b] values that will hold current LED colours, for display
-        # Create a list of [r, g, b] values that will hold target LED colours, to move towards
+        # Holds the current and target [r, g, b] colour of every LED, and fades each one between them over time
+        self.engine = TransitionEngine(self.num_leds, easing=CONFIG.TRANSITION_EASING)
 
-        self.current_leds = [[0, 0, 0] for _ in range(self.num_leds)]
-        self.target_leds = [[0, 0, 0] for _ in range(self.num_leds)]
+        # Effects and the engine only ever hand whole frames to the output driver
+        self.output = output or outputs.create()
+        self.power = PowerLimiter(self.num_leds)
 
-        self.led_strip = plasma.WS2812(CONFIG.NUM_LEDS, 0, 0, plasma_stick.DAT, color_order=plasma.COLOR_ORDER_RGB)
-        self.led_strip.start()
-
-        self.effects = Effects(self.led_strip, CONFIG.NUM_LEDS, self.current_leds, self.target_leds)
+        self.effects = Effects(CONFIG.NUM_LEDS, self.engine)
+        self.render_effect = None  # Render cost of the running effect, logged when it changes
+        self.render_frames = 0
+        self.render_us = 0
+        self.render_start = time.ticks_ms()
         self.update_task = asyncio.create_task(self.update_led_strip_task())
 
-    async def update_led_strip_task(self):
-        while True:
-            await self.effects.move_to_target(self.effects.current_leds, self.effects.target_leds, self.effects.num_leds)
-            await StripController._display_current(self.effects.num_leds, self.effects.led_strip, self.effects.current_leds)
-            await asyncio.sleep_ms(50)
+        # Bring back the last light state from flash straight away, rather than waiting for Home Assistant
+        self.state_store = StateStore(check=valid_record)
+        self.restored = self._restore_state()
+        self.save_task = asyncio.create_task(self.state_store.save_task())
+
+    def _restore_state(self):
+        record = self.state_store.load()
+        if record is None:
+            log.info("No saved light state found")
+            return False
+
+        try:
+            self.state = record["state"]
+            self.brightness = record["brightness"]
+            self.hue = record["hue"]
+            self.saturation = record["saturation"]
+            self.effect = "None" if record["effect"] in TRANSIENT else record["effect"]  # Saved by older versions
+            self.lasting_effect = self.effect
+            if "color_mode" in record:
+                value = record["color"]
+                self.effects.colour.set(record["color_mode"], tuple(value) if isinstance(value, list) else value)
+            else:  # Saved before rgb and color_temp were supported
+                self.effects.colour.set("hs", (self.hue, self.saturation))
+        except KeyError:
+            log.warning("Ignoring incomplete saved light state: %s", record)
+            return False
+
+        log.info("Restored light state in %sms: %s", self.state_store.restore_ms, record)
+        self._update_strip()
+        return True
 
-    @micropython.native
-    @staticmethod
-    async def _display_current(num_leds, led_strip, current_leds):
-        # paint our current LED colours to the strip_controller
-        for i in range(num_leds):
-            led_strip.set_rgb(i, current_leds[i][0], current_leds[i][1], current_leds[i][2])
+    def _snapshot(self):
+        colour = self.effects.colour
+        return {"state": self.state, "brightness": self.brightness, "hue": self.hue, "saturation": self.saturation, "effect": self.effect,
+                "color_mode": colour.mode, "color": list(colour.value) if isinstance(colour.value, tuple) else colour.value}
 
-    async def set_state(self, brightness=None, hue=None, saturation=None, state=None, effect=None):
-        print(f"set_state: State: {state}, brightness: {brightness}, hue: {hue}, saturation: {saturation}, Effect: {effect}")
+    async def update_led_strip_task(self):
+        engine = self.engine
+        while True:
+            engine.wake.clear()
+            start = time.ticks_us()
+            engine.step()
+            self.output.show(self.power.limit(engine.current_leds, engine.channel_sum))
+            self.render_us += time.ticks_diff(time.ticks_us(), start)
+            self.render_frames += 1
+
+            if engine.moving:
+                shortest = self.effects.shortest_interval()
+                await asyncio.sleep_ms(shortest)
+                rest = self.effects.frame_interval() - shortest
+                if rest > 0:
+                    try:  # Cut short by a pixel given a new target meanwhile, e.g. by a command
+                        await asyncio.wait_for(engine.wake.wait(), rest / 1000)
+                    except asyncio.TimeoutError:
+                        pass
+            else:
+                await engine.wake.wait()  # Every pixel is on its target, nothing to render until one is given a new one
+
+    def _report_render(self):
+        elapsed_ms = time.ticks_diff(time.ticks_ms(), self.render_start)
+        if self.render_effect is not None and self.render_frames and elapsed_ms > 0:
+            baseline = elapsed_ms * _BASELINE_FPS // 1000
+            frame_us = self.render_us // self.render_frames
+            log.info("Effect %s rendered %s frames in %ss (%s FPS), %sms CPU, saving about %sms over a fixed %s FPS",
+                     self.render_effect, self.render_frames, elapsed_ms // 1000, self.render_frames * 1000 // elapsed_ms,
+                     self.render_us // 1000, max(baseline - self.render_frames, 0) * frame_us // 1000, _BASELINE_FPS)
+        self.render_effect = self.effect
+        self.render_frames = 0
+        self.render_us = 0
+        self.render_start = time.ticks_ms()
+
+    async def set_state(self, brightness=None, hue=None, saturation=None, state=None, effect=None, transition=None, rgb=None, color_temp=None):
+        if log.DEBUG_ON:
+            log.debug("set_state: State: %s, brightness: %s, hue: %s, saturation: %s, rgb: %s, color_temp: %s, Effect: %s, Transition: %s",
+                      state, brightness, hue, saturation, rgb, color_temp, effect, transition)
 
         if hue is not None:
             self.hue = hue
             if self.effect not in self.effects.colour_effects:
-                print(f'Forcing static effect in hue. self.effect: {self.effect}')
+                if log.DEBUG_ON:
+                    log.debug('Forcing static effect in hue. self.effect: %s', self.effect)
                 self.effect = "None"  # Force to 'Static' mode when color change received
 
         if saturation is not None:
             self.saturation = saturation
             if self.effect not in self.effects.colour_effects:
-                print(f'Forcing static effect in saturation. self.effect: {self.effect}')
+                if log.DEBUG_ON:
+                    log.debug('Forcing static effect in saturation. self.effect: %s', self.effect)
                 self.effect = "None"  # Force to 'Static' mode when color change received
 
+        if hue is not None or saturation is not None:
+            self.effects.colour.set("hs", (self.hue, self.saturation))
+
+        if rgb is not None or color_temp is not None:
+            if rgb is not None:
+                self.effects.colour.set("rgb", tuple(rgb))
+            else:
+                self.effects.colour.set("color_temp", color_temp)
+            self.hue, self.saturation = self.effects.colour.hs()  # For effects that take a colour as hue and saturation
+            if self.effect not in self.effects.colour_effects:
+                if log.DEBUG_ON:
+                    log.debug('Forcing static effect in %s. self.effect: %s', self.effects.colour.mode, self.effect)
+                self.effect = "None"
+
         if effect is not None:
             self.effect = effect
 
@@ -83,336 +204,172 @@ class StripController:
 
         if brightness is not None:
             self.brightness = brightness
-        print(f"set_state: New State: {state}, brightness: {brightness}, hue: {hue}, saturation: {saturation}, Effect: {effect}")
+        if log.DEBUG_ON:
+            log.debug("set_state: New State: %s, brightness: %s, hue: %s, saturation: %s, Effect: %s", state, brightness, hue, saturation, effect)
+        # Home Assistant sends the transition in seconds, and only for the command it applies to
+        self.effects.transition_ms = None if transition is None else int(transition * 1000)
         self._update_strip()
-
-    def set_rgb(self, r, g, b):
-        h, s, v = self.effects.rgb_to_hsv(r, g, b)
-        self.set_state(hue=h, saturation=s, brightness=v, state=True)
+        if self.effect not in TRANSIENT:
+            self.lasting_effect = self.effect
+        record = self._snapshot()
+        record["effect"] = self.lasting_effect
+        self.state_store.update(record)
+
+    async def set_rgb(self, r, g, b):
+        """
+        Show r, g, b as given: the brightest channel becomes the brightness, and the colour is r, g, b scaled up to full
+        (rounded up, so scaling it back down gives r, g, b again). Black turns the light off.
+        """
+        high = max(r, g, b)
+        if high == 0:
+            await self.set_state(state=False)
+            return
+        await self.set_state(rgb=[(c * 255 + high - 1) // high for c in (r, g, b)], brightness=high, state=True)
 
     async def _apply_effect(self, effect, state, brightness, hue=None, saturation=None):
-        print(f"Apply_effect: {effect}, state: {state}, hue: {hue}, saturation: {saturation}, brightness: {brightness}")
-        if effect in self.effects.effects.keys():
-            if effect in self.effects.colour_effects:
-                await self.effects.effects[effect](self.effects, hue, saturation, brightness, state)
+        if log.DEBUG_ON:
+            log.debug("Apply_effect: %s, state: %s, hue: %s, saturation: %s, brightness: %s", effect, state, hue, saturation, brightness)
+        if effect not in self.effects.effect_list:
+            log.warning("Unknown effect, default to Static/None")
+            effect = "None"
 
-            else:
-                await self.effects.effects[effect](self.effects, state, brightness)
-        else:
-            print("Unknown effect, default to Static/None")
-            self.effects.effect = "None"
-            await self.effects.effects["None"](self.effects, hue, saturation, brightness, state)
+        run = self.effects.load(effect)
+        await run(self.effects, state, brightness, hue, saturation)
 
     def _update_strip(self):
+        if self.effect != self.render_effect:
+            self._report_render()
         if self.effect_task:
             try:
                 self.effect_task.cancel()
-                gc.collect()
-                print("Previous effect task cancelled.")
+                with _GC:
+                    gc.collect()
+                log.debug("Previous effect task cancelled.")
             except asyncio.CancelledError as e:
-                print(f"Previous effect task NOT cancelled: {e}")
+                log.warning("Previous effect task NOT cancelled: %s", e)
 
-        print(f"Starting {self.effect} effect task")
+        if log.DEBUG_ON:
+            log.debug("Starting %s effect task", self.effect)
         self.effect_task = asyncio.create_task(self._apply_effect(self.effect, self.state, self.brightness, self.hue, self.saturation))
 
 
 class Effects:
     """
-    animation_step_size
-    Purpose: Controls the maximum step size for changes in LED color values.
-    Description: This parameter determines the maximum amount by which an LED color value can change in one step. Higher values result in larger steps, causing the animation to transition more quickly between colors. Lower values result in smaller steps, making the transitions smoother and slower.
+    engine.duration_ms
+    Purpose: Controls how long each LED takes to fade to a new colour.
+    Description: Effects set target colours with engine.set_target(), or jump an LED to a colour with engine.set_current(). Either way the LED then fades to its target over exactly duration_ms, whatever the colour distance and however fast the strip is refreshed. Higher values give slower, smoother transitions.
 
-    animation_step_delay (ms)
-    Purpose: Controls the delay between each step of the animation.
-    Description: This parameter sets the delay in milliseconds between each step of the animation. Higher values result in a slower overall animation speed because there is more time between each color change step. Lower values make the animation faster by reducing the delay between steps.
+    transition_ms
+    Purpose: Transition length requested by Home Assistant for the current command, or None.
+    Description: Used by the static effect in place of its default fade, so "transition" in a light command is honoured.
 
-    """
+    colour
+    Purpose: The light's colour in whichever Home Assistant colour mode set it last (see colour.py).
+    Description: The static effect shows colour.scaled(brightness), converted with integer maths and cached until the colour or brightness changes. Effects that take a colour get its hue and saturation.
 
-    def __init__(self, led_strip, num_leds, current_leds, target_leds):
-        self.effects = {"None": Effects.static_effect,
-                        "Storm": Effects.storm_effect,
-                        "Rain": Effects.rain_effect,
-                        "Clouds": Effects.clouds_effect,
-                        "Snow": Effects.snow_effect,
-                        "Sun": Effects.sun_effect,
-                        "Sky": Effects.sky_effect,
-                        # "Fire": Effects.fire_effect,
-                        # "Rainbow": Effects.rainbow_effect,
-                        "Chaser": Effects.chaser_effect,
-                        "Sparkles": Effects.sparkles_effect}
-        self.colour_effects = ["None", "Sparkles", "Chaser"]  # Effects that support setting a colour in HS mode
-
-        self.led_strip = led_strip
-        self.num_leds = num_leds
-        self.current_leds = current_leds
-        self.target_leds = target_leds
+    raw_frames, scene
+    Purpose: Decoder for binary frames (see raw_frames.py), shared by the raw MQTT topic and scenes, and the scene file being played.
+    Description: Scenes found in SCENE_DIR are added to effect_list after the built in effects, and played by effects/scene.py.
 
-        self.default_animation_speed = self.animation_step_size = 1
-        self.animation_step_delay = 10
+    fps, fade_steps
+    Purpose: Render cadence the running effect needs, from the FPS and FADE_STEPS constants in its module.
+    Description: While pixels are fading the strip is rendered every frame_interval() ms: often enough for fade_steps visible steps per fade, but no faster than fps. A pixel given a new target, by the effect or a command, is rendered after at most shortest_interval() ms rather than waiting out the rest of a long interval. Slow ambient effects can drop to a few frames a second, and once every pixel has reached its target nothing is rendered at all.
 
+    """
 
-    async def move_to_target(self, current_leds, target_leds, num_leds):
-        for i in range(num_leds):
-            for c in range(3):
-                current = current_leds[i][c]
-                target = target_leds[i][c]
-                delta = target - current
-                step = max(-self.animation_step_size, min(self.animation_step_size, delta))
-                current_leds[i][c] += step
+    STATIC_FPS = 30  # Cadence of the static effect, which fades to Home Assistant's colour with its transition time
+    STATIC_FADE_STEPS = 64
 
-                if abs(current - target) < abs(step):
-                    current_leds[i][c] = target
+    def __init__(self, num_leds, engine):
+        self.scenes = {name: path for name, path in scenes.find().items() if name not in MANIFEST}
+        self.effect_list = list(MANIFEST.keys()) + sorted(self.scenes)
+        self.offered = [name for name in self.effect_list if name not in TRANSIENT]  # The effects Home Assistant can choose
+        self.colour_effects = [name for name, (_, colour) in MANIFEST.items() if colour]  # Effects that support setting a colour in HS mode
 
-        # Introduce a delay between each step to control the animation speed
-        await asyncio.sleep_ms(self.animation_step_delay)
+        self.num_leds = num_leds
+        self.engine = engine
+        self.colour = colour.Colour()
+        self.raw_frames = RawFrames(engine)
+        self.scene = None
+        self.scene_ms = 0  # Recall of the last scene: time to its first frame, and heap taken meanwhile
+        self.scene_bytes = 0
+
+        self.default_transition_ms = 1000
+        self.transition_ms = None
+
+        self.fps = self.STATIC_FPS
+        self.fade_steps = self.STATIC_FADE_STEPS
+
+        self.loaded = None  # Name of the effects.* module currently imported
+        self.load_ms = 0
+        self.load_bytes = 0
+
+    def load(self, effect):
+        """
+        Return the run() coroutine function for an effect, importing its module and releasing the previous one, so only
+        the selected effect's module (effects/scene.py for every scene) is ever in RAM.
+        """
+        self.scene = self.scenes.get(effect)
+        module_name = "scene" if self.scene else MANIFEST[effect][0]
+        if module_name is None:
+            self.unload()
+            self.fps = self.STATIC_FPS
+            self.fade_steps = self.STATIC_FADE_STEPS
+            return Effects.static_run
+
+        full_name = f"effects.{module_name}"
+        if self.loaded != module_name:
+            with _EFFECT_LOAD:
+                self.unload()
+                gc.collect()
+                free = gc.mem_free()
+                start = time.ticks_ms()
+                __import__(full_name)
+                self.load_ms = time.ticks_diff(time.ticks_ms(), start)
+                gc.collect()
+                self.load_bytes = free - gc.mem_free()
+            self.loaded = module_name
+            log.info("Loaded effect %s in %sms, %s bytes", effect, self.load_ms, self.load_bytes)
+        module = sys.modules[full_name]
+        self.fps = module.FPS
+        self.fade_steps = module.FADE_STEPS
+        return module.run
+
+    def unload(self):
+        if self.loaded is None:
+            return
+        full_name = f"effects.{self.loaded}"
+        sys.modules.pop(full_name, None)
+        try:
+            delattr(sys.modules["effects"], self.loaded)  # The package keeps a reference to imported submodules too
+        except (KeyError, AttributeError):
+            pass
+        self.loaded = None
+
+    def shortest_interval(self):
+        return 1000 // self.fps
+
+    def frame_interval(self):
+        return max(self.shortest_interval(), self.engine.duration_ms // self.fade_steps)
+
+    @staticmethod
+    async def static_run(fx, state, brightness, hue, saturation):
+        await fx.static_effect(hue, saturation, brightness, state)
 
     async def status_effect(self, r, g, b):
-        self.animation_step_size = 5
-        self.animation_step_delay = 20
+        self.engine.duration_ms = 500
 
         # print(f"Status Effect: {r}, {g}, {b}")
-        for i in range(self.num_leds):
-            self.target_leds[i] = [r, g, b]
+        self.engine.fill_target([r, g, b])
 
     async def static_effect(self, hue, saturation, brightness, state):
-        self.animation_step_size = 5
-        self.animation_step_delay = 5
-
-        h = round(hue / 360, 2)
-        s = round(saturation / 100, 2)
-        v = round((brightness / 255), 2) if state else 0
-
-        r, g, b = self.hsv_to_rgb(h, s, v)
-
-        print(f"Static Effect: {r}, {g}, {b}. hsv: {h}, {s}, {v}")
-        for i in range(self.num_leds):
-            self.target_leds[i] = [r, g, b]
-
-    async def sparkles_effect(self, hue, saturation, brightness, state):
-        self.animation_step_size = 3
-        self.animation_step_delay = 1
-        frame_speed = 200
-        sparkle_frequency = 0.005
-        brightness = min(max(brightness, 30), 255)  # Min & Max brightness for this effect, to stay within working strip range
-
-        print(f"Sparkles Brightness: {brightness}, hue: {hue}, saturation: {saturation}, brightness: {brightness}")
-
-        if state:
-            if hue == 0 and saturation == 0:
-                hue = 50
-                saturation = 80
-
-            h = hue / 360
-            s = saturation / 100
-            v = brightness / 255 if state else 0
-
-            sparkle_rgb = self.hsv_to_rgb(h, s, v)
-            background_rgb = self.hsv_to_rgb(h, s, v * 0.3)
-
-            print(f"Sparkles Background RGB: {background_rgb}, sparkle_rgb: {sparkle_rgb}")
-            self.target_leds = [background_rgb[:] for _ in range(self.num_leds)]
-
-            while state:
-                for i in range(self.num_leds):
-                    if sparkle_frequency > uniform(0, 1):
-                        self.target_leds[i] = sparkle_rgb[:]
-                    if self.current_leds[i] == self.target_leds[i]:
-                        self.target_leds[i] = background_rgb[:]
-
-                await asyncio.sleep_ms(frame_speed)
-        else:
-            await self.static_effect(0, 0, 0, state)
-
-    async def chaser_effect(self, hue, saturation, brightness, state):
-        self.animation_step_size = 2  # how quickly the light fades to black
-        self.animation_step_delay = 1  # how slow the overall animation is
-        frame_speed = 150  # how fast the light moves
-        brightness = min(max(brightness, 30), 255)  # Min & Max brightness for this effect, to stay within working strip range
-
-        print(f"Chaser Brightness: {brightness}, hue: {hue}, saturation: {saturation}, brightness: {brightness}")
+        self.engine.duration_ms = self.default_transition_ms if self.transition_ms is None else self.transition_ms
 
-        if state:
-            if hue == 0 and saturation == 0:
-                hue = 50
-                saturation = 80
+        rgb = self.colour.scaled(brightness) if state else [0, 0, 0]
 
-            h = hue / 360
-            s = saturation / 100
-            v = brightness / 255 if state else 0
-
-            chaser_rgb = self.scale_brightness(self.hsv_to_rgb(h, s, v), brightness)
-
-            background_rgb = [0, 0, 0]
-
-            print(f"Chaser RGB: {chaser_rgb}")
-            self.target_leds = [background_rgb[:] for _ in range(self.num_leds)]
-            current_led = 0
-
-            while state:
-                for i in range(self.num_leds):
-                    if i == current_led:
-                        self.current_leds[i] = chaser_rgb[:]
-                    if self.current_leds[i] == self.target_leds[i]:
-                        self.target_leds[i] = background_rgb[:]
-
-                if current_led <= self.num_leds:
-                    current_led = (current_led + 1)
-                else:
-                    current_led = 0
-
-                await asyncio.sleep_ms(frame_speed)
-        else:
-            await self.static_effect(0, 0, 0, state)
-
-    async def storm_effect(self, state, brightness):
-        self.animation_step_size = 5
-        self.animation_step_delay = 1
-        frame_speed = 300  # time between colour updates
-        brightness = min(max(brightness, 10), 255)
-        lightning_chance = 0.02
-        raindrop_chance = 0.05
-        background = self.scale_brightness([1, 30, 120], brightness)
-        lightning = self.scale_brightness([255, 255, 255], brightness)
-
-        print(f"Storm Effect. State: {state}, brightness: {brightness}, lightning: {lightning}, background: {background}")
-
-        while state:
-
-            for i in range(self.num_leds):
-                if raindrop_chance > uniform(0, 1):
-                    self.current_leds[i] = self.scale_brightness([randrange(0, 50), randrange(50, 100), randrange(100, 255)], brightness)
-                else:
-                    self.target_leds[i] = background[:]
-
-            if lightning_chance > uniform(0, 1):
-                for x in range(self.num_leds):
-                    self.current_leds[x] = lightning[:]
-
-                # await asyncio.sleep_ms(500)
-
-            await asyncio.sleep_ms(frame_speed)
-
-        await self.static_effect(0, 0, 0, False)
-
-    async def rain_effect(self, state, brightness):
-        # splodgy blues
-
-        self.animation_step_size = 1
-        self.animation_step_delay = 1
-        frame_speed = 200  # time between colour updates
-        brightness = min(max(brightness, 10), 255)  # Min & Max brightness for this effect, to stay within range
-
-        raindrop_chance = 0.01  # moderate rain
-
-        background = self.scale_brightness([0, 15, 60], brightness)
-
-        print(f"Rain Effect: State: {state}, brightness: {brightness}, raindrop_chance: {raindrop_chance}")
-        if state:
-            while state:
-                for i in range(self.num_leds):
-                    if raindrop_chance > uniform(0, 1):
-                        self.current_leds[i] = self.scale_brightness([randrange(0, 50), randrange(20, 100), randrange(50, 255)], brightness)
-                    else:
-                        self.target_leds[i] = background[:]
-                await asyncio.sleep_ms(frame_speed)
-        else:
-            await self.static_effect(0, 0, 0, False)
-
-    async def clouds_effect(self, state, brightness):
-
-        cloud_colour = [165, 168, 138]  # partly cloudy
-        brightness = min(max(brightness, 10), 230)  # Min & Max brightness for this effect, to stay within working strip range
-
-        self.animation_step_size = 5
-        self.animation_step_delay = 1
-        frame_speed = 800  # how many ms between colour updates
-
-        highlight = self.scale_brightness([x + 40 for x in cloud_colour], brightness)
-        lowlight = self.scale_brightness([x - 40 for x in cloud_colour], brightness)
-        normal = self.scale_brightness(cloud_colour, brightness)
-
-        print(f"Clouds Effect: State: {state}, brightness: {brightness}, cloud_colour: {cloud_colour}, self.animation_step_size: {self.animation_step_size}, animation_step_delay: {self.animation_step_delay}")
-        print(f"highlight: {highlight}, lowlight: {lowlight}, normal: {normal}")
-
-        if state:
-            for i in range(self.num_leds):
-                self.target_leds[i] = self.scale_brightness(cloud_colour, brightness)  # paint with initial cloud colour
-
-            while state:
-                # add highlights and lowlights
-                for i in range(self.num_leds):
-                    if uniform(0, 1) < 0.02:  # highlight
-                        self.target_leds[i] = highlight[:]
-                    elif uniform(0, 1) < 0.02:  # lowlight
-                        self.target_leds[i] = lowlight[:]
-                    else:  # normal
-                        self.target_leds[i] = normal[:]
-
-                await asyncio.sleep_ms(frame_speed)
-        else:
-            await self.static_effect(0, 0, 0, False)
-
-    async def snow_effect(self, state, brightness):
-        # splodgy whites
-        self.animation_step_size = 5
-        self.animation_step_delay = 1
-        frame_speed = 200  # time between colour updates
-        brightness = min(max(brightness, 10), 255)  # Min & Max brightness for this effect, to stay within range
-
-        snowflake_chance = 0.003  # moderate snow
-
-        snowflake = self.scale_brightness([227, 227, 227], brightness)
-        backdrop = self.scale_brightness([54, 54, 54], brightness)
-
-        print(f"Snow Effect: State: {state}, brightness: {brightness}, snowflake_chance: {snowflake_chance}")
-        if state:
-
-            while state:
-                for i in range(self.num_leds):
-                    if snowflake_chance > uniform(0, 1):
-                        # paint a snowflake (use current rather than target, for an abrupt change to the drop colour)
-                        self.current_leds[i] = snowflake[:]
-                    else:
-                        # paint backdrop
-                        self.target_leds[i] = backdrop[:]
-                await asyncio.sleep_ms(frame_speed)
-        else:
-            await self.static_effect(0, 0, 0, False)
-
-    async def sun_effect(self, state, brightness):
-        # shimmering yellow
-        self.animation_step_size = 2
-        self.animation_step_delay = 1
-        frame_speed = 425
-
-        brightness = min(max(brightness, 40), 255)  # Min & Max brightness for this effect, to stay within yellow range
-
-        print(f"Sun Effect: State: {state}, brightness: {brightness}, animation_step_size: {self.animation_step_size}, animation_step_delay: {self.animation_step_delay}, frame_speed: {frame_speed}")
-        if state:
-            while True:
-                for i in range(self.num_leds):
-                    self.target_leds[i] = self.scale_brightness([randrange(220, 255), randrange(220, 255), randrange(50, 90)], brightness)
-                await asyncio.sleep_ms(frame_speed)
-        else:
-            await self.static_effect(0, 0, 0, False)
-
-    async def sky_effect(self, state, brightness):
-        # sky blues
-        self.animation_step_size = 2
-        self.animation_step_delay = 1
-        frame_speed = 700
-
-        brightness = min(max(brightness, 10), 230)  # Min & Max brightness for this effect, to stay within range
-
-        print(f"Sky Effect: State: {state}, brightness: {brightness}")
-        if state:
-            while state:
-                for i in range(self.num_leds):
-                    self.target_leds[i] = self.scale_brightness([randrange(0, 40), randrange(130, 190), randrange(170, 220)], brightness)
-
-                await asyncio.sleep_ms(frame_speed)
-        else:
-            await self.static_effect(0, 0, 0, False)
+        if log.DEBUG_ON:
+            log.debug("Static Effect: %s, %s: %s, brightness: %s, transition: %sms", rgb, self.colour.mode, self.colour.value, brightness, self.engine.duration_ms)
+        self.engine.fill_target(rgb)
 
     @micropython.native
     @staticmethod
@@ -420,36 +377,6 @@ class Effects:
         factor = brightness / 255
         return [int(color * factor) for color in rgb]
 
-    @micropython.native
-    @staticmethod
-    def rgb_to_hsv_integer(r, g, b):
-        # Scale the RGB values to be in the range of 0 to 255
-        r, g, b = r * 1000 // 255, g * 1000 // 255, b * 1000 // 255
-        max_c = max(r, g, b)
-        min_c = min(r, g, b)
-        delta = max_c - min_c
-
-        # Note: We're using scaled values to maintain precision
-        h = 0
-        if delta == 0:
-            h = 0
-        else:
-            if max_c == r:
-                h = ((60000 * (g - b) // delta) + 360000) % 360000
-            elif max_c == g:
-                h = ((60000 * (b - r) // delta) + 120000) % 360000
-            else:  # max_c == b
-                h = ((60000 * (r - g) // delta) + 240000) % 360000
-
-        # Calculate saturation
-        s = 0 if max_c == 0 else (100000 * delta // max_c)
-
-        # Calculate value
-        v = max_c * 100 // 1000
-
-        # Scale back to desired range and return
-        return h // 1000, s // 1000, v
-
     @micropython.native
     @staticmethod
     def hsv_to_rgb(hue, saturation, value):
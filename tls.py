@@ -0,0 +1,97 @@
+# HomeAssistant Plasma - tls.py
+# (c) 2024 Snapcase
+# TLS for the MQTT connection. A TlsContext lives as long as the device, so the CA certificate is parsed once rather
+# than on every reconnect. open() makes the TCP connection and handshake() secures it, then the socket is handed to
+# umqtt's MQTTClient.connect(sock=...).
+#
+# Session resumption does nothing on the device. It would skip the certificate exchange and key agreement, most of a
+# handshake's seconds of CPU on the RP2040, but needs TLS sessions in the ssl module, and stock MicroPython's ssl has
+# none: RESUMPTION is False and every reconnect is a full handshake. It is only used where ssl.SSLSession exists, as in
+# the host tools.
+#
+# The handshake is stepped without blocking, a record at a time, yielding to the event loop between steps so effects
+# keep running, and gc.mem_free is read at each step (mbedtls buffers live on the MicroPython heap). That gives the
+# peak heap while it runs, including anything other tasks allocate meanwhile, as well as what the connection holds
+# once it's up.
+
+import gc
+import socket
+import ssl
+import time
+
+import asyncio
+from micropython import const
+
+import log
+
+try:
+    import config_local as CONFIG
+except ImportError:
+    import CONFIG
+
+
+RESUMPTION = hasattr(ssl, "SSLSession")
+
+_HANDSHAKE_TIMEOUT_MS = const(30000)
+
+
+class TlsContext:
+    def __init__(self, cafile=None, context=None):
+        self.context = context or ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+        self.context.verify_mode = ssl.CERT_REQUIRED
+        self.context.load_verify_locations(cafile=cafile or CONFIG.MQTT_CA_FILE)
+        self.session = None
+        self.handshakes = 0
+        self.resumed = 0
+        self.handshake_us = 0  # Last handshake
+        self.heap = 0  # Heap held by the last connection just after its handshake
+        self.peak = 0  # Most heap taken at any point in the last handshake
+
+    def open(self, server, port):
+        """The TCP connection to the broker, not yet secured. Blocks for DNS and connect, as umqtt would."""
+        sock = socket.socket()
+        sock.connect(socket.getaddrinfo(server, port)[0][-1])
+        return sock
+
+    async def handshake(self, sock, server_hostname):
+        """The TLS socket over sock, once the handshake is done."""
+        gc.collect()  # The handshake wants large contiguous buffers
+        free = gc.mem_free()
+        lowest = free
+        start = time.ticks_us()
+        sock.setblocking(False)
+        if self.session is None:
+            tls_sock = self.context.wrap_socket(sock, server_hostname=server_hostname, do_handshake_on_connect=False)
+        else:
+            tls_sock = self.context.wrap_socket(sock, server_hostname=server_hostname, do_handshake_on_connect=False, session=self.session)
+        try:
+            while tls_sock.write(b"") is None:  # None until the handshake is done, each call taking it as far as it can go
+                lowest = min(lowest, gc.mem_free())
+                if time.ticks_diff(time.ticks_us(), start) > _HANDSHAKE_TIMEOUT_MS * 1000:
+                    raise OSError("TLS handshake timed out")
+                await asyncio.sleep_ms(0)
+        except Exception:
+            tls_sock.close()
+            raise
+        tls_sock.setblocking(True)
+        self.handshake_us = time.ticks_diff(time.ticks_us(), start)
+        held = gc.mem_free()
+        self.heap = free - held
+        self.peak = free - min(lowest, held)
+        self.handshakes += 1
+        resumed = getattr(tls_sock, "session_reused", False)
+        if resumed:
+            self.resumed += 1
+        log.info("MQTT: TLS handshake %sms, %s bytes heap at peak, %s held, %s", self.handshake_us // 1000, self.peak, self.heap,
+                 "resumed" if resumed else "full")
+        return tls_sock
+
+    def keep_session(self, tls_sock):
+        """Keep the session to resume on the next connect. Called once connected: with TLS 1.3 the broker only sends
+        its session ticket after the handshake, so it has arrived by the time CONNACK has been read."""
+        if RESUMPTION:
+            self.session = tls_sock.session
+
+    def metrics(self):
+        return {"handshakes": self.handshakes, "resumption": RESUMPTION, "resumed": self.resumed, "handshake_ms": self.handshake_us // 1000,
+                "heap": self.heap, "peak": self.peak}
@@ -0,0 +1,87 @@
+# HomeAssistant Plasma - tools/bench_cadence.py
+# Compares the adaptive render cadence (each effect's FPS / FADE_STEPS, and no frames while the strip is settled)
+# with the old fixed 20 FPS render loop: frames rendered and host CPU spent rendering them, per effect.
+# On the device, StripController logs the same numbers whenever the effect changes ("Effect ... rendered ...").
+#
+#     python tools/bench_cadence.py [--seconds 60] [Clouds Sky ...]
+
+import argparse
+import os
+import random
+import time
+
+import sim
+
+import contextlib
+import io
+
+import asyncio
+
+import log
+from effects import MANIFEST
+from outputs import RecordingOutput
+from strip_controller import StripController
+
+
+async def fixed_loop(controller, stats):
+    # update_led_strip_task before the adaptive cadence
+    while True:
+        start = time.perf_counter()
+        controller.engine.step()
+        stats["cpu"] += time.perf_counter() - start
+        stats["frames"] += 1
+        controller.output.show(controller.power.limit(controller.engine.current_leds, controller.engine.channel_sum))
+        await asyncio.sleep_ms(50)
+
+
+async def render(effect, seconds, fixed):
+    random.seed(effect)
+    stats = {"frames": 0, "cpu": 0.0}
+    controller = StripController(RecordingOutput(sim.CONFIG.NUM_LEDS))
+    controller.update_task.cancel()
+    if fixed:
+        asyncio.create_task(fixed_loop(controller, stats))
+    else:
+        engine = controller.engine
+        step = engine.step
+
+        def timed_step():
+            start = time.perf_counter()
+            step()
+            stats["cpu"] += time.perf_counter() - start
+            stats["frames"] += 1
+
+        engine.step = timed_step
+        controller.update_task = asyncio.create_task(controller.update_led_strip_task())
+    await controller.set_state(state=True, brightness=200, hue=30, saturation=80, effect=effect)
+    await asyncio.sleep_ms(seconds * 1000)
+    return stats
+
+
+def run(effect, seconds, fixed):
+    for name in os.listdir("."):
+        os.remove(name)
+    with contextlib.redirect_stdout(io.StringIO()):
+        return sim.run(render(effect, seconds, fixed))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("effects", nargs="*", default=list(MANIFEST))
+    parser.add_argument("--seconds", type=int, default=60)
+    args = parser.parse_args()
+
+    log.set_level("OFF", "OFF")
+    sim.flash_dir()
+    print(f"{args.seconds}s per effect, {sim.CONFIG.NUM_LEDS} LEDs. CPU is host time in the transition step\n")
+    print(f"{'effect':10} {'fixed frames':>13} {'adaptive':>9} {'avg FPS':>8} {'fixed CPU':>10} {'adaptive':>9} {'saved':>6}")
+    for effect in args.effects:
+        fixed = run(effect, args.seconds, True)
+        adaptive = run(effect, args.seconds, False)
+        saved = 1 - adaptive["frames"] / fixed["frames"]
+        print(f"{effect:10} {fixed['frames']:13} {adaptive['frames']:9} {adaptive['frames'] / args.seconds:8.1f} "
+              f"{fixed['cpu'] * 1000:8.0f}ms {adaptive['cpu'] * 1000:7.0f}ms {saved:6.0%}")
+
+
+if __name__ == "__main__":
+    main()
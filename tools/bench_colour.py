@@ -0,0 +1,95 @@
+# HomeAssistant Plasma - tools/bench_colour.py
+# Accuracy and cost of the integer colour path (colour.py) against the float path the static effect used before it:
+# hue and saturation rounded to two decimals, then Effects.hsv_to_rgb. Both are checked against colorsys in floats.
+#   hs -> rgb       every whole hue at a range of saturations and brightnesses
+#   rgb -> hs -> rgb random colours, as when an rgb command is reported back as hue and saturation
+# Cost is per command on the host, for a new colour and for a repeat of the last one (cached in colour.Colour).
+#
+#     python tools/bench_colour.py
+
+import colorsys
+import random
+import time
+
+import sim  # noqa: F401
+
+import colour
+from strip_controller import Effects
+
+ROUNDS = 20000
+
+
+def float_hs(hue, saturation, brightness):
+    return Effects.hsv_to_rgb(round(hue / 360, 2), round(saturation / 100, 2), round(brightness / 255, 2))
+
+
+def integer_hs(hue, saturation, brightness):
+    return [c * brightness // 255 for c in colour.hs_to_rgb(hue, saturation)]
+
+
+def reference(hue, saturation, brightness):
+    return [round(c * brightness) for c in colorsys.hsv_to_rgb(hue / 360, saturation / 100, 1)]
+
+
+def float_round_trip(r, g, b):
+    h, s, v = colorsys.rgb_to_hsv(r / 255, g / 255, b / 255)
+    return Effects.hsv_to_rgb(round(h, 2), round(s, 2), round(v, 2))
+
+
+def integer_round_trip(r, g, b):
+    hue, saturation = colour.rgb_to_hs(r, g, b)
+    return integer_hs(hue, saturation, max(r, g, b))
+
+
+def errors(pairs):
+    diffs = [abs(a - b) for got, want in pairs for a, b in zip(got, want)]
+    return max(diffs), sum(diffs) / len(diffs)
+
+
+def timed_us(function, cases):
+    start = time.perf_counter()
+    for i in range(ROUNDS):
+        function(*cases[i % len(cases)])
+    return (time.perf_counter() - start) / ROUNDS * 1e6
+
+
+def main():
+    random.seed(1)
+    hs_cases = [(h, s, b) for h in range(360) for s in range(0, 101, 10) for b in (40, 128, 255)]
+    rgb_cases = [tuple(random.randrange(256) for _ in range(3)) for _ in range(5000)]
+
+    print(f"{'':24} {'max error':>10} {'mean error':>11}")
+    for name, convert in (("hs -> rgb, float", float_hs), ("hs -> rgb, integer", integer_hs)):
+        worst, mean = errors((convert(*case), reference(*case)) for case in hs_cases)
+        print(f"{name:24} {worst:10} {mean:11.2f}")
+    for name, convert in (("rgb round trip, float", float_round_trip), ("rgb round trip, integer", integer_round_trip)):
+        worst, mean = errors((convert(*case), case) for case in rgb_cases)
+        print(f"{name:24} {worst:10} {mean:11.2f}")
+
+    current = colour.Colour()
+
+    def integer_command(hue, saturation, brightness):
+        current.set("hs", (hue, saturation))
+        return current.scaled(brightness)
+
+    def rgb_command(r, g, b):
+        current.set("rgb", (r, g, b))
+        return current.hs(), current.scaled(200)
+
+    def temp_command(mireds):
+        current.set("color_temp", mireds)
+        return current.hs(), current.scaled(200)
+
+    print(f"\n{'per command, host':24} {'new colour':>10} {'repeated':>9}")
+    rows = (
+        ("hs, float", float_hs, hs_cases, hs_cases[:1]),
+        ("hs, integer", integer_command, hs_cases, hs_cases[:1]),
+        ("rgb, integer", rgb_command, rgb_cases, rgb_cases[:1]),
+        ("color_temp, integer", temp_command, [(m,) for m in range(colour.MIN_MIREDS, colour.MAX_MIREDS)], [(300,)]),
+    )
+    for name, function, cases, repeated in rows:
+        print(f"{name:24} {timed_us(function, cases):8.2f}us {timed_us(function, repeated):7.2f}us")
+
+
+if __name__ == "__main__":
+    main()
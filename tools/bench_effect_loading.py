@@ -0,0 +1,79 @@
+# HomeAssistant Plasma - tools/bench_effect_loading.py
+# Compares importing every effect module up front against loading them on demand through Effects.load().
+# Host numbers (CPython bytecode) are only indicative; on the device, Effects.load() logs the import time and heap
+# used for each effect as it is selected ("Loaded effect ... in ...ms, ... bytes").
+#
+#     python tools/bench_effect_loading.py
+
+import sim
+
+import gc
+import sys
+import time
+import tracemalloc
+
+import log
+from effects import MANIFEST
+from strip_controller import Effects
+from transitions import TransitionEngine
+
+try:
+    import config_local as CONFIG
+except ImportError:
+    import CONFIG
+
+
+def forget_effect_modules():
+    package = sys.modules["effects"]
+    for name, (module_name, _) in MANIFEST.items():
+        if module_name:
+            sys.modules.pop(f"effects.{module_name}", None)
+            package.__dict__.pop(module_name, None)
+
+
+def held_bytes(function, reset, repeats=5):
+    """Time and heap held by function(), taking the smallest of a few runs to filter out host import-cache noise."""
+    results = []
+    for _ in range(repeats):
+        reset()
+        gc.collect()
+        base = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        function()
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        gc.collect()
+        results.append((elapsed_ms, tracemalloc.get_traced_memory()[0] - base))
+    return min(ms for ms, _ in results), min(held for _, held in results)
+
+
+def import_all():
+    for module_name, _ in MANIFEST.values():
+        if module_name:
+            __import__(f"effects.{module_name}")
+
+
+def main():
+    log.set_level("WARNING")  # Effects.load() logs each load at INFO
+    count = len([module_name for module_name, _ in MANIFEST.values() if module_name])
+    fx = Effects(CONFIG.NUM_LEDS, TransitionEngine(CONFIG.NUM_LEDS))
+    tracemalloc.start()
+
+    eager_ms, eager_bytes = held_bytes(import_all, forget_effect_modules)
+    forget_effect_modules()
+
+    print(f"{'Effect':10} {'load ms':>8} {'bytes':>8}")
+    largest = 0
+    for name in MANIFEST:
+        load_ms, load_bytes = held_bytes(lambda: fx.load(name), fx.unload)
+        largest = max(largest, load_bytes)
+        print(f"{name:10} {load_ms:8.2f} {load_bytes:8}")
+    fx.unload()
+    tracemalloc.stop()
+
+    print(f"\n{count} effect modules (+ built in static)")
+    print(f"Eager, all effects imported:   {eager_ms:7.2f}ms, {eager_bytes} bytes held")
+    print(f"Lazy, one effect at a time:    at most {largest} bytes held")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+# HomeAssistant Plasma - tools/bench_http.py
+# Latency of light commands over the local HTTP API against the MQTT path, in the simulator in real time.
+# HTTP commands come from a real HTTP client over loopback; MQTT commands are handed to mqtt_callback as umqtt would,
+# so the MQTT figures leave out the broker hops (HA -> broker -> device) that HTTP doesn't have at all.
+#
+#     python tools/bench_http.py [--requests 200] [--port 8080]
+
+import argparse
+import http.client
+import json
+import time
+
+import sim
+
+import asyncio
+import contextlib
+import io
+import tracemalloc
+
+import log
+from replay import summary
+
+
+def http_command(port, body):
+    start = time.perf_counter()
+    connection = http.client.HTTPConnection("127.0.0.1", port)
+    connection.request("POST", "/state", body, {"Content-Type": "application/json"})
+    response = connection.getresponse()
+    response.read()
+    connection.close()
+    return (time.perf_counter() - start) * 1000, response.status
+
+
+async def bench(args):
+    from main import COMMAND_TOPIC, HomeAssistantPlasmaStick, STATE_TOPIC
+    from http_api import HttpApi
+
+    stick = HomeAssistantPlasmaStick()
+    client = stick.mqtt_client = sim.FakeMQTTClient()
+    api = HttpApi(stick, args.port)
+    await api.start()
+
+    state_published = []
+    publish = client.publish
+
+    def timed_publish(topic, msg, retain=False, qos=0):
+        if topic == STATE_TOPIC:
+            state_published.append(time.perf_counter())
+        publish(topic, msg, retain, qos)
+
+    client.publish = timed_publish
+
+    handled = []
+    handle = api.handle
+
+    async def timed_handle(reader, writer):
+        handled.append(time.perf_counter())
+        await handle(reader, writer)
+
+    api.server.close()
+    await api.server.wait_closed()
+    api.server = await asyncio.start_server(timed_handle, "127.0.0.1", args.port)
+
+    commands = [json.dumps({"state": "ON", "brightness": 20 + i % 200}) for i in range(args.requests)]
+    loop = asyncio.get_running_loop()
+    results = {"http round trip": [], "http request -> state publish": [], "mqtt message -> state publish": []}
+    failures = 0
+
+    for body in commands[:5]:  # Warm up: http.client and the event loop import and cache things on first use
+        await loop.run_in_executor(None, http_command, args.port, body)
+        stick.mqtt_callback(COMMAND_TOPIC.encode(), body.encode())
+        await asyncio.sleep(0.05)
+    del state_published[:]
+    client.published.clear()
+
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    for body in commands:
+        published = len(state_published)
+        ms, status = await loop.run_in_executor(None, http_command, args.port, body)
+        failures += status != 200
+        results["http round trip"].append(ms)
+        if len(state_published) > published:
+            results["http request -> state publish"].append((state_published[-1] - handled[-1]) * 1000)
+    http_heap = tracemalloc.get_traced_memory()[0] - base
+
+    base = tracemalloc.get_traced_memory()[0]
+    for body in commands:
+        published = len(state_published)
+        start = time.perf_counter()
+        stick.mqtt_callback(COMMAND_TOPIC.encode(), body.encode())
+        while len(state_published) == published:
+            await asyncio.sleep(0)
+        results["mqtt message -> state publish"].append((state_published[-1] - start) * 1000)
+    mqtt_heap = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+
+    api.server.close()
+    return results, failures, http_heap, mqtt_heap
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--port", type=int, default=8080)
+    args = parser.parse_args()
+
+    log.set_level("OFF", "OFF")
+    sim.flash_dir()
+    with contextlib.redirect_stdout(io.StringIO()):
+        results, failures, http_heap, mqtt_heap = sim.run(bench(args), virtual=False)
+
+    print(f"{args.requests} commands each way, host ms ({failures} HTTP failures)")
+    for name, values in results.items():
+        print(f"  {name:30} {summary(values)}")
+    print(f"  heap retained after all requests: HTTP {http_heap} bytes, MQTT {mqtt_heap} bytes (host, includes the fake MQTT client's log of publishes)")
+
+
+if __name__ == "__main__":
+    main()
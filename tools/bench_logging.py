@@ -0,0 +1,66 @@
+# HomeAssistant Plasma - tools/bench_logging.py
+# Measures what logging costs per light command: runs the same commands through process_incoming_message with logging
+# at DEBUG and with it OFF, and reports the peak transient allocation and time per command.
+#
+#     python tools/bench_logging.py [--commands 500]
+
+import argparse
+
+import sim
+
+import contextlib
+import io
+import time
+import tracemalloc
+
+import log
+import main as device
+from main import HomeAssistantPlasmaStick
+
+COMMANDS = [
+    '{"state": "ON", "brightness": %d}',
+    '{"state": "ON", "color": {"h": %d, "s": 80}}',
+    '{"brightness": %d, "transition": 0.5}',
+    '{"state": "ON", "effect": "None", "brightness": %d}',
+]
+
+
+async def run_commands(level, count):
+    log.set_level(level, level)
+    stick = HomeAssistantPlasmaStick()
+    stick.mqtt_client = sim.FakeMQTTClient()
+    messages = [COMMANDS[i % len(COMMANDS)] % (i % 255) for i in range(count)]
+
+    peaks = []
+    start = time.perf_counter()
+    for msg in messages:
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        await stick.process_incoming_message(device.COMMAND_TOPIC, msg)
+        peaks.append(tracemalloc.get_traced_memory()[1] - base)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    return sum(peaks) / len(peaks), elapsed_ms / count
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--commands", type=int, default=500)
+    args = parser.parse_args()
+
+    sim.flash_dir()
+    tracemalloc.start()
+    results = {}
+    for level in ("DEBUG", "INFO", "OFF"):
+        with contextlib.redirect_stdout(io.StringIO()):  # Console output isn't the point, only the work to produce it
+            results[level] = sim.run(run_commands(level, args.commands))
+    tracemalloc.stop()
+
+    print(f"{'Log level':10} {'peak bytes/cmd':>15} {'ms/cmd':>8}")
+    for level, (peak, ms) in results.items():
+        print(f"{level:10} {peak:15.0f} {ms:8.3f}")
+    saved = results["DEBUG"][0] - results["OFF"][0]
+    print(f"\nLogging off saves {saved:.0f} bytes of transient allocation per command ({saved / results['DEBUG'][0]:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+# HomeAssistant Plasma - tools/bench_outputs.py
+# Frame rate of a long strip split over several WS2812 chains (LED_OUTPUTS), using outputs.WireOutput chains that take
+# as long on the wire as real ones (30us per LED plus the reset gap). Each frame is rendered by the transition engine
+# with every LED fading, then shown, as update_led_strip_task does. With one chain the wire time of the whole strip
+# caps the rate; with the strip split, the chains go out together and only the longest one counts.
+# Render times are host CPU, so the uncapped rates are only indicative; the wire times are those of the device.
+#
+#     python tools/bench_outputs.py [--leds 300 600 1200] [--chains 1 2 4] [--seconds 1]
+
+import argparse
+import time
+
+import sim  # noqa: F401
+
+import log
+import outputs
+from transitions import TransitionEngine
+
+
+def run(engine, output, seconds):
+    """Frames per second, and the share of the time spent waiting for a chain to finish sending."""
+    frames = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        if not engine.moving:
+            engine.fill_target([(frames * 37) % 256, 0, 255 - (frames * 37) % 256])
+        engine.step()
+        output.show(engine.current_leds)
+        frames += 1
+    elapsed = time.perf_counter() - start
+    waited_us = sum(chain.waited_us for chain in output.outputs)
+    return frames / elapsed, waited_us / 1e6 / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--leds", type=int, nargs="+", default=[300, 600, 1200])
+    parser.add_argument("--chains", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--seconds", type=float, default=1)
+    args = parser.parse_args()
+    log.set_level("OFF", "OFF")
+
+    print(f"{'LEDs':>5} {'chains':>6} {'wire ms':>8} {'FPS':>6} {'waiting':>8} {'speedup':>8}")
+    for n in args.leds:
+        baseline = None
+        for count in args.chains:
+            sizes = [n // count + (1 if i < n % count else 0) for i in range(count)]
+            output = outputs.create("recording", n, [(i, 0, i, leds) for i, leds in enumerate(sizes)])
+            engine = TransitionEngine(n)
+            engine.duration_ms = 200
+            fps, waiting = run(engine, output, args.seconds)
+            baseline = baseline or fps
+            wire_ms = max(chain.wire_us for chain in output.outputs) / 1000
+            print(f"{n:5} {count:6} {wire_ms:8.2f} {fps:6.0f} {waiting:8.0%} {fps / baseline:7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# HomeAssistant Plasma - tools/bench_palette.py
+# Host timings for the palette effects: one frame rendered from precomputed palette and noise tables
+# (TransitionEngine.render_palette) against working out each pixel's colour in Python every frame, as the old Pimoroni
+# fire and rainbow examples did. Also the one-off cost of building the tables when the effect starts.
+# On the device, tools/check_kernels.py times the viper palette_fill kernel.
+#
+#     python tools/bench_palette.py [--leds 50 300]
+
+import argparse
+import math
+import random
+import time
+from array import array
+
+import sim  # noqa: F401
+
+import kernels
+import palettes
+from strip_controller import Effects
+from transitions import TransitionEngine
+
+ROUNDS = 50
+
+
+def timed_us(function, rounds=ROUNDS):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        function()
+    return (time.perf_counter() - start) / rounds * 1e6
+
+
+def per_pixel_rainbow(fx, n, offset):
+    for i in range(n):
+        fx.engine.set_target(i, fx.hsv_to_rgb((i / n + offset) % 1, 1, 0.8))
+
+
+def per_pixel_fire(fx, n, offset):
+    # Two octaves of smooth noise and the fire gradient, worked out per pixel
+    for i in range(n):
+        heat = (math.sin(i * 0.37 + offset * 9) + math.sin(i * 0.11 - offset * 2.5) + 2) / 4
+        index = int(heat * 255)
+        for (start, start_rgb), (end, end_rgb) in zip(palettes.FIRE, palettes.FIRE[1:]):
+            if index <= end:
+                t = (index - start) / (end - start)
+                fx.engine.set_target(i, [int(a + (b - a) * t) for a, b in zip(start_rgb, end_rgb)])
+                break
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--leds", type=int, nargs="+", default=[50, 300])
+    args = parser.parse_args()
+    random.seed(1)
+
+    for n in args.leds:
+        engine = TransitionEngine(n)
+        fx = Effects(n, engine)
+        params = array("i", [0] * kernels.F_SIZE)
+        params[kernels.F_COUNT] = n
+        params[kernels.F_STEP1] = 2400
+        params[kernels.F_STEP2] = 700
+
+        build_fire_us = timed_us(lambda: palettes.tables(palettes.gradient(palettes.FIRE, 200), palettes.noise()), 5)
+        build_rainbow_us = timed_us(lambda: palettes.tables(palettes.hue_wheel(fx.hsv_to_rgb, 200), palettes.ramp()), 5)
+        fire = palettes.tables(palettes.gradient(palettes.FIRE, 200), palettes.noise())
+        rainbow = palettes.tables(palettes.hue_wheel(fx.hsv_to_rgb, 200), palettes.ramp())
+
+        print(f"\n{n} LEDs, host us per frame (tables: {len(fire)} bytes per effect)")
+        print(f"  {'':8} {'tables':>10} {'per pixel':>10} {'table build':>12}")
+        for name, table, per_pixel, build_us in (("Fire", fire, per_pixel_fire, build_fire_us),
+                                                 ("Rainbow", rainbow, per_pixel_rainbow, build_rainbow_us)):
+            table_us = timed_us(lambda: engine.render_palette(table, params))
+            offset = [0.0]
+
+            def frame():
+                offset[0] += 0.01
+                per_pixel(fx, n, offset[0])
+                engine.step()
+
+            pixel_us = timed_us(frame)
+            print(f"  {name:8} {table_us:8.0f}us {pixel_us:8.0f}us {build_us:10.0f}us")
+
+
+if __name__ == "__main__":
+    main()
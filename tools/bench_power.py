@@ -0,0 +1,83 @@
+# HomeAssistant Plasma - tools/bench_power.py
+# Runs effects on a long strip in the simulator with a current budget, and reports the estimated peak draw with and
+# without limiting. Also checks every frame that the engine's running channel sum matches a full rescan of the strip,
+# and compares the cost of the two.
+#
+#     python tools/bench_power.py [--leds 300] [--budget 3000] [Storm Snow ...]
+
+import argparse
+import os
+import random
+import time
+
+import sim
+
+import contextlib
+import io
+
+import asyncio
+
+import log
+from outputs import RecordingOutput
+from power import PowerLimiter
+from strip_controller import StripController
+
+SECONDS = 30
+
+
+async def render(effect, leds, budget, result):
+    random.seed(effect)
+    sim.CONFIG.NUM_LEDS = leds
+    output = RecordingOutput(leds)
+    controller = StripController(output)
+    controller.power = limiter = PowerLimiter(leds, budget)
+    engine = controller.engine
+
+    show = output.show
+    rescan_s = 0
+
+    def checking_show(buffer):
+        nonlocal rescan_s
+        start = time.perf_counter()
+        channel_sum = sum(engine.current_leds)
+        rescan_s += time.perf_counter() - start
+        if channel_sum != engine.channel_sum:
+            result["mismatches"] += 1
+        after_limit = limiter.idle_ma + sum(buffer) * limiter.channel_ma // 255
+        result["peak_after"] = max(result["peak_after"], after_limit)
+        show(buffer)
+
+    output.show = checking_show
+    await controller.set_state(state=True, brightness=255, hue=0, saturation=0, effect=effect)
+    await asyncio.sleep_ms(SECONDS * 1000)
+
+    result["frames"] = output.frames
+    result["rescan_us"] = rescan_s / output.frames * 1e6
+    result["report"] = limiter.report()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("effects", nargs="*", default=["Storm", "Snow", "None"])
+    parser.add_argument("--leds", type=int, default=300)
+    parser.add_argument("--budget", type=int, default=3000, help="POWER_BUDGET_MA to test with")
+    args = parser.parse_args()
+
+    log.set_level("OFF", "OFF")
+    sim.flash_dir()
+    print(f"{args.leds} LEDs at full brightness, {args.budget}mA budget, {SECONDS}s each\n")
+    print(f"{'effect':10} {'peak wanted':>12} {'peak shown':>11} {'limited':>9} {'sum mismatches':>15} {'rescan':>9}")
+    for effect in args.effects:
+        for name in os.listdir("."):
+            os.remove(name)
+        result = {"mismatches": 0, "peak_after": 0}
+        with contextlib.redirect_stdout(io.StringIO()):
+            sim.run(render(effect, args.leds, args.budget, result))
+        report = result["report"]
+        print(f"{effect:10} {report['requested']:10}mA {result['peak_after']:9}mA {report['limited_frames']:9} "
+              f"{result['mismatches']:15} {result['rescan_us']:7.0f}us")
+    print("\nThe running sum costs one add per frame; 'rescan' is what summing the strip every frame costs on the host.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# HomeAssistant Plasma - tools/bench_raw.py
+# Decode time of raw frame messages (raw_frames.py) in the simulator, per message and per KB, for each kind, against
+# the same frame sent as JSON and applied pixel by pixel. Also the heap each message leaves allocated.
+# The host runs kernels.raw_fill_ref; on the device, tools/check_kernels.py times the viper raw_fill.
+#
+#     python tools/bench_raw.py [--leds 50 300]
+
+import argparse
+import json
+import random
+import time
+import tracemalloc
+
+import sim  # noqa: F401
+
+import log
+import raw_frames
+from transitions import TransitionEngine
+
+ROUNDS = 200
+
+
+def messages(n):
+    frame = bytes(random.getrandbits(8) for _ in range(n * 3))
+    runs = bytearray()
+    for i in range(0, n, 10):  # Blocks of 10 pixels of one colour
+        runs += bytes([min(10, n - i)]) + frame[i * 3:i * 3 + 3]
+    return {
+        "palette": bytes([3, 0, 0, 0]) + bytes(random.getrandbits(8) for _ in range(768)),  # First, for indexed frames
+        "RGB": bytes([0, 0, 0, 0]) + frame,
+        "RLE": bytes([1, 0, 0, 0]) + runs,
+        "indexed": bytes([2, 0, 0, 0]) + bytes(random.getrandbits(8) for _ in range(n)),
+        "JSON": json.dumps({"pixels": [list(frame[i:i + 3]) for i in range(0, n * 3, 3)]}).encode(),
+    }
+
+
+def json_frame(engine, msg):
+    for i, rgb in enumerate(json.loads(msg)["pixels"]):
+        engine.set_current(i, rgb)
+
+
+def measure(decode, msg):
+    decode(msg)  # Warm up, and load the palette tables for indexed frames
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    decode(msg)
+    heap = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        decode(msg)
+    return (time.perf_counter() - start) / ROUNDS * 1e6, heap
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--leds", type=int, nargs="+", default=[50, 300])
+    args = parser.parse_args()
+    random.seed(1)
+    log.set_level("OFF", "OFF")
+
+    for n in args.leds:
+        engine = TransitionEngine(n)
+        frames = raw_frames.RawFrames(engine, 1)
+        print(f"\n{n} LEDs, host")
+        print(f"  {'':8} {'bytes':>6} {'us/message':>11} {'us/KB':>8} {'heap':>7}")
+        for name, msg in messages(n).items():
+            if name == "JSON":
+                us, heap = measure(lambda m: json_frame(engine, m), msg)
+            else:
+                us, heap = measure(lambda m: frames.decode(m, 200), msg)
+            print(f"  {name:8} {len(msg):6} {us:11.1f} {us * 1024 / len(msg):8.1f} {heap:7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+# HomeAssistant Plasma - tools/bench_scenes.py
+# Recall of compiled scenes (scenes.py, effects/scene.py) in the simulator: time from selecting the scene to its first
+# frame being in the frame buffer, and peak heap meanwhile, against computing the same first frame live per pixel the
+# way an effect would, with hsv_to_rgb and set_current. Scenes are compiled from tools/scenes.json into a scratch
+# flash directory first. The scene file is opened unbuffered: CPython's default file buffer (4-8KB) would otherwise be
+# most of the heap reported for a recall, and MicroPython's files have nothing like it. What's left is about 2KB on the
+# host however long the scene is: the record buffer read into with readinto(), and the coroutine, file and header
+# objects, which are far smaller on the device.
+# On the device, effects/scene.py logs both for each recall ("Scene ...: first shown in ...") and /metrics reports them.
+#
+#     python tools/bench_scenes.py [--leds 50 300] [--chunk 512]
+
+import argparse
+import gc
+import json
+import os
+import time
+import tracemalloc
+
+import sim
+
+import log
+import scene_compiler
+import scenes
+from effects import scene
+from strip_controller import Effects
+from transitions import TransitionEngine
+
+ROUNDS = 20
+
+
+class Shown(Exception):
+    pass
+
+
+async def first_hold(ms):
+    raise Shown  # The first frame is in the frame buffer: stop the scene there
+
+
+def live(engine, spec, n):
+    frame = next(scene_compiler.frames(spec, n))
+    for i, rgb in enumerate(frame):
+        engine.set_current(i, rgb)
+
+
+def unbuffered(path, mode):
+    return open(path, mode, buffering=0)
+
+
+def recall(fx):
+    scene.asyncio.sleep_ms = first_hold
+    try:
+        scene.run(fx, True, 200, 0, 0).send(None)  # Stepped by hand: only file reads and decoding happen before the first hold
+    except Shown:
+        pass
+
+
+def measure(function):
+    function()
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        function()
+    return (time.perf_counter() - start) / ROUNDS * 1000, peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--leds", type=int, nargs="+", default=[50, 300])
+    parser.add_argument("--chunk", type=int, default=512)
+    args = parser.parse_args()
+    log.set_level("OFF", "OFF")
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "scenes.json")) as f:
+        definitions = json.load(f)
+    directory = os.path.join(sim.flash_dir(), "scenes")
+    os.makedirs(directory, exist_ok=True)
+
+    sleep_ms = scene.asyncio.sleep_ms
+    scene.open = unbuffered
+    collect = gc.collect
+    gc.collect = lambda: 0  # A full CPython collection takes ms, dwarfing the recall itself; the device's is far cheaper
+    try:
+        for n in args.leds:
+            for name, spec in definitions.items():
+                data, _, _ = scene_compiler.compile_scene(spec, n, args.chunk, 0)
+                with open(os.path.join(directory, name + scenes.EXTENSION), "wb") as f:
+                    f.write(data)
+            engine = TransitionEngine(n)
+            fx = Effects(n, engine)
+            fx.scenes = scenes.find(directory)
+
+            print(f"\n{n} LEDs, host: first frame of each scene")
+            print(f"  {'':12} {'frames':>6} {'file':>7} {'scene ms':>9} {'heap':>7} {'live ms':>8} {'heap':>7}")
+            for name, spec in definitions.items():
+                fx.scene = fx.scenes[name]
+                _, _, frames, _ = scenes.read_header(open(fx.scene, "rb").read(scenes.HEADER_SIZE))
+                scene_ms, scene_heap = measure(lambda: recall(fx))
+                live_ms, live_heap = measure(lambda: live(engine, spec, n))
+                print(f"  {name:12} {frames:6} {os.path.getsize(fx.scene):7} {scene_ms:9.2f} {scene_heap:7} {live_ms:8.2f} {live_heap:7}")
+    finally:
+        scene.asyncio.sleep_ms = sleep_ms
+        del scene.open
+        gc.collect = collect
+
+
+if __name__ == "__main__":
+    main()
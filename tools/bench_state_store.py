@@ -0,0 +1,55 @@
+# HomeAssistant Plasma - tools/bench_state_store.py
+# Simulates a brightness slider storm followed by a reboot, and reports flash writes and restore time.
+#
+#     python tools/bench_state_store.py [--commands 200] [--interval 50]
+
+import argparse
+
+import sim
+
+import asyncio
+import time
+
+from strip_controller import StripController
+
+try:
+    import config_local as CONFIG
+except ImportError:
+    import CONFIG
+
+
+async def slider_storm(commands, interval):
+    controller = StripController()
+    await controller.set_state(state=True, hue=200, saturation=80, brightness=10)
+    for i in range(commands):
+        await controller.set_state(brightness=10 + (i * 7) % 245)
+        await asyncio.sleep_ms(interval)
+    await asyncio.sleep(CONFIG.STATE_SAVE_DELAY + 2)  # Let the last value settle and be written
+    return controller
+
+
+async def reboot():
+    start = time.perf_counter()
+    controller = StripController()
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    return controller, elapsed_ms
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--commands", type=int, default=200, help="number of brightness commands in the storm")
+    parser.add_argument("--interval", type=int, default=50, help="ms between commands")
+    args = parser.parse_args()
+
+    sim.flash_dir()
+    before = sim.run(slider_storm(args.commands, args.interval))
+    after, init_ms = sim.run(reboot())
+
+    print(f"Commands sent:         {args.commands + 1} over {(args.commands * args.interval) / 1000:.1f}s")
+    print(f"Flash writes:          {before.state_store.write_count} (slots: {CONFIG.STATE_SLOTS}, settle delay: {CONFIG.STATE_SAVE_DELAY}s)")
+    print(f"Restored:              {after.restored}, state matches: {after._snapshot() == before._snapshot()}")
+    print(f"Restore (load) time:   {after.state_store.restore_ms}ms simulated, controller init {init_ms:.2f}ms host")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+# HomeAssistant Plasma - tools/capture_tool.py
+# Receives and analyses frame captures (capture.py format). Captures are memory-mapped and read one frame at a time,
+# so hour-long captures don't have to fit in memory.
+#
+# Record on the host with LED_RECORD_FILE, or stream from a device by setting CAPTURE_HOST / CAPTURE_PORT and running:
+#     python tools/capture_tool.py receive storm.cap
+# Then:
+#     python tools/capture_tool.py stats storm.cap [--frames]      change counts, effective FPS, frame-to-frame diffs
+#     python tools/capture_tool.py preview storm.cap storm.ppm     one row per frame, one column block per LED
+#     python tools/capture_tool.py diff old.cap new.cap            first and largest differences between two captures
+
+import argparse
+import mmap
+import socket
+import struct
+import sys
+
+import sim  # noqa: F401  puts the device modules on the path
+
+import capture
+
+_TICKS_PERIOD = 1 << 30  # ticks_ms() wraps here on the device
+
+
+class Capture:
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.num_leds = capture.read_header(self.map)
+        self.record = capture.record_size(self.num_leds)
+        # A stream cut off part way through a frame leaves a partial record at the end, which is ignored
+        self.count = (len(self.map) - capture.HEADER_SIZE) // self.record
+
+    def ticks(self, i):
+        return struct.unpack_from("<I", self.map, capture.HEADER_SIZE + i * self.record)[0]
+
+    def pixels(self, i):
+        offset = capture.HEADER_SIZE + i * self.record + 4
+        return self.map[offset:offset + self.record - 4]
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def compare(a, b):
+    """Return (LEDs that differ, sum of absolute channel differences) between two frames."""
+    if a == b:
+        return 0, 0
+    changed = 0
+    for i in range(0, len(a), 3):
+        if a[i:i + 3] != b[i:i + 3]:
+            changed += 1
+    return changed, sum(abs(x - y) for x, y in zip(a, b))
+
+
+def frames(cap):
+    """Yield (index, ms since the first frame, LEDs changed, channel diff) for every frame."""
+    elapsed = 0
+    previous_ticks = cap.ticks(0) if cap.count else 0
+    previous = None
+    for i in range(cap.count):
+        ticks = cap.ticks(i)
+        elapsed += (ticks - previous_ticks) % _TICKS_PERIOD
+        previous_ticks = ticks
+        pixels = cap.pixels(i)
+        changed, diff = compare(previous, pixels) if previous is not None else (cap.num_leds, 0)
+        previous = pixels
+        yield i, elapsed, changed, diff
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def stats(args):
+    with Capture(args.capture) as cap:
+        print(f"{args.capture}: {cap.count} frames of {cap.num_leds} LEDs")
+        if cap.count < 2:
+            return
+        intervals = []
+        changes = []
+        diffs = []
+        last_ms = 0
+        for i, ms, changed, diff in frames(cap):
+            if args.frames:
+                print(f"  {i:6} {ms:9}ms  {changed:4} LEDs changed  diff {diff}")
+            if i:
+                intervals.append(ms - last_ms)
+                if changed:
+                    changes.append(changed)
+                    diffs.append(diff)
+            last_ms = ms
+
+        seconds = last_ms / 1000
+        print(f"  duration          {seconds:.1f}s")
+        print(f"  frames shown      {(cap.count - 1) / seconds:.1f} FPS, interval p50 {percentile(intervals, 0.5)}ms  p90 {percentile(intervals, 0.9)}ms  max {max(intervals)}ms")
+        print(f"  frames changed    {len(changes) / seconds:.1f} FPS effective, {len(changes)} of {cap.count - 1} frames")
+        if changes:
+            print(f"  LEDs per change   mean {sum(changes) / len(changes):.1f}  max {max(changes)}")
+            print(f"  diff per change   mean {sum(diffs) / len(diffs):.0f}  max {max(diffs)}")
+
+
+def preview(args):
+    with Capture(args.capture) as cap:
+        rows = min(cap.count, args.height)
+        scale = args.scale
+        with open(args.image, "wb") as out:
+            out.write(f"P6\n{cap.num_leds * scale} {rows}\n255\n".encode())
+            for row in range(rows):
+                pixels = cap.pixels(row * cap.count // rows)
+                line = bytearray()
+                for i in range(0, len(pixels), 3):
+                    line += pixels[i:i + 3] * scale
+                out.write(line)
+    print(f"Wrote {args.image}: {rows} rows from {cap.count} frames")
+
+
+def diff(args):
+    with Capture(args.old) as old, Capture(args.new) as new:
+        if old.num_leds != new.num_leds:
+            print(f"LED counts differ: {old.num_leds} and {new.num_leds}")
+            return 1
+        count = min(old.count, new.count)
+        different = 0
+        first = None
+        largest = (0, 0, 0)
+        timing = 0
+        for i in range(count):
+            if old.ticks(i) - old.ticks(0) != new.ticks(i) - new.ticks(0):
+                timing += 1
+            changed, channel_diff = compare(old.pixels(i), new.pixels(i))
+            if changed:
+                different += 1
+                if first is None:
+                    first = i
+                if channel_diff > largest[2]:
+                    largest = (i, changed, channel_diff)
+        print(f"{count} frames compared ({old.count} and {new.count} captured)")
+        print(f"  {different} frames with different pixels, {timing} with different timing")
+        if first is not None:
+            print(f"  first difference at frame {first}, largest at frame {largest[0]}: {largest[1]} LEDs, diff {largest[2]}")
+        return 1 if different or timing or old.count != new.count else 0
+
+
+def receive(args):
+    server = socket.socket()
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind(("", args.port))
+    server.listen(1)
+    print(f"Waiting for a device on port {args.port} (set CAPTURE_HOST to this machine)")
+    conn, address = server.accept()
+    print(f"Capturing from {address[0]} to {args.capture}, Ctrl-C to stop")
+    received = 0
+    try:
+        with open(args.capture, "wb") as out:
+            while True:
+                data = conn.recv(65536)
+                if not data:
+                    break
+                out.write(data)
+                received += len(data)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        conn.close()
+        server.close()
+    print(f"Received {received} bytes")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    command = commands.add_parser("stats")
+    command.add_argument("capture")
+    command.add_argument("--frames", action="store_true", help="also list every frame")
+    command.set_defaults(run=stats)
+
+    command = commands.add_parser("preview")
+    command.add_argument("capture")
+    command.add_argument("image", help="PPM file to write")
+    command.add_argument("--height", type=int, default=600, help="most rows, frames are sampled evenly to fit")
+    command.add_argument("--scale", type=int, default=8, help="image pixels per LED")
+    command.set_defaults(run=preview)
+
+    command = commands.add_parser("diff")
+    command.add_argument("old")
+    command.add_argument("new")
+    command.set_defaults(run=diff)
+
+    command = commands.add_parser("receive")
+    command.add_argument("capture")
+    command.add_argument("--port", type=int, default=9100)
+    command.set_defaults(run=receive)
+
+    args = parser.parse_args()
+    sys.exit(args.run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+# HomeAssistant Plasma - tools/check_kernels.py
+# Checks the viper kernels give byte-identical output to their pure-Python references, and times one frame of each.
+# On the host, the viper kernels' source is run by CPython (viper_on_host) and compared the same way. That checks their
+# logic, indexing and bounds, but not viper's machine-word arithmetic, and times only the references; the device run
+# covers the rest. On the device the results are also written to RESULTS on flash, to copy back and keep with the
+# firmware version they were measured on.
+#
+# On the device (kernels.py copied to flash):   mpremote run tools/check_kernels.py
+#                                               mpremote cp :check_kernels.txt .
+# On the host:                                  python tools/check_kernels.py
+
+import sys
+
+if sys.implementation.name != "micropython":
+    import sim  # noqa: F401  host stand-ins for micropython/time
+
+import time
+from array import array
+from random import randrange, seed
+
+import kernels
+from transitions import easing_table
+
+try:
+    import config_local as CONFIG
+except ImportError:
+    import CONFIG
+
+ROUNDS = 20
+RESULTS = "check_kernels.txt"
+
+
+def random_bytes(n):
+    return bytearray(randrange(256) for _ in range(n))
+
+
+def transition_case(n):
+    current = random_bytes(n * 3)
+    ends = random_bytes(n * 6)
+    for i in range(0, n, 4):  # Some pixels already at their target
+        ends[i * 6 + 3:i * 6 + 6] = current[i * 3:i * 3 + 3]
+    start_ms = array("i", [randrange(0, 2000) for _ in range(n)])
+    params = array("i", [0] * kernels.P_SIZE)
+    params[kernels.P_COUNT] = n
+    params[kernels.P_NOW] = 1500
+    params[kernels.P_DURATION] = 1000
+    for i, progress in enumerate(easing_table("ease_in_out")):
+        params[kernels.P_EASE + i] = progress
+    return current, ends, start_ms, params
+
+
+def run_transition(kernel, case):
+    current, ends, start_ms, params = case
+    current = bytearray(current)
+    params = array("i", params)
+    moving = kernel(current, ends, start_ms, params)
+    return bytes(current) + bytes(str((moving, params[kernels.P_DELTA])), "utf-8")
+
+
+def palette_case(n):
+    tables = random_bytes(kernels.PALETTE_SIZE + 256)
+    params = array("i", [0] * kernels.F_SIZE)
+    params[kernels.F_COUNT] = n
+    params[kernels.F_STEP1] = randrange(0x10000)
+    params[kernels.F_OFFSET1] = randrange(0x10000)
+    params[kernels.F_STEP2] = randrange(0x10000)
+    params[kernels.F_OFFSET2] = randrange(0x10000)
+    return tables, params
+
+
+def run_palette_fill(kernel, n, case):
+    current = bytearray(n * 3)
+    ends = bytearray(n * 6)
+    total = kernel(current, ends, case[0], case[1])
+    return bytes(current) + bytes(ends) + bytes(str(total), "utf-8")
+
+
+def raw_case(n, encoding):
+    params = array("i", [0] * kernels.R_SIZE)
+    params[kernels.R_ENCODING] = encoding
+    params[kernels.R_COUNT] = n
+    params[kernels.R_FIRST] = randrange(n // 4)
+    params[kernels.R_START] = 4
+    for i in range(256 + kernels.PALETTE_SIZE):
+        params[kernels.R_LUT + i] = randrange(256)
+    if encoding == kernels.RAW_RLE:
+        data = bytearray(4)
+        for _ in range(n // 8):
+            data += bytes([randrange(16)]) + random_bytes(3)
+    else:
+        data = random_bytes(4 + n * (1 if encoding == kernels.RAW_INDEXED else 3) - randrange(4))
+    params[kernels.R_LENGTH] = len(data)
+    return data, params
+
+
+def run_raw_fill(kernel, n, case):
+    current = bytearray(n * 3)
+    ends = bytearray(n * 6)
+    delta = kernel(current, ends, case[0], case[1])
+    return bytes(current) + bytes(ends) + bytes(str(delta), "utf-8")
+
+
+def run_scale(kernel, src, lut):
+    dst = bytearray(len(src))
+    kernel(dst, src, lut, len(src))
+    return bytes(dst)
+
+
+def run_pack(kernel, src, n, layout):
+    stride = (layout >> 8) & 0xF
+    dst = bytearray(n * stride)
+    kernel(dst, src, n, layout)
+    return bytes(dst)
+
+
+def timed(function, *args):
+    start = time.ticks_us()
+    for _ in range(ROUNDS):
+        function(*args)
+    return time.ticks_diff(time.ticks_us(), start) / ROUNDS
+
+
+def viper_on_host():
+    """The viper kernels from kernels.py as plain Python functions, their pointer arguments indexed as the buffers they are."""
+    import types
+
+    with open(kernels.__file__) as f:
+        source = f.read()
+    guard = 'if sys.implementation.name == "micropython":'
+    if guard not in source:
+        raise RuntimeError(f"no viper kernels found in {kernels.__file__}")
+    module = types.ModuleType("kernels_viper")
+    module.ptr8 = module.ptr16 = module.ptr32 = object  # Annotations only
+    exec(compile(source.replace(guard, "if True:"), kernels.__file__, "exec"), module.__dict__)
+    return module
+
+
+def outcome(run, *args):
+    """What run(*args) gives, or the error: CPython refuses bytes out of range, where viper would store them truncated."""
+    try:
+        return run(*args)
+    except (ValueError, IndexError, OverflowError) as e:
+        return repr(e)
+
+
+def compare(n, viper):
+    """Number of mismatches between each viper kernel and its reference over ten random cases."""
+    failures = 0
+    for _ in range(10):
+        case = transition_case(n)
+        src = random_bytes(n * 3)
+        lut = kernels.brightness_lut(randrange(256))
+        palette = palette_case(n)
+        checks = [
+            ("transition", run_transition(kernels.transition_ref, case), outcome(run_transition, viper.transition, case)),
+            ("scale", run_scale(kernels.scale_ref, src, lut), outcome(run_scale, viper.scale, src, lut)),
+            ("palette_fill", run_palette_fill(kernels.palette_fill_ref, n, palette), outcome(run_palette_fill, viper.palette_fill, n, palette)),
+        ]
+        for encoding in (kernels.RAW_RGB, kernels.RAW_RLE, kernels.RAW_INDEXED):
+            raw = raw_case(n, encoding)
+            checks.append((f"raw_fill {encoding}", run_raw_fill(kernels.raw_fill_ref, n, raw), outcome(run_raw_fill, viper.raw_fill, n, raw)))
+        for order, stride, fill in (("RGB", 3, 0), ("GRB", 3, 0), ("BRG", 4, 0), ("BGR", 4, 0xFF)):
+            pack_layout = kernels.layout(order, stride, fill)
+            checks.append((f"pack {order}/{stride}", run_pack(kernels.pack_ref, src, n, pack_layout), outcome(run_pack, viper.pack, src, n, pack_layout)))
+
+        for name, expected, actual in checks:
+            if expected != actual:
+                failures += 1
+                print(f"MISMATCH: {name}")
+    return failures
+
+
+def main():
+    seed(1)
+    n = CONFIG.NUM_LEDS
+    on_device = kernels.transition is not kernels.transition_ref
+    lines = []
+    if on_device:
+        failures = compare(n, kernels)
+        lines.append(f"Kernels: viper against reference, {sys.implementation._machine}, MicroPython "
+                     f"{'.'.join(str(v) for v in sys.implementation.version)}, {n} LEDs, {failures} mismatches")
+    else:
+        failures = compare(n, viper_on_host())
+        lines.append(f"Kernels: viper source run by CPython against reference (host), {n} LEDs, {failures} mismatches. "
+                     f"Reference timings only")
+
+    case = transition_case(n)
+    src = random_bytes(n * 3)
+    dst = bytearray(n * 4)
+    lut = kernels.brightness_lut(128)
+    pack_layout = kernels.layout("BRG", 4)
+    palette = palette_case(n)
+    raw = raw_case(n, kernels.RAW_RGB)
+    rows = [
+        ("transition", lambda k: timed(run_transition, k, case), kernels.transition_ref, kernels.transition),
+        ("scale", lambda k: timed(k, dst, src, lut, n * 3), kernels.scale_ref, kernels.scale),
+        ("pack", lambda k: timed(k, dst, src, n, pack_layout), kernels.pack_ref, kernels.pack),
+        ("palette_fill", lambda k: timed(run_palette_fill, k, n, palette), kernels.palette_fill_ref, kernels.palette_fill),
+        ("raw_fill", lambda k: timed(run_raw_fill, k, n, raw), kernels.raw_fill_ref, kernels.raw_fill),
+    ]
+    for name, measure, reference, kernel in rows:
+        reference_us = measure(reference)
+        if on_device:
+            kernel_us = measure(kernel)
+            lines.append(f"{name:12} reference {reference_us:9.1f}us  viper {kernel_us:9.1f}us  x{reference_us / max(kernel_us, 1):.1f}")
+        else:
+            lines.append(f"{name:12} reference {reference_us:9.1f}us (host)")
+
+    print("\n".join(lines))
+    if on_device:
+        with open(RESULTS, "w") as f:
+            f.write("\n".join(lines) + "\n")
+    if failures:
+        sys.exit(1)
+
+
+main()
@@ -0,0 +1,104 @@
+# HomeAssistant Plasma - tools/check_tls.py
+# Checks the device's TLS setup (tls.TlsContext, as main.py uses it with MQTT_CA_FILE) against a TLS broker from the
+# host, with the device's own umqtt.simple client: the broker certificate is verified against the CA, a wrong CA is
+# refused, and where the ssl module has sessions (CPython does, stock MicroPython doesn't: see tls.RESUMPTION)
+# reconnects resume the previous session. Reports handshake times, full against resumed, for TLS 1.2 (what
+# MicroPython's mbedtls speaks) and TLS 1.3.
+# Host times only show the ratio; on the device the handshake time and peak heap are logged and in GET /metrics.
+#
+# With a throwaway certificate and tools/mini_broker.py:
+#     python tools/check_tls.py [--connects 5]
+# Against a TLS-enabled Mosquitto (listener 8883 with cafile/certfile/keyfile):
+#     python tools/check_tls.py --broker localhost --port 8883 --ca ca.crt
+
+import argparse
+import asyncio
+import os
+import ssl
+import subprocess
+import tempfile
+import threading
+import time
+
+import host_mqtt
+from umqtt.simple import MQTTClient
+
+import log
+from tls import RESUMPTION, TlsContext
+
+
+def make_certificate(directory, name):
+    cert = os.path.join(directory, f"{name}.crt")
+    key = os.path.join(directory, f"{name}.key")
+    subprocess.run(["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1", "-subj", "/CN=localhost",
+                    "-addext", "subjectAltName=DNS:localhost,IP:127.0.0.1", "-keyout", key, "-out", cert],
+                   check=True, capture_output=True)
+    return cert, key
+
+
+def start_broker(port, cert, key):
+    import mini_broker
+
+    ready = threading.Event()
+
+    async def serve():
+        broker = mini_broker.Broker()
+        await broker.start(port, tls=mini_broker.server_context(cert, key))
+        ready.set()
+        await asyncio.Event().wait()
+
+    threading.Thread(target=asyncio.run, args=(serve(),), daemon=True).start()
+    ready.wait()
+
+
+def tls_context(ca, version):
+    context = host_mqtt.HostSSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    context.minimum_version = context.maximum_version = version
+    return TlsContext(ca, context)
+
+
+def connect_once(tls, args):
+    client = MQTTClient(f"check_tls_{os.getpid()}", args.broker, args.port, None, None, 60)
+    sock = tls.open(args.broker, args.port)
+    client.connect(sock=asyncio.run(tls.handshake(sock, args.broker)))  # As main.mqtt_connect does
+    tls.keep_session(client.sock)
+    client.publish("check_tls/ping", "1", qos=1)  # PUBACK back over the encrypted connection
+    client.disconnect()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--connects", type=int, default=5)
+    parser.add_argument("--broker", help="TLS broker to check against instead of a throwaway local one")
+    parser.add_argument("--port", type=int, default=18883)
+    parser.add_argument("--ca", help="CA certificate that signed the broker's certificate")
+    args = parser.parse_args()
+    log.set_level("WARNING")
+
+    directory = tempfile.mkdtemp(prefix="plasma_tls_")
+    wrong_ca, _ = make_certificate(directory, "wrong")
+    if not args.broker:
+        args.ca, key = make_certificate(directory, "broker")
+        args.broker = "localhost"
+        start_broker(args.port, args.ca, key)
+
+    try:
+        connect_once(tls_context(wrong_ca, ssl.TLSVersion.TLSv1_2), args)
+        print("FAIL: connected with a CA that didn't sign the broker certificate")
+    except ssl.SSLCertVerificationError:
+        print("Broker certificate from another CA: refused")
+
+    print(f"Session resumption: {'available' if RESUMPTION else 'not available'} in this ssl module")
+    for name, version in (("TLS 1.2", ssl.TLSVersion.TLSv1_2), ("TLS 1.3", ssl.TLSVersion.TLSv1_3)):
+        tls = tls_context(args.ca, version)
+        times = []
+        for _ in range(args.connects):
+            connect_once(tls, args)
+            times.append(tls.handshake_us / 1000)
+        resumed = sum(times[1:]) / max(len(times) - 1, 1)
+        print(f"{name}: {tls.handshakes} connects, {tls.resumed} resumed. "
+              f"Handshake full {times[0]:.2f}ms, resumed {resumed:.2f}ms on average (host)")
+
+
+if __name__ == "__main__":
+    main()
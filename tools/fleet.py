@@ -0,0 +1,187 @@
+# HomeAssistant Plasma - tools/fleet.py
+# Load test for a fleet of lights sharing one broker: what happens when Home Assistant restarts and every device hears
+# "homeassistant/status online" at the same moment. Starts N simulated devices, each the real device code (main.py
+# with umqtt.simple) in its own process, against a local broker, waits for them all to come up, then publishes
+# "online" and measures:
+#   recovery    time until every device has published its availability and state again
+#   load        messages and bytes the devices sent in answer, peak messages per 100ms and peak bytes per 100ms
+#   configs     discovery configs re-published (the large messages)
+# Scenarios: no jitter with the discovery cache defeated (every device re-publishes its configs, as before the
+# cache), no jitter, and ANNOUNCE_JITTER_MS of --jitter.
+#
+#     python tools/fleet.py [--devices 20] [--jitter 3000]
+# Uses tools/mini_broker.py in-process unless pointed at a broker, e.g. a local Mosquitto:
+#     python tools/fleet.py --broker 127.0.0.1 --port 1883
+
+import argparse
+import contextlib
+import io
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import sim
+
+import asyncio
+
+import log
+
+WINDOW = 0.1  # Seconds per bucket for peak load
+TIMEOUT = 60
+
+
+def worker(args):
+    """One simulated device: the device code in real time, with umqtt.simple on host sockets."""
+    sim.flash_dir()
+    sim.CONFIG.MQTT_CLIENTID = f"fleet_{args.worker}"
+    sim.CONFIG.MQTT_NAME = f"Fleet {args.worker}"
+    sim.CONFIG.MQTT_SERVER = args.broker
+    sim.CONFIG.MQTT_PORT = args.port
+    sim.CONFIG.HTTP_PORT = None
+    sim.CONFIG.ANNOUNCE_JITTER_MS = args.jitter
+    log.set_level("OFF", "OFF")
+
+    import host_mqtt  # noqa: F401  umqtt.simple on host sockets
+    import main as device
+
+    class Forgetful(dict):
+        def __setitem__(self, key, value):
+            pass
+
+    async def run():
+        stick = device.HomeAssistantPlasmaStick()
+        if args.no_cache:
+            stick.retained = Forgetful()
+        await stick.main()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        sim.run(run(), virtual=False)
+
+
+class Observer(threading.Thread):
+    """Subscribes to everything under homeassistant/ like Home Assistant would, and logs what arrives."""
+
+    def __init__(self, broker, port):
+        super().__init__(daemon=True)
+        import host_mqtt
+        self.client = host_mqtt.client(f"fleet_observer_{os.getpid()}", broker, port)
+        self.client.set_callback(self.on_message)
+        self.received = []  # (time.monotonic(), topic, payload bytes)
+        self.outbox = []
+        self.running = True
+
+    def on_message(self, topic, msg):
+        self.received.append((time.monotonic(), topic.decode(), len(msg)))
+
+    def run(self):
+        self.client.connect()
+        self.client.subscribe("homeassistant/#")
+        while self.running:
+            while self.outbox:
+                self.client.publish(*self.outbox.pop(0))
+            self.client.check_msg()
+            time.sleep(0.001)
+        self.client.disconnect()
+
+    def publish(self, topic, msg):
+        self.outbox.append((topic, msg))
+        return time.monotonic()
+
+    def states(self, since):
+        return {topic for t, topic, _ in self.received if t >= since and topic.startswith("homeassistant/light/fleet_")
+                and topic.count("/") == 2}
+
+
+async def wait_for(condition, timeout=TIMEOUT):
+    end = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > end:
+            return False
+        await asyncio.sleep(0.05)
+    return True
+
+
+async def scenario(args, jitter, cache):
+    broker = None
+    if not args.broker:
+        import mini_broker
+        broker = mini_broker.Broker()
+        await broker.start(args.port)
+    host = args.broker or "127.0.0.1"
+
+    observer = Observer(host, args.port)
+    observer.start()
+    await asyncio.sleep(0.5)
+
+    command = [sys.executable, os.path.abspath(__file__), "--broker", host, "--port", str(args.port), "--jitter", str(jitter)]
+    if not cache:
+        command.append("--no-cache")
+    workers = [subprocess.Popen(command + ["--worker", str(i)], stdout=subprocess.DEVNULL)
+               for i in range(args.devices)]
+    try:
+        # Every device connected and through its first announce, then quiet before Home Assistant "restarts"
+        if not await wait_for(lambda: len(observer.states(0)) >= args.devices):
+            raise RuntimeError(f"only {len(observer.states(0))} of {args.devices} devices came up")
+        await asyncio.sleep(3)
+
+        start = observer.publish("homeassistant/status", "online")
+        recovered = await wait_for(lambda: len(observer.states(start)) >= args.devices)
+        await asyncio.sleep(1 + jitter / 1000)  # Anything still trickling in counts towards the load
+
+        answers = [(t, topic, size) for t, topic, size in observer.received if t >= start and topic.startswith("homeassistant/") and "fleet_" in topic]
+        states = {}
+        for t, topic, _ in answers:
+            if topic.count("/") == 2:
+                states.setdefault(topic, t)
+        buckets = {}
+        for t, _, size in answers:
+            bucket = buckets.setdefault(int((t - start) / WINDOW), [0, 0])
+            bucket[0] += 1
+            bucket[1] += size
+        return {
+            "recovery_s": max(states.values()) - start if recovered else float("nan"),
+            "messages": len(answers),
+            "bytes": sum(size for _, _, size in answers),
+            "peak_msgs": max((b[0] for b in buckets.values()), default=0),
+            "peak_bytes": max((b[1] for b in buckets.values()), default=0),
+            "configs": sum(1 for _, topic, _ in answers if topic.endswith("/config")),
+        }
+    finally:
+        for process in workers:
+            process.kill()
+        for process in workers:
+            process.wait()
+        observer.running = False
+        observer.join()
+        if broker:
+            await broker.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--devices", type=int, default=20)
+    parser.add_argument("--jitter", type=int, default=3000)
+    parser.add_argument("--broker", help="Address of an MQTT broker to use instead of the built-in one")
+    parser.add_argument("--port", type=int, default=18830)
+    parser.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--no-cache", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker is not None:
+        worker(args)
+        return
+
+    print(f"{args.devices} devices, Home Assistant publishes online once they're all up")
+    print(f"  {'':26} {'recovery':>9} {'messages':>9} {'bytes':>8} {'configs':>8} {'peak msgs/100ms':>16} {'peak bytes/100ms':>17}")
+    for name, jitter, cache in (("no jitter, no cache", 0, False),
+                                ("no jitter", 0, True),
+                                (f"jitter {args.jitter}ms", args.jitter, True)):
+        result = asyncio.run(scenario(args, jitter, cache))
+        print(f"  {name:26} {result['recovery_s']:8.2f}s {result['messages']:9} {result['bytes']:8} {result['configs']:8} "
+              f"{result['peak_msgs']:16} {result['peak_bytes']:17}")
+
+
+if __name__ == "__main__":
+    main()
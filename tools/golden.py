@@ -0,0 +1,110 @@
+# HomeAssistant Plasma - tools/golden.py
+# Golden-output regression suite. Runs every effect in the manifest in the simulator for a fixed time, with a seeded
+# random module and the virtual clock so each run is repeatable, captures the frames (capture.py format) and
+# compares a hash of each capture with golden/effects.json.
+#
+#     python tools/golden.py                      check every effect
+#     python tools/golden.py --update             accept the current output as the new golden
+#     python tools/golden.py --save caps/ Storm   keep the captures, for tools/capture_tool.py stats / preview / diff
+#
+# A changed hash isn't necessarily a bug, any intended change to an effect changes it. Save captures before and after
+# the change and diff them to see what actually moved.
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import tempfile
+
+import sim
+
+import contextlib
+import io
+
+import asyncio
+
+import log
+from capture_tool import Capture, frames
+from effects import MANIFEST
+from outputs import RecordingOutput
+from strip_controller import StripController
+
+GOLDEN_FILE = os.path.join(sim.ROOT, "golden", "effects.json")
+SECONDS = 20
+BRIGHTNESS = 200
+HUE = 30
+SATURATION = 80
+
+
+async def render(effect, path):
+    random.seed(effect)
+    output = RecordingOutput(sim.CONFIG.NUM_LEDS, path)
+    controller = StripController(output)
+    await controller.set_state(state=True, brightness=BRIGHTNESS, hue=HUE, saturation=SATURATION, effect=effect)
+    await asyncio.sleep_ms(SECONDS * 1000)
+    output.close()
+
+
+def run_effect(effect, path):
+    for name in os.listdir("."):  # Every effect starts from a fresh device, no saved state
+        os.remove(name)
+    with contextlib.redirect_stdout(io.StringIO()):
+        sim.run(render(effect, path))
+
+    with open(path, "rb") as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+    with Capture(path) as cap:
+        changed = [changed for i, _, changed, _ in frames(cap) if i and changed]
+        return {"sha256": digest, "frames": cap.count, "changed_frames": len(changed),
+                "mean_leds_changed": round(sum(changed) / len(changed), 1) if changed else 0}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("effects", nargs="*", help="effects to run, default all of them")
+    parser.add_argument("--update", action="store_true", help="write the results as the new golden output")
+    parser.add_argument("--save", help="directory to keep the captures in")
+    args = parser.parse_args()
+
+    effects = args.effects or list(MANIFEST)
+    golden = {}
+    if os.path.exists(GOLDEN_FILE):
+        with open(GOLDEN_FILE) as f:
+            golden = json.load(f)
+    save = os.path.abspath(args.save) if args.save else tempfile.mkdtemp(prefix="plasma_golden_")
+    os.makedirs(save, exist_ok=True)
+
+    log.set_level("OFF", "OFF")
+    sim.flash_dir()
+    failures = 0
+    for effect in effects:
+        path = os.path.join(save, f"{effect}.cap")
+        result = run_effect(effect, path)
+        expected = golden.get(effect)
+        if args.update:
+            status = "updated"
+            golden[effect] = result
+        elif expected is None:
+            status = "NEW"
+            failures += 1
+        elif expected["sha256"] != result["sha256"]:
+            status = f"CHANGED (was {expected['changed_frames']} changed frames, {expected['mean_leds_changed']} LEDs each)"
+            failures += 1
+        else:
+            status = "ok"
+        print(f"{effect:10} {result['frames']} frames, {result['changed_frames']:3} changed, "
+              f"{result['mean_leds_changed']:5} LEDs each  {status}")
+
+    if args.update:
+        os.makedirs(os.path.dirname(GOLDEN_FILE), exist_ok=True)
+        with open(GOLDEN_FILE, "w") as f:
+            json.dump(golden, f, indent=1, sort_keys=True)
+            f.write("\n")
+    if failures:
+        print(f"\n{failures} effects differ from golden output. Captures are in {save}")
+    return 1 if failures and not args.update else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
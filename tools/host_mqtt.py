@@ -0,0 +1,75 @@
+# HomeAssistant Plasma - tools/host_mqtt.py
+# Lets the device's own umqtt.simple client run under CPython, for host tools that talk to a real broker.
+# umqtt expects MicroPython sockets (read/write, read returning None when non-blocking and empty);
+# this wraps CPython sockets to match. For TLS, use the device's tls.TlsContext built on a HostSSLContext: its open()
+# makes host sockets too, and handshake() steps the handshake through HostSocket.write(b"") as it would on the device.
+
+import sim  # noqa: F401  puts lib/ on the path
+
+import socket
+import ssl
+import types
+
+import tls
+import umqtt.simple
+from umqtt.simple import MQTTClient
+
+
+class HostSocket:
+    def __init__(self, sock=None):
+        self.sock = sock or socket.socket()
+
+    def connect(self, address):
+        self.sock.connect(address)
+
+    def setblocking(self, flag):
+        self.sock.setblocking(flag)
+
+    def read(self, n):
+        data = b""
+        while len(data) < n:
+            try:
+                chunk = self.sock.recv(n - len(data))
+            except (BlockingIOError, ssl.SSLWantReadError):
+                if not data:
+                    return None
+                self.sock.setblocking(True)  # Part way through a packet, wait for the rest
+                continue
+            if not chunk:
+                break
+            data += chunk
+        return data
+
+    def write(self, buf, length=None):
+        if isinstance(buf, str):
+            buf = buf.encode()
+        data = bytes(buf if length is None else buf[:length])
+        if not data and isinstance(self.sock, ssl.SSLSocket):
+            try:  # As MicroPython's ssl, an empty write takes a pending handshake on, returning None while it's not done
+                self.sock.do_handshake()
+            except (ssl.SSLWantReadError, ssl.SSLWantWriteError):
+                return None
+            return 0
+        self.sock.sendall(data)
+        return len(data)
+
+    def close(self):
+        self.sock.close()
+
+    def __getattr__(self, name):
+        return getattr(self.sock, name)  # e.g. session and session_reused of a TLS socket
+
+
+class HostSSLContext(ssl.SSLContext):
+    """CPython SSLContext that wraps a HostSocket, as umqtt hands over, and returns one."""
+
+    def wrap_socket(self, sock, server_hostname=None, session=None, do_handshake_on_connect=True):
+        return HostSocket(super().wrap_socket(sock.sock, server_hostname=server_hostname, session=session,
+                                              do_handshake_on_connect=do_handshake_on_connect))
+
+
+umqtt.simple.socket = tls.socket = types.SimpleNamespace(socket=HostSocket, getaddrinfo=socket.getaddrinfo)
+
+
+def client(client_id, server="127.0.0.1", port=1883, user=None, password=None, keepalive=60, ssl=None):
+    return MQTTClient(client_id, server, port, user, password, keepalive, ssl)
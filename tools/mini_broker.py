@@ -0,0 +1,188 @@
+# HomeAssistant Plasma - tools/mini_broker.py
+# Minimal MQTT 3.1.1 broker for host tools, for when there's no Mosquitto to hand: QoS 0 and 1 publishes, retained
+# messages, + and # wildcards, last will, and counts of everything that goes through it for measuring broker load.
+# Subscriptions are granted and delivered at QoS 0. Not for real use: no auth, no persistence, no QoS 2.
+#
+# Standalone:        python tools/mini_broker.py [--port 1883] [--cert server.crt --key server.key]
+# From a host tool:  broker = mini_broker.Broker(); await broker.start(port)
+
+import argparse
+import asyncio
+import ssl
+import struct
+import time
+
+
+def matches(subscription, topic):
+    sub = subscription.split("/")
+    parts = topic.split("/")
+    for i, level in enumerate(sub):
+        if level == "#":
+            return True
+        if i >= len(parts) or (level != "+" and level != parts[i]):
+            return False
+    return len(sub) == len(parts)
+
+
+def _encode_length(n):
+    out = bytearray()
+    while True:
+        byte = n & 0x7F
+        n >>= 7
+        out.append(byte | 0x80 if n else byte)
+        if not n:
+            return bytes(out)
+
+
+def _string(data, i):
+    size = struct.unpack_from("!H", data, i)[0]
+    return data[i + 2:i + 2 + size], i + 2 + size
+
+
+class Session:
+    def __init__(self, writer):
+        self.writer = writer
+        self.client_id = None
+        self.subscriptions = []
+        self.will = None
+
+
+class Broker:
+    def __init__(self):
+        self.sessions = []
+        self.retained = {}
+        self.log = []  # (time.monotonic(), "in" or "out", topic, payload bytes) for every PUBLISH
+        self.connects = 0
+        self.server = None
+        self.handlers = set()
+
+    async def start(self, port=1883, host="127.0.0.1", tls=None):
+        """tls: an ssl.SSLContext with the server certificate loaded, to accept TLS connections only."""
+        self.server = await asyncio.start_server(self.handle, host, port, ssl=tls)
+
+    async def close(self):
+        self.server.close()
+        for handler in self.handlers:
+            handler.cancel()
+        await asyncio.gather(*self.handlers, return_exceptions=True)
+
+    def _send_publish(self, session, topic, payload, retain=False):
+        topic_bytes = topic.encode()
+        body = struct.pack("!H", len(topic_bytes)) + topic_bytes + payload
+        session.writer.write(bytes([0x30 | retain]) + _encode_length(len(body)) + body)
+        self.log.append((time.monotonic(), "out", topic, len(payload)))
+
+    def route(self, topic, payload, retain):
+        if retain:
+            if payload:
+                self.retained[topic] = payload
+            else:
+                self.retained.pop(topic, None)
+        for session in self.sessions:
+            if any(matches(subscription, topic) for subscription in session.subscriptions):
+                self._send_publish(session, topic, payload)
+
+    async def handle(self, reader, writer):
+        session = Session(writer)
+        clean = False
+        self.handlers.add(asyncio.current_task())
+        try:
+            while True:
+                header = await reader.readexactly(1)
+                length = 0
+                shift = 0
+                while True:
+                    byte = (await reader.readexactly(1))[0]
+                    length |= (byte & 0x7F) << shift
+                    shift += 7
+                    if not byte & 0x80:
+                        break
+                data = await reader.readexactly(length)
+                packet = header[0] >> 4
+
+                if packet == 1:  # CONNECT
+                    _, i = _string(data, 0)
+                    flags = data[i + 1]
+                    client_id, i = _string(data, i + 4)
+                    session.client_id = client_id.decode()
+                    if flags & 0x04:
+                        will_topic, i = _string(data, i)
+                        will_msg, i = _string(data, i)
+                        session.will = (will_topic.decode(), will_msg, bool(flags & 0x20))
+                    for old in [s for s in self.sessions if s.client_id == session.client_id]:
+                        old.writer.close()  # Same client id connecting again takes over
+                        self.sessions.remove(old)
+                    self.sessions.append(session)
+                    self.connects += 1
+                    writer.write(b"\x20\x02\x00\x00")
+                elif packet == 3:  # PUBLISH
+                    qos = (header[0] >> 1) & 3
+                    topic, i = _string(data, 0)
+                    topic = topic.decode()
+                    if qos:
+                        pid = data[i:i + 2]
+                        i += 2
+                    payload = data[i:]
+                    self.log.append((time.monotonic(), "in", topic, len(payload)))
+                    if qos:
+                        writer.write(b"\x40\x02" + pid)
+                    self.route(topic, payload, header[0] & 1)
+                elif packet == 8:  # SUBSCRIBE
+                    pid = data[:2]
+                    i = 2
+                    filters = []
+                    while i < len(data):
+                        subscription, i = _string(data, i)
+                        i += 1  # Requested QoS, always granted 0
+                        filters.append(subscription.decode())
+                    session.subscriptions.extend(filters)
+                    writer.write(b"\x90" + _encode_length(2 + len(filters)) + pid + b"\x00" * len(filters))
+                    for topic, payload in list(self.retained.items()):
+                        if any(matches(subscription, topic) for subscription in filters):
+                            self._send_publish(session, topic, payload, True)
+                elif packet == 12:  # PINGREQ
+                    writer.write(b"\xd0\x00")
+                elif packet == 14:  # DISCONNECT
+                    clean = True
+                    break
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError, OSError, asyncio.CancelledError):
+            pass
+        finally:
+            self.handlers.discard(asyncio.current_task())
+            if session in self.sessions:
+                self.sessions.remove(session)
+            if session.will and not clean:
+                topic, payload, retain = session.will
+                self.route(topic, payload, retain)
+            writer.close()
+
+
+def server_context(cert, key):
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert, key)
+    return context
+
+
+async def serve(port, tls):
+    broker = Broker()
+    await broker.start(port, "0.0.0.0", tls)
+    print(f"Listening on port {port}")
+    await asyncio.Event().wait()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=1883)
+    parser.add_argument("--cert", help="Server certificate (PEM), to accept TLS connections")
+    parser.add_argument("--key", help="Private key for --cert")
+    args = parser.parse_args()
+    tls = server_context(args.cert, args.key) if args.cert else None
+    try:
+        asyncio.run(serve(args.port, tls))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
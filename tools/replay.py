@@ -0,0 +1,194 @@
+# HomeAssistant Plasma - tools/replay.py
+# Replays command traces (recorded on a device with TRACE_FILE, or the canonical ones in traces/) and reports
+# command-to-frame latency percentiles, host CPU per command, publishes emitted and heap high-water mark.
+#
+# Against the simulator (default), with the trace timing on the simulated clock:
+#     python tools/replay.py traces/*.trace
+# Against a real device through a local broker, in real time. Latency is then command to state publish:
+#     python tools/replay.py --broker 192.168.1.10 --client-id plasma_1 traces/slider_storm.trace
+
+import argparse
+import os
+
+import sim
+
+import asyncio
+import contextlib
+import io
+import time
+import tracemalloc
+
+import command_trace
+import log
+
+SETTLE_MS = 5000  # How long after the last message to keep watching for frames and publishes
+
+
+def percentile(values, fraction):
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def summary(values):
+    return f"p50 {percentile(values, 0.5):7.1f}  p90 {percentile(values, 0.9):7.1f}  p99 {percentile(values, 0.99):7.1f}  max {max(values, default=float('nan')):7.1f}"
+
+
+def timed(function, samples):
+    async def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        result = await function(*args, **kwargs)
+        samples.append((time.perf_counter() - start) * 1000)
+        return result
+    return wrapper
+
+
+async def replay_sim(path):
+    from main import HomeAssistantPlasmaStick
+
+    stick = HomeAssistantPlasmaStick()
+    client = stick.mqtt_client = sim.FakeMQTTClient()
+    output = stick.strip_controller.output
+    base_topic = f"{sim.CONFIG.MQTT_DISCOVERY_PREFIX}/light/{sim.CONFIG.MQTT_CLIENTID}"
+
+    pending = []  # (ticks_ms the command arrived, frame on the strip when it arrived, light state it arrived to)
+    latencies = []
+    unchanged = 0
+    show = output.show
+
+    def watching_show(buffer):
+        nonlocal unchanged
+        show(buffer)
+        now = time.ticks_ms()
+        waiting = []
+        for arrived, before, state in pending:
+            if buffer != before:
+                latencies.append(time.ticks_diff(now, arrived))
+            elif time.ticks_diff(now, arrived) < SETTLE_MS:
+                waiting.append((arrived, before, state))
+            else:
+                unchanged += 1
+        pending[:] = waiting
+
+    output.show = watching_show
+    process_ms = []
+    set_state_ms = []
+    stick.process_incoming_message = timed(stick.process_incoming_message, process_ms)
+    stick.strip_controller.set_state = timed(stick.strip_controller.set_state, set_state_ms)
+
+    await asyncio.sleep_ms(100)
+    tracemalloc.reset_peak()
+    heap_base = tracemalloc.get_traced_memory()[0]
+    start = time.ticks_ms()
+    count = 0
+    for ms, topic, msg in command_trace.read(path, base_topic):
+        delay = time.ticks_diff(time.ticks_add(start, ms), time.ticks_ms())
+        if delay > 0:
+            await asyncio.sleep_ms(delay)
+            # Commands that left the light state as they found it won't change the strip: don't wait for a later one to
+            snapshot = stick.strip_controller._snapshot()
+            changed = [entry for entry in pending if entry[2] != snapshot or entry[1] != output.frame]
+            unchanged += len(pending) - len(changed)
+            pending[:] = changed
+        if topic == f"{base_topic}/set":  # Only light commands are expected to change the strip
+            pending.append((time.ticks_ms(), bytes(output.frame), stick.strip_controller._snapshot()))
+        stick.mqtt_callback(topic.encode(), msg.encode())
+        count += 1
+    await asyncio.sleep_ms(SETTLE_MS)
+
+    return {
+        "messages": count,
+        "latency": latencies,
+        "unchanged": unchanged + len(pending),
+        "process": process_ms,
+        "set_state": set_state_ms,
+        "publishes": len(client.published),
+        "heap": tracemalloc.get_traced_memory()[1] - heap_base,
+    }
+
+
+def replay_broker(path, args):
+    import host_mqtt
+
+    base_topic = f"{args.prefix}/light/{args.client_id}"
+    sent = []
+    latencies = []
+    publishes = 0
+
+    def on_message(topic, msg):
+        nonlocal publishes
+        publishes += 1
+        if topic.decode() == base_topic and sent:
+            latencies.append((time.monotonic() - sent.pop(0)) * 1000)
+
+    client = host_mqtt.client(f"replay_{os.getpid()}", args.broker, args.port, args.user, args.password)
+    client.set_callback(on_message)
+    client.connect()
+    client.subscribe(f"{base_topic}/#")
+    client.subscribe(base_topic)
+
+    start = time.monotonic()
+    count = 0
+    for ms, topic, msg in command_trace.read(path, base_topic):
+        while time.monotonic() - start < ms / 1000:
+            client.check_msg()
+            time.sleep(0.001)
+        client.publish(topic, msg)
+        if topic == f"{base_topic}/set":
+            sent.append(time.monotonic())
+        count += 1
+
+    end = time.monotonic() + SETTLE_MS / 1000
+    while time.monotonic() < end:
+        client.check_msg()
+        time.sleep(0.005)
+    client.disconnect()
+
+    return {"messages": count, "latency": latencies, "unchanged": len(sent), "process": [], "set_state": [],
+            "publishes": publishes, "heap": None}
+
+
+def report(path, result, latency_name):
+    print(f"\n{os.path.basename(path)}: {result['messages']} messages")
+    print(f"  {latency_name:24} {summary(result['latency'])} ms  ({result['unchanged']} with no visible change)")
+    if result["process"]:
+        print(f"  {'process_incoming_message':24} {summary(result['process'])} ms host CPU")
+        print(f"  {'StripController.set_state':24} {summary(result['set_state'])} ms host CPU")
+    print(f"  {'publishes emitted':24} {result['publishes']}")
+    if result["heap"] is not None:
+        print(f"  {'heap high-water':24} {result['heap']} bytes above baseline (host)")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("traces", nargs="+")
+    parser.add_argument("--broker", help="replay through this MQTT broker to a real device instead of the simulator")
+    parser.add_argument("--port", type=int, default=1883)
+    parser.add_argument("--user")
+    parser.add_argument("--password")
+    parser.add_argument("--client-id", default=sim.CONFIG.MQTT_CLIENTID, help="MQTT_CLIENTID of the device to replay to")
+    parser.add_argument("--prefix", default=sim.CONFIG.MQTT_DISCOVERY_PREFIX)
+    parser.add_argument("--log-level", default="OFF")
+    args = parser.parse_args()
+
+    paths = [os.path.abspath(path) for path in args.traces]
+    if args.broker:
+        for path in paths:
+            report(path, replay_broker(path, args), "command -> state publish")
+        return
+
+    log.set_level(args.log_level, args.log_level)
+    sim.flash_dir()
+    tracemalloc.start()
+    for path in paths:
+        for name in os.listdir("."):  # Each trace starts from a fresh device, no saved state
+            os.remove(name)
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = sim.run(replay_sim(path))
+        report(path, result, "command -> frame")
+    tracemalloc.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+# HomeAssistant Plasma - tools/scene_compiler.py
+# Compiles scene definitions into scene files (format in scenes.py) for copying to SCENE_DIR on the Pico, where each
+# shows up as an effect. Colours are worked out here, once, so the device only streams finished frames from flash.
+#
+# Scenes are defined in JSON (see tools/scenes.json), one look each:
+#   "stripes":  ["#ff0000", "#ffffff"], "width": 3          bands of colour, each width LEDs
+#   "gradient": [[0, "#ff3000"], [255, "#100040"]]          gradient stops along the strip, positions 0..255
+#   "hues":     [0.3, 0.8], "saturation": 0.9               round the colour wheel between two hues and back
+# with optional "scroll": LEDs to move the look along per frame, for a looping animation of one full cycle,
+# and "hold_ms": how long each frame shows.
+#
+# Each frame is stored in whichever of RGB, RLE or palette-indexed raw messages is smallest, split into records of at
+# most --chunk bytes, which is all the RAM the device needs to play it.
+#
+#     python tools/scene_compiler.py [tools/scenes.json] --leds 50 [--out build/scenes] [--chunk 512] [--slot 3]
+#     mpremote mkdir :scenes; mpremote cp build/scenes/*.scn :scenes/
+
+import argparse
+import json
+import os
+import struct
+
+import sim  # noqa: F401
+
+import kernels
+import palettes
+import scenes
+from raw_frames import HEADER_SIZE, PALETTE
+from strip_controller import Effects
+
+
+def parse_colour(text):
+    return tuple(bytes.fromhex(text.lstrip("#")))
+
+
+def pattern(spec, n):
+    """One cycle of the look as a list of (r, g, b), and how many LEDs the cycle spans."""
+    if "stripes" in spec:
+        width = spec.get("width", 1)
+        cycle = [parse_colour(colour) for colour in spec["stripes"] for _ in range(width)]
+        return cycle, len(cycle)
+    if "gradient" in spec:
+        stops = [(position, list(parse_colour(colour))) for position, colour in spec["gradient"]]
+        palette = palettes.gradient(stops)
+        return [tuple(palette[i * 256 // n * 3:i * 256 // n * 3 + 3]) for i in range(n)], n
+    if "hues" in spec:
+        low, high = spec["hues"]
+        saturation = spec.get("saturation", 1)
+        cycle = []
+        for i in range(n):
+            position = 1 - abs(2 * i / n - 1)  # Out and back, so the cycle joins up
+            cycle.append(tuple(Effects.hsv_to_rgb(low + (high - low) * position, saturation, 1)))
+        return cycle, n
+    raise ValueError(f"scene needs stripes, gradient or hues: {spec}")
+
+
+def frames(spec, n):
+    cycle, period = pattern(spec, n)
+    scroll = spec.get("scroll", 0)
+    count = period // scroll if scroll else 1
+    for f in range(count):
+        shift = f * scroll
+        yield [cycle[(i - shift) % period] for i in range(n)]
+
+
+def raw_message(kind, slot, first, data):
+    return bytes([kind, slot]) + struct.pack("<H", first) + bytes(data)
+
+
+def rgb_records(frame, chunk):
+    per = (chunk - HEADER_SIZE) // 3
+    return [raw_message(kernels.RAW_RGB, 0, i, b"".join(bytes(p) for p in frame[i:i + per])) for i in range(0, len(frame), per)]
+
+
+def rle_records(frame, chunk):
+    runs = []
+    for pixel in frame:
+        if runs and runs[-1][1] == pixel and runs[-1][0] < 255:
+            runs[-1][0] += 1
+        else:
+            runs.append([1, pixel])
+    per = (chunk - HEADER_SIZE) // 4
+    records = []
+    first = 0
+    for i in range(0, len(runs), per):
+        block = runs[i:i + per]
+        records.append(raw_message(kernels.RAW_RLE, 0, first, b"".join(bytes([count]) + bytes(pixel) for count, pixel in block)))
+        first += sum(count for count, _ in block)
+    return records
+
+
+def indexed_records(frame, chunk, index, slot):
+    per = chunk - HEADER_SIZE
+    return [raw_message(kernels.RAW_INDEXED, slot, i, bytes(index[p] for p in frame[i:i + per])) for i in range(0, len(frame), per)]
+
+
+def size(records):
+    return sum(len(record) for record in records)
+
+
+def encode(all_frames, chunk, index, slot):
+    """Each frame's raw messages, in whichever encoding is smallest for it, and how many frames used each encoding."""
+    used = {"RGB": 0, "RLE": 0, "indexed": 0}
+    records = []
+    for frame in all_frames:
+        options = {"RGB": rgb_records(frame, chunk), "RLE": rle_records(frame, chunk)}
+        if index:
+            options["indexed"] = indexed_records(frame, chunk, index, slot)
+        encoding = min(options, key=lambda name: size(options[name]))
+        used[encoding] += 1
+        records.append(options[encoding])
+    return records, used
+
+
+def compile_scene(spec, n, chunk, slot):
+    """The scene file as bytes, how many frames went into each encoding, and its largest record."""
+    all_frames = list(frames(spec, n))
+    frame_records, used = encode(all_frames, chunk, None, slot)
+    palette = []
+    colours = sorted({pixel for frame in all_frames for pixel in frame})
+    if len(colours) <= 256:
+        entries = (chunk - HEADER_SIZE) // 3
+        indexed_palette = [raw_message(PALETTE, slot, i, b"".join(bytes(c) for c in colours[i:i + entries]))
+                           for i in range(0, len(colours), entries)]
+        indexed, indexed_used = encode(all_frames, chunk, {colour: i for i, colour in enumerate(colours)}, slot)
+        if size(indexed_palette) + sum(size(frame) for frame in indexed) < sum(size(frame) for frame in frame_records):
+            palette, frame_records, used = indexed_palette, indexed, indexed_used  # Only if the palette pays for itself
+
+    hold_ms = spec.get("hold_ms", 1000)
+    if not 0 < hold_ms < 65536:
+        raise ValueError(f"hold_ms must be 1 to 65535, not {hold_ms}")
+    records = [(record, 0) for record in palette]
+    for frame in frame_records:
+        records.extend((record, hold_ms if i == len(frame) - 1 else 0) for i, record in enumerate(frame))
+
+    flags = scenes.LOOP if len(all_frames) > 1 else 0
+    largest = max(len(record) for record, _ in records)
+    out = bytearray(struct.pack(scenes.HEADER_FORMAT, scenes.MAGIC, scenes.VERSION, flags, n, len(all_frames), largest))
+    for record, hold in records:
+        out += struct.pack(scenes.RECORD_FORMAT, len(record), hold) + record
+    return bytes(out), used, largest
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("definitions", nargs="?", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "scenes.json"))
+    parser.add_argument("--leds", type=int, default=50)
+    parser.add_argument("--out", default="build/scenes")
+    parser.add_argument("--chunk", type=int, default=512, help="Largest record in bytes: the buffer the device plays scenes through")
+    parser.add_argument("--slot", type=int, default=3, help="Palette slot for indexed frames, below the device's RAW_PALETTE_SLOTS")
+    args = parser.parse_args()
+
+    with open(args.definitions) as f:
+        definitions = json.load(f)
+    os.makedirs(args.out, exist_ok=True)
+    for name, spec in definitions.items():
+        data, used, largest = compile_scene(spec, args.leds, args.chunk, args.slot)
+        path = os.path.join(args.out, name + scenes.EXTENSION)
+        with open(path, "wb") as f:
+            f.write(data)
+        count = sum(used.values())
+        encodings = ", ".join(f"{frames} {encoding}" for encoding, frames in used.items() if frames)
+        print(f"{name:12} {count:4} frames ({encodings}), {len(data):6} bytes, {count * args.leds * 3:6} as plain RGB, "
+              f"largest record {largest} bytes -> {path}")
+
+
+if __name__ == "__main__":
+    main()
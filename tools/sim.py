@@ -0,0 +1,255 @@
+# HomeAssistant Plasma - tools/sim.py
+# Host simulator. Installs stand-ins for the MicroPython and Pimoroni modules the device code imports,
+# so StripController and friends run unchanged under CPython for benchmarks and experiments.
+#
+# Usage, from a tools/ script:
+#     import sim
+#     from strip_controller import StripController
+#     sim.run(main())  # main() is the coroutine to simulate
+#
+# By default run() uses a virtual clock: sleeps complete instantly and ticks_ms() follows simulated time,
+# so long scenarios finish quickly and give repeatable results. Pass virtual=False for real time (needed for real sockets).
+
+import asyncio
+import gc
+import os
+import sys
+import tempfile
+import time
+import types
+import json
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_TICKS_PERIOD = 1 << 30
+_TICKS_MAX = _TICKS_PERIOD - 1
+_TICKS_HALFPERIOD = _TICKS_PERIOD >> 1
+
+_clock = time.monotonic
+
+CONFIG = None  # The device's config module, once install() has run
+
+
+def ticks_ms():
+    return int(_clock() * 1000) & _TICKS_MAX
+
+
+def ticks_us():
+    return int(_clock() * 1000000) & _TICKS_MAX
+
+
+def ticks_diff(end, start):
+    return ((end - start + _TICKS_HALFPERIOD) & _TICKS_MAX) - _TICKS_HALFPERIOD
+
+
+def ticks_add(ticks, delta):
+    return (ticks + delta) & _TICKS_MAX
+
+
+class VirtualClockLoop(asyncio.SelectorEventLoop):
+    """Event loop whose clock jumps straight to the next scheduled timer whenever nothing is ready to run."""
+
+    def __init__(self):
+        super().__init__()
+        self._virtual_time = 0.0
+
+    def time(self):
+        return self._virtual_time
+
+    def _run_once(self):
+        if not self._ready:
+            pending = [handle._when for handle in self._scheduled if not handle._cancelled]
+            if pending:
+                self._virtual_time = max(self._virtual_time, min(pending))
+        super()._run_once()
+
+
+# --- Stand-in modules -------------------------------------------------------------------------------------------
+
+class _WS2812:
+    def __init__(self, num_leds, pio=0, sm=0, dat=15, freq=800000, color_order=0):
+        self.num_leds = num_leds
+        self.pixels = [(0, 0, 0)] * num_leds
+        self.set_calls = 0
+
+    def start(self, fps=60):
+        pass
+
+    def set_rgb(self, i, r, g, b):
+        self.pixels[i] = (r, g, b)
+        self.set_calls += 1
+
+
+class _APA102(_WS2812):
+    def __init__(self, num_leds, pio=0, sm=0, dat=14, clk=15, freq=1000000, color_order=0):
+        super().__init__(num_leds)
+
+
+class _Pin:
+    IN = 0
+    OUT = 1
+
+    def __init__(self, pin, mode=None, value=0):
+        self.pin = pin
+        self._value = value
+
+    def value(self, value=None):
+        if value is None:
+            return self._value
+        self._value = int(value)
+
+    def on(self):
+        self._value = 1
+
+    def off(self):
+        self._value = 0
+
+
+class _WLAN:
+    def __init__(self, interface):
+        self._active = False
+
+    def active(self, active=None):
+        if active is None:
+            return self._active
+        self._active = active
+
+    def connect(self, ssid, psk):
+        self._active = True
+
+    def disconnect(self):
+        pass
+
+    def isconnected(self):
+        return self._active
+
+    def ifconfig(self, config=None):
+        return ("127.0.0.1", "255.0.0.0", "127.0.0.1", "127.0.0.1")
+
+    def config(self, *args, **kwargs):
+        return None
+
+
+class FakeMQTTClient:
+    """Stands in for umqtt.simple.MQTTClient once connected: records what is published instead of sending it."""
+
+    def __init__(self):
+        self.published = []
+        self.subscriptions = []
+
+    def publish(self, topic, msg, retain=False, qos=0):
+        self.published.append((topic, msg, retain, qos))
+
+    def subscribe(self, topic, qos=0):
+        self.subscriptions.append(topic)
+
+    def check_msg(self):
+        return None
+
+    def ping(self):
+        pass
+
+    def disconnect(self):
+        pass
+
+
+async def _stream_readinto(self, buf):
+    # uasyncio streams read straight into a buffer
+    data = await self.read(len(buf))
+    buf[:len(data)] = data
+    return len(data)
+
+
+_cpython_stream_write = asyncio.StreamWriter.write
+
+
+def _stream_write(self, data):
+    # uasyncio streams take str as well as bytes
+    _cpython_stream_write(self, data.encode() if isinstance(data, str) else data)
+
+
+def _identity(f):
+    return f
+
+
+def _module(name, **attributes):
+    module = types.ModuleType(name)
+    module.__dict__.update(attributes)
+    sys.modules[name] = module
+    return module
+
+
+def install():
+    if "micropython" in sys.modules:
+        return
+
+    for path in (ROOT, os.path.join(ROOT, "lib")):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+
+    _module("micropython", const=lambda value: value, native=_identity, viper=_identity)
+
+    plasma_stick = _module("plasma.plasma_stick", DAT=15)
+    _module("plasma", WS2812=_WS2812, APA102=_APA102, COLOR_ORDER_RGB=0, COLOR_ORDER_RBG=1, COLOR_ORDER_GRB=2,
+            COLOR_ORDER_GBR=3, COLOR_ORDER_BRG=4, COLOR_ORDER_BGR=5, plasma_stick=plasma_stick)
+    _module("machine", Pin=_Pin, unique_id=lambda: b"\x00" * 8, reset=lambda: sys.exit(0))
+    _module("network", WLAN=_WLAN, STA_IF=0, AP_IF=1)
+    _module("rp2", country=lambda country: None)
+
+    sys.modules["ujson"] = json
+    sys.modules["uasyncio"] = asyncio
+
+    time.ticks_ms = ticks_ms
+    time.ticks_us = ticks_us
+    time.ticks_diff = ticks_diff
+    time.ticks_add = ticks_add
+    time.sleep_ms = lambda ms: time.sleep(ms / 1000)
+    time.sleep_us = lambda us: time.sleep(us / 1000000)
+    asyncio.sleep_ms = lambda ms: asyncio.sleep(ms / 1000)
+    asyncio.StreamReader.readinto = _stream_readinto
+    asyncio.StreamWriter.write = _stream_write
+    gc.mem_free = lambda: 0
+    gc.mem_alloc = lambda: 0
+
+    # micropython.native/viper are applied as bare names inside the device code
+    import builtins
+    builtins.micropython = sys.modules["micropython"]
+
+    # There's no PIO or SPI on the host: render into the recording output driver instead
+    global CONFIG
+    try:
+        import config_local as CONFIG
+        import CONFIG as defaults
+
+        for key in dir(defaults):  # As main.py does, for a config_local.py from before newer settings
+            if not hasattr(CONFIG, key):
+                setattr(CONFIG, key, getattr(defaults, key))
+    except ImportError:
+        import CONFIG
+    CONFIG.LED_DRIVER = "recording"
+
+
+def run(main, virtual=True):
+    """Run a coroutine to completion, with a virtual clock unless virtual is False."""
+    global _clock
+    loop = VirtualClockLoop() if virtual else asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    _clock = loop.time
+    try:
+        return loop.run_until_complete(main)
+    finally:
+        for task in asyncio.all_tasks(loop):
+            task.cancel()
+        loop.run_until_complete(asyncio.sleep(0))
+        loop.close()
+        _clock = time.monotonic
+
+
+def flash_dir():
+    """Switch to an empty temporary directory standing in for the device filesystem, and return its path."""
+    path = tempfile.mkdtemp(prefix="plasma_flash_")
+    os.chdir(path)
+    return path
+
+
+install()
@@ -0,0 +1,123 @@
+# HomeAssistant Plasma - transitions.py
+# (c) 2024 Snapcase
+# Time-based transitions: each pixel fades from where it was to its target over an exact duration, so the length of a
+# colour change no longer depends on the colour distance or on how fast the render loop runs.
+# Progress is worked out in fixed point from elapsed ticks_ms, through a 257-entry easing table (0..1024),
+# and the per-frame work is done by kernels.transition over flat byte buffers.
+
+import time
+from array import array
+
+import asyncio
+
+from micropython import const
+
+import kernels
+import log
+
+_ONE = const(1024)  # Fixed point 1.0 for transition progress
+_STEPS = const(256)  # Easing table resolution
+
+EASINGS = ("linear", "ease_in", "ease_out", "ease_in_out")
+
+
+def easing_table(easing):
+    table = array("H", range(_STEPS + 1))
+    for i in range(_STEPS + 1):
+        t = i * _ONE // _STEPS
+        if easing == "ease_in":
+            t = t * t // _ONE
+        elif easing == "ease_out":
+            t = _ONE - (_ONE - t) * (_ONE - t) // _ONE
+        elif easing == "ease_in_out":
+            t = t * t * (3 * _ONE - 2 * t) // (_ONE * _ONE)
+        table[i] = t
+    return table
+
+
+class TransitionEngine:
+    def __init__(self, num_leds, duration_ms=1000, easing="linear"):
+        self.num_leds = num_leds
+        self.duration_ms = duration_ms
+        self.moving = 0  # Pixels still part way through a transition after the last step()
+        self.channel_sum = 0  # Sum of every channel value in current_leds, kept up to date as pixels change
+        self.wake = asyncio.Event()  # Set whenever a pixel is given something new to do, so a settled strip can stop rendering
+
+        # Flat byte buffers, for the kernels: r, g, b per pixel as shown on the strip,
+        # and the start r, g, b then target r, g, b of each pixel's transition
+        self.current_leds = bytearray(num_leds * 3)
+        self.ends = bytearray(num_leds * 6)
+        self.start_ms = array("i", [0] * num_leds)
+
+        self.params = array("i", [0] * kernels.P_SIZE)
+        self.params[kernels.P_COUNT] = num_leds
+
+        self.easing = None
+        self.set_easing(easing)
+
+    def set_easing(self, easing):
+        if easing not in EASINGS:
+            log.warning("Unknown easing %s, using linear", easing)
+            easing = "linear"
+        if easing != self.easing:
+            self.easing = easing
+            for i, progress in enumerate(easing_table(easing)):
+                self.params[kernels.P_EASE + i] = progress
+
+    def set_target(self, i, rgb):
+        """Start pixel i fading towards rgb, from wherever it is now. Does nothing if it is already heading there."""
+        ends = self.ends
+        e = i * 6
+        r, g, b = rgb
+        if ends[e + 3] != r or ends[e + 4] != g or ends[e + 5] != b:
+            current = self.current_leds
+            c = i * 3
+            ends[e] = current[c]
+            ends[e + 1] = current[c + 1]
+            ends[e + 2] = current[c + 2]
+            ends[e + 3] = r
+            ends[e + 4] = g
+            ends[e + 5] = b
+            self.start_ms[i] = time.ticks_ms()
+            self.wake.set()
+
+    def fill_target(self, rgb):
+        for i in range(self.num_leds):
+            self.set_target(i, rgb)
+
+    def set_current(self, i, rgb):
+        """Jump pixel i straight to rgb, then fade back towards its target."""
+        current = self.current_leds
+        ends = self.ends
+        c = i * 3
+        e = i * 6
+        r, g, b = rgb
+        self.channel_sum += r + g + b - current[c] - current[c + 1] - current[c + 2]
+        current[c] = ends[e] = r
+        current[c + 1] = ends[e + 1] = g
+        current[c + 2] = ends[e + 2] = b
+        self.start_ms[i] = time.ticks_ms()
+        self.wake.set()
+
+    def render_palette(self, tables, params):
+        """Replace the whole frame with one rendered from palette and noise tables (see kernels.palette_fill), with no fade."""
+        self.channel_sum = kernels.palette_fill(self.current_leds, self.ends, tables, params)
+        self.wake.set()
+
+    def render_raw(self, data, params):
+        """Write the pixels of a raw frame message (see kernels.raw_fill) straight to the strip, with no fade."""
+        self.channel_sum += kernels.raw_fill(self.current_leds, self.ends, data, params)
+        self.wake.set()
+
+    def is_settled(self, i):
+        current = self.current_leds
+        ends = self.ends
+        c = i * 3
+        e = i * 6 + 3
+        return current[c] == ends[e] and current[c + 1] == ends[e + 1] and current[c + 2] == ends[e + 2]
+
+    def step(self):
+        self.params[kernels.P_NOW] = time.ticks_ms()
+        self.params[kernels.P_DURATION] = self.duration_ms
+        self.moving = kernels.transition(self.current_leds, self.ends, self.start_ms, self.params)
+        self.channel_sum += self.params[kernels.P_DELTA]